@@ -1,21 +1,41 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context, send_file, session, abort
+from flask import before_render_template, template_rendered
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from datetime import datetime, timedelta, timezone
 import json
-import bcrypt
-from pymongo import MongoClient
+import click
+import pymongo
+from pymongo import MongoClient, UpdateOne, ReplaceOne, DeleteMany, ReturnDocument
+from pymongo.errors import PyMongoError, OperationFailure, DuplicateKeyError
 from bson import ObjectId
+from bson.codec_options import CodecOptions
 import os
-import urllib.parse
 import csv
 import io
-import requests
+import hashlib
+import hmac
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 import re
+import threading
+import time
+from contextlib import contextmanager
+from geocoding import GeocodeCache, CachedGeocoder, NominatimGeocoder, TokenBucket, SharedRateLimiter, AddressEnricher, BatchGeocoder
+from offline_geocoder import OfflineGeocoder, FallbackResolver
+from xlsx_writer import StreamingXlsxWriter, ChunkBuffer
+from report_jobs import ReportJobManager, JobLimitError
+from live_feed import LiveFeed, ChangeStreamSource, WatermarkTailer
+from tombstones import TombstoneRecorder
+from stations import StationRegistry, normalize_name
+from user_cache import TTLCache
+from migrations import MigrationRunner, MigrationLockedError
+from db_metrics import PoolMetrics, CommandMetrics
+from request_metrics import RequestMetrics
+from passwords import PasswordHasher, HasherBusyError
+from deferred import Deferred
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
@@ -24,439 +44,252 @@ app.config.from_object('config.Config')
 IST = timezone(timedelta(hours=5, minutes=30))
 
 # --- AUTHENTIC POLICE DATABASE ---
-POLICE_DATABASE = {
-    # --- USER SPECIFIC REQUESTS ---
-    "KTJ Nagara-2 Police Station": {"ward": "26", "reg_no": "170026"},
-    "KTJ Nagara-1 Police Station": {"ward": "27", "reg_no": "170027"},
-
-    # --- BENGALURU CITY (Code 01) ---
-    "Ashok Nagar Police Station": {"ward": "111", "reg_no": "010111"},
-    "Basavanagudi Police Station": {"ward": "154", "reg_no": "010154"},
-    "Chamarajpet Police Station": {"ward": "139", "reg_no": "010139"},
-    "Commercial Street Police Station": {"ward": "110", "reg_no": "010110"},
-    "Cubbon Park Police Station": {"ward": "109", "reg_no": "010109"},
-    "Halasuru Police Station": {"ward": "112", "reg_no": "010112"},
-    "High Grounds Police Station": {"ward": "093", "reg_no": "010093"},
-    "Jayanagar Police Station": {"ward": "169", "reg_no": "010169"},
-    "K.G. Halli Police Station": {"ward": "030", "reg_no": "010030"},
-    "K.R. Market Police Station": {"ward": "138", "reg_no": "010138"},
-    "Koramangala Police Station": {"ward": "151", "reg_no": "010151"},
-    "Madiwala Police Station": {"ward": "172", "reg_no": "010172"},
-    "Mahalakshmi Layout Police Station": {"ward": "068", "reg_no": "010068"},
-    "Malleshwaram Police Station": {"ward": "045", "reg_no": "010045"},
-    "Seshadripuram Police Station": {"ward": "094", "reg_no": "010094"},
-    "Shivajinagar Police Station": {"ward": "108", "reg_no": "010108"},
-    "Ulsoor Police Station": {"ward": "089", "reg_no": "010089"},
-    "Vijayanagar Police Station": {"ward": "123", "reg_no": "010123"},
-    "Whitefield Police Station": {"ward": "084", "reg_no": "010084"},
-    "Yelahanka Police Station": {"ward": "004", "reg_no": "010004"},
-
-    # --- DAVANAGERE DISTRICT (Code 17) ---
-    "Davanagere Traffic Police Station": {"ward": "001", "reg_no": "170001"},
-    "Davanagere Women Police Station": {"ward": "002", "reg_no": "170002"},
-    "Jagalur Police Station": {"ward": "012", "reg_no": "170012"},
-    "Channagiri Police Station": {"ward": "014", "reg_no": "170014"},
-    "Harapanahalli Police Station": {"ward": "018", "reg_no": "170018"},
-    "Harihar Police Station": {"ward": "020", "reg_no": "170020"},
-    "Honnali Police Station": {"ward": "022", "reg_no": "170022"},
-    "Nyamathi Police Station": {"ward": "024", "reg_no": "170024"},
-    "Davanagere Extension Police Station": {"ward": "010", "reg_no": "170010"},
-    "Davanagere Rural Police Station": {"ward": "015", "reg_no": "170015"},
-
-    # --- MYSURU CITY (Code 09) ---
-    "Vijayanagar Police Station Mysuru": {"ward": "031", "reg_no": "090031"},
-    "Nazarabad Police Station": {"ward": "030", "reg_no": "090030"},
-    "K.R. Police Station Mysuru": {"ward": "035", "reg_no": "090035"},
-    "Metagalli Police Station": {"ward": "018", "reg_no": "090018"},
-    "Lashkar Police Station": {"ward": "022", "reg_no": "090022"},
-    "Jayanagar Police Station Mysuru": {"ward": "040", "reg_no": "090040"},
-    "Saraswathipuram Police Station": {"ward": "042", "reg_no": "090042"},
-    "Kuvempunagar Police Station": {"ward": "045", "reg_no": "090045"},
-    "Ashokapuram Police Station": {"ward": "048", "reg_no": "090048"},
-
-    # --- HUBBALLI-DHARWAD (Code 25) ---
-    "Hubballi Traffic Police Station": {"ward": "050", "reg_no": "250050"},
-    "Old Hubballi Police Station": {"ward": "055", "reg_no": "250055"},
-    "Vidyanagar Police Station": {"ward": "060", "reg_no": "250060"},
-    "Dharwad Police Station": {"ward": "010", "reg_no": "250010"},
-    "Keshavpur Police Station": {"ward": "062", "reg_no": "250062"},
-    "Navanagar Police Station": {"ward": "045", "reg_no": "250045"},
-    "Suburban Police Station Hubballi": {"ward": "052", "reg_no": "250052"},
-    "Dharwad Town Police Station": {"ward": "012", "reg_no": "250012"},
-
-    # --- MANGALURU CITY (Code 19) ---
-    "Mangaluru North Police Station": {"ward": "020", "reg_no": "190020"},
-    "Mangaluru South Police Station": {"ward": "021", "reg_no": "190021"},
-    "Kadri Police Station": {"ward": "022", "reg_no": "190022"},
-    "Bunder Police Station": {"ward": "025", "reg_no": "190025"},
-    "Pandeshwar Police Station": {"ward": "028", "reg_no": "190028"},
-    "Urwa Police Station": {"ward": "018", "reg_no": "190018"},
-    "Barke Police Station": {"ward": "019", "reg_no": "190019"},
-    "Kankanady Police Station": {"ward": "030", "reg_no": "190030"},
-
-    # --- BELAGAVI (Code 22) ---
-    "Belagavi Traffic Police Station": {"ward": "005", "reg_no": "220005"},
-    "Khanapur Police Station": {"ward": "050", "reg_no": "220050"},
-    "Gokul Road Police Station": {"ward": "015", "reg_no": "220015"},
-    "Sadashiv Nagar Police Station": {"ward": "020", "reg_no": "220020"},
-    "Camp Police Station Belagavi": {"ward": "008", "reg_no": "220008"},
-    "Khade Bazar Police Station": {"ward": "010", "reg_no": "220010"},
-    "Market Police Station Belagavi": {"ward": "012", "reg_no": "220012"},
-    "APMC Police Station Belagavi": {"ward": "025", "reg_no": "220025"},
-
-    # --- KALABURAGI (Code 32) ---
-    "Kalaburagi Traffic Police Station": {"ward": "005", "reg_no": "320005"},
-    "Jewargi Police Station": {"ward": "040", "reg_no": "320040"},
-    "Sedam Police Station": {"ward": "045", "reg_no": "320045"},
-    "Station Bazar Police Station": {"ward": "010", "reg_no": "320010"},
-    "Ashok Nagar Police Station Kalaburagi": {"ward": "015", "reg_no": "320015"},
-    "Brahmapur Police Station": {"ward": "020", "reg_no": "320020"},
-
-    # --- TUMAKURU (Code 06) ---
-    "Tumakuru Town Police Station": {"ward": "001", "reg_no": "060001"},
-    "Tumakuru Rural Police Station": {"ward": "005", "reg_no": "060005"},
-    "New Extension Police Station Tumakuru": {"ward": "003", "reg_no": "060003"},
-    "Tilak Park Police Station": {"ward": "002", "reg_no": "060002"},
-    "Kyathasandra Police Station": {"ward": "006", "reg_no": "060006"},
-    "Gubbi Police Station": {"ward": "020", "reg_no": "060020"},
-    "Kunigal Police Station": {"ward": "030", "reg_no": "060030"},
-    "Sira Town Police Station": {"ward": "040", "reg_no": "060040"},
-    "Tiptur Town Police Station": {"ward": "050", "reg_no": "060050"},
-    "Madhugiri Police Station": {"ward": "060", "reg_no": "060060"},
-    "Pavagada Police Station": {"ward": "070", "reg_no": "060070"},
-    "Chikkanayakanahalli Police Station": {"ward": "080", "reg_no": "060080"},
-    "Koratagere Police Station": {"ward": "090", "reg_no": "060090"},
-    "Turuvekere Police Station": {"ward": "095", "reg_no": "060095"},
-    "Hebburu Police Station": {"ward": "098", "reg_no": "060098"},
-
-    # --- SHIVAMOGGA (Code 14) ---
-    "Shivamogga Doddapete Police Station": {"ward": "001", "reg_no": "140001"},
-    "Shivamogga Kote Police Station": {"ward": "002", "reg_no": "140002"},
-    "Tunganagar Police Station": {"ward": "005", "reg_no": "140005"},
-    "Vinobhanagar Police Station": {"ward": "004", "reg_no": "140004"},
-    "Shivamogga Rural Police Station": {"ward": "010", "reg_no": "140010"},
-    "Bhadravathi Old Town Police Station": {"ward": "020", "reg_no": "140020"},
-    "Bhadravathi New Town Police Station": {"ward": "021", "reg_no": "140021"},
-    "Paper Town Police Station": {"ward": "022", "reg_no": "140022"},
-    "Sagar Town Police Station": {"ward": "030", "reg_no": "140030"},
-    "Sagar Rural Police Station": {"ward": "031", "reg_no": "140031"},
-    "Shikaripura Police Station": {"ward": "040", "reg_no": "140040"},
-    "Soraba Police Station": {"ward": "050", "reg_no": "140050"},
-    "Thirthahalli Police Station": {"ward": "060", "reg_no": "140060"},
-    "Hosanagara Police Station": {"ward": "070", "reg_no": "140070"},
-
-    # --- BALLARI (Code 34) ---
-    "Ballari Brucepet Police Station": {"ward": "001", "reg_no": "340001"},
-    "Ballari Cowl Bazar Police Station": {"ward": "002", "reg_no": "340002"},
-    "Ballari Gandhinagar Police Station": {"ward": "003", "reg_no": "340003"},
-    "Ballari Rural Police Station": {"ward": "005", "reg_no": "340005"},
-    "APMC Yard Police Station Ballari": {"ward": "008", "reg_no": "340008"},
-    "Kurugodu Police Station": {"ward": "015", "reg_no": "340015"},
-    "Siruguppa Police Station": {"ward": "020", "reg_no": "340020"},
-    "Sandur Police Station": {"ward": "030", "reg_no": "340030"},
-    "Kudligi Police Station": {"ward": "040", "reg_no": "340040"},
-    "Hospet Town Police Station": {"ward": "050", "reg_no": "340050"},
-    "Hospet Rural Police Station": {"ward": "051", "reg_no": "340051"},
-    "Hagaribommanahalli Police Station": {"ward": "060", "reg_no": "340060"},
-    "Kampli Police Station": {"ward": "065", "reg_no": "340065"},
-    "Toranagallu Police Station": {"ward": "070", "reg_no": "340070"},
-
-    # --- VIJAYAPURA (Code 28) ---
-    "Vijayapura Gandhi Chowk Police Station": {"ward": "001", "reg_no": "280001"},
-    "Vijayapura Gol Gumbaz Police Station": {"ward": "002", "reg_no": "280002"},
-    "Vijayapura Jalnagar Police Station": {"ward": "003", "reg_no": "280003"},
-    "Vijayapura APMC Police Station": {"ward": "004", "reg_no": "280004"},
-    "Vijayapura Rural Police Station": {"ward": "005", "reg_no": "280005"},
-    "Indi Police Station": {"ward": "020", "reg_no": "280020"},
-    "Sindagi Police Station": {"ward": "030", "reg_no": "280030"},
-    "Basavana Bagewadi Police Station": {"ward": "040", "reg_no": "280040"},
-    "Muddebihal Police Station": {"ward": "050", "reg_no": "280050"},
-    "Talikoti Police Station": {"ward": "055", "reg_no": "280055"},
-    "Tikota Police Station": {"ward": "060", "reg_no": "280060"},
-
-    # --- HASSAN (Code 13) ---
-    "Hassan Town Police Station": {"ward": "001", "reg_no": "130001"},
-    "Hassan Extension Police Station": {"ward": "002", "reg_no": "130002"},
-    "Hassan Rural Police Station": {"ward": "005", "reg_no": "130005"},
-    "Arsikere Town Police Station": {"ward": "010", "reg_no": "130010"},
-    "Arsikere Rural Police Station": {"ward": "011", "reg_no": "130011"},
-    "Channarayapatna Town Police Station": {"ward": "020", "reg_no": "130020"},
-    "Sakleshpur Town Police Station": {"ward": "030", "reg_no": "130030"},
-    "Belur Police Station": {"ward": "040", "reg_no": "130040"},
-    "Holenarasipura Police Station": {"ward": "050", "reg_no": "130050"},
-    "Arkalgud Police Station": {"ward": "060", "reg_no": "130060"},
-    "Alur Police Station": {"ward": "070", "reg_no": "130070"},
-    "Yeslur Police Station": {"ward": "075", "reg_no": "130075"},
-    "Nuggehalli Police Station": {"ward": "080", "reg_no": "130080"},
-
-    # --- UDUPI (Code 20) ---
-    "Udupi Town Police Station": {"ward": "001", "reg_no": "200001"},
-    "Malpe Police Station": {"ward": "005", "reg_no": "200005"},
-    "Manipal Police Station": {"ward": "006", "reg_no": "200006"},
-    "Brahmavara Police Station": {"ward": "010", "reg_no": "200010"},
-    "Kundapura Police Station": {"ward": "020", "reg_no": "200020"},
-    "Byndoor Police Station": {"ward": "030", "reg_no": "200030"},
-    "Karkala Town Police Station": {"ward": "040", "reg_no": "200040"},
-    "Karkala Rural Police Station": {"ward": "041", "reg_no": "200041"},
-    "Kaup Police Station": {"ward": "050", "reg_no": "200050"},
-    "Padubidri Police Station": {"ward": "055", "reg_no": "200055"},
-    "Kollur Police Station": {"ward": "060", "reg_no": "200060"},
-    "Kota Police Station": {"ward": "065", "reg_no": "200065"},
-    "Shankaranarayana Police Station": {"ward": "070", "reg_no": "200070"},
-
-    # --- MANDYA (Code 11) ---
-    "Mandya West Police Station": {"ward": "001", "reg_no": "110001"},
-    "Mandya East Police Station": {"ward": "002", "reg_no": "110002"},
-    "Mandya Rural Police Station": {"ward": "005", "reg_no": "110005"},
-    "Maddur Police Station": {"ward": "010", "reg_no": "110010"},
-    "Malavalli Town Police Station": {"ward": "020", "reg_no": "110020"},
-    "Malavalli Rural Police Station": {"ward": "021", "reg_no": "110021"},
-    "Srirangapatna Police Station": {"ward": "030", "reg_no": "110030"},
-    "K.R. Pet Town Police Station": {"ward": "040", "reg_no": "110040"},
-    "Nagamangala Police Station": {"ward": "050", "reg_no": "110050"},
-    "Pandavapura Police Station": {"ward": "060", "reg_no": "110060"},
-    "Arakere Police Station": {"ward": "070", "reg_no": "110070"},
-    "Basaralu Police Station": {"ward": "080", "reg_no": "110080"},
-    "Bellur Police Station": {"ward": "090", "reg_no": "110090"},
-
-    # --- KOLAR (Code 07) ---
-    "Kolar Town Police Station": {"ward": "001", "reg_no": "070001"},
-    "Kolar Rural Police Station": {"ward": "005", "reg_no": "070005"},
-    "Galpet Police Station": {"ward": "006", "reg_no": "070006"},
-    "Robertsonpet Police Station (KGF)": {"ward": "010", "reg_no": "070010"},
-    "Andersonpet Police Station (KGF)": {"ward": "011", "reg_no": "070011"},
-    "Bangarpet Police Station": {"ward": "020", "reg_no": "070020"},
-    "Malur Police Station": {"ward": "030", "reg_no": "070030"},
-    "Mulbagal Town Police Station": {"ward": "040", "reg_no": "070040"},
-    "Srinivaspura Police Station": {"ward": "050", "reg_no": "070050"},
-    "Kolar Traffic Police Station": {"ward": "002", "reg_no": "070002"},
-    "Vemagal Police Station": {"ward": "060", "reg_no": "070060"},
-
-    # --- CHIKKAMAGALURU (Code 18) ---
-    "Chikkamagaluru Town Police Station": {"ward": "001", "reg_no": "180001"},
-    "Basavanahalli Police Station": {"ward": "002", "reg_no": "180002"},
-    "Chikkamagaluru Rural Police Station": {"ward": "005", "reg_no": "180005"},
-    "Aldur Police Station": {"ward": "010", "reg_no": "180010"},
-    "Mudigere Police Station": {"ward": "020", "reg_no": "180020"},
-    "Koppa Police Station": {"ward": "030", "reg_no": "180030"},
-    "Sringeri Police Station": {"ward": "040", "reg_no": "180040"},
-    "N.R. Pura Police Station": {"ward": "050", "reg_no": "180050"},
-    "Kadur Police Station": {"ward": "060", "reg_no": "180060"},
-    "Tarikere Police Station": {"ward": "070", "reg_no": "180070"},
-    "Balehonnur Police Station": {"ward": "080", "reg_no": "180080"},
-
-    # --- CHITRADURGA (Code 16) ---
-    "Chitradurga Fort Police Station": {"ward": "001", "reg_no": "160001"},
-    "Chitradurga Extension Police Station": {"ward": "002", "reg_no": "160002"},
-    "Chitradurga Rural Police Station": {"ward": "005", "reg_no": "160005"},
-    "Hiriyur Town Police Station": {"ward": "010", "reg_no": "160010"},
-    "Challakere Police Station": {"ward": "020", "reg_no": "160020"},
-    "Hosadurga Police Station": {"ward": "030", "reg_no": "160030"},
-    "Holalkere Police Station": {"ward": "040", "reg_no": "160040"},
-    "Molakalmuru Police Station": {"ward": "050", "reg_no": "160050"},
-    "Aimangala Police Station": {"ward": "060", "reg_no": "160060"},
-    "Chitradurga Traffic Police Station": {"ward": "003", "reg_no": "160003"},
-    "Chitradurga Women Police Station": {"ward": "004", "reg_no": "160004"},
-
-    # --- RAICHUR (Code 36) ---
-    "Raichur Sadar Bazar Police Station": {"ward": "001", "reg_no": "360001"},
-    "Raichur Market Yard Police Station": {"ward": "002", "reg_no": "360002"},
-    "Raichur West Circle Police Station": {"ward": "003", "reg_no": "360003"},
-    "Raichur Netaji Nagar Police Station": {"ward": "004", "reg_no": "360004"},
-    "Raichur Rural Police Station": {"ward": "005", "reg_no": "360005"},
-    "Manvi Police Station": {"ward": "010", "reg_no": "360010"},
-    "Sindhanur Town Police Station": {"ward": "020", "reg_no": "360020"},
-    "Sindhanur Rural Police Station": {"ward": "021", "reg_no": "360021"},
-    "Lingsugur Police Station": {"ward": "030", "reg_no": "360030"},
-    "Deodurga Police Station": {"ward": "040", "reg_no": "360040"},
-    "Maski Police Station": {"ward": "050", "reg_no": "360050"},
-
-    # --- BIDAR (Code 38) ---
-    "Bidar Market Police Station": {"ward": "001", "reg_no": "380001"},
-    "Bidar Gandhi Gunj Police Station": {"ward": "002", "reg_no": "380002"},
-    "Bidar New Town Police Station": {"ward": "003", "reg_no": "380003"},
-    "Bidar Rural Police Station": {"ward": "005", "reg_no": "380005"},
-    "Basavakalyan Town Police Station": {"ward": "010", "reg_no": "38010"},
-    "Humnabad Police Station": {"ward": "020", "reg_no": "38020"},
-    "Bhalki Town Police Station": {"ward": "030", "reg_no": "38030"},
-    "Aurad Police Station": {"ward": "040", "reg_no": "38040"},
-    "Bidar Traffic Police Station": {"ward": "004", "reg_no": "380004"},
-    "Bidar Women Police Station": {"ward": "006", "reg_no": "380006"},
-
-    # --- BAGALKOTE (Code 29) ---
-    "Bagalkote Town Police Station": {"ward": "001", "reg_no": "290001"},
-    "Bagalkote Navanagar Police Station": {"ward": "002", "reg_no": "290002"},
-    "Bagalkote Rural Police Station": {"ward": "005", "reg_no": "290005"},
-    "Jamkhandi Town Police Station": {"ward": "010", "reg_no": "290010"},
-    "Mudhol Police Station": {"ward": "020", "reg_no": "290020"},
-    "Badami Police Station": {"ward": "030", "reg_no": "290030"},
-    "Hungund Police Station": {"ward": "040", "reg_no": "290040"},
-    "Bilagi Police Station": {"ward": "050", "reg_no": "290050"},
-    "Ilkal Police Station": {"ward": "060", "reg_no": "290060"},
-    "Mahalingpur Police Station": {"ward": "070", "reg_no": "290070"},
-
-    # --- GADAG (Code 26) ---
-    "Gadag Town Police Station": {"ward": "001", "reg_no": "260001"},
-    "Gadag Rural Police Station": {"ward": "005", "reg_no": "260005"},
-    "Betgeri Police Station": {"ward": "002", "reg_no": "260002"},
-    "Ron Police Station": {"ward": "010", "reg_no": "260010"},
-    "Shirahatti Police Station": {"ward": "020", "reg_no": "260020"},
-    "Mundargi Police Station": {"ward": "030", "reg_no": "260030"},
-    "Nargund Police Station": {"ward": "040", "reg_no": "260040"},
-    "Gajendragad Police Station": {"ward": "050", "reg_no": "260050"},
-    "Laxmeshwar Police Station": {"ward": "060", "reg_no": "260060"},
-
-    # --- HAVERI (Code 27) ---
-    "Haveri Town Police Station": {"ward": "001", "reg_no": "270001"},
-    "Haveri Rural Police Station": {"ward": "005", "reg_no": "270005"},
-    "Ranebennur Town Police Station": {"ward": "010", "reg_no": "270010"},
-    "Ranebennur Rural Police Station": {"ward": "011", "reg_no": "270011"},
-    "Byadgi Police Station": {"ward": "020", "reg_no": "270020"},
-    "Hirekerur Police Station": {"ward": "030", "reg_no": "270030"},
-    "Shiggaon Police Station": {"ward": "040", "reg_no": "270040"},
-    "Hangal Police Station": {"ward": "050", "reg_no": "270050"},
-    "Savanur Police Station": {"ward": "060", "reg_no": "270060"},
-    "Bankapura Police Station": {"ward": "070", "reg_no": "270070"},
-
-    # --- KOPPAL (Code 37) ---
-    "Koppal Town Police Station": {"ward": "001", "reg_no": "370001"},
-    "Koppal Rural Police Station": {"ward": "005", "reg_no": "370005"},
-    "Gangavathi Town Police Station": {"ward": "010", "reg_no": "370010"},
-    "Gangavathi Rural Police Station": {"ward": "011", "reg_no": "370011"},
-    "Kushtagi Police Station": {"ward": "020", "reg_no": "370020"},
-    "Yelburga Police Station": {"ward": "030", "reg_no": "370030"},
-    "Munirabad Police Station": {"ward": "040", "reg_no": "370040"},
-    "Karatagi Police Station": {"ward": "050", "reg_no": "370050"},
-
-    # --- YADGIR (Code 33) ---
-    "Yadgir Town Police Station": {"ward": "001", "reg_no": "330001"},
-    "Yadgir Rural Police Station": {"ward": "005", "reg_no": "330005"},
-    "Shahapur Police Station": {"ward": "010", "reg_no": "330010"},
-    "Shorapur Police Station": {"ward": "020", "reg_no": "330020"},
-    "Gurmitkal Police Station": {"ward": "030", "reg_no": "330030"},
-    "Kembhavi Police Station": {"ward": "040", "reg_no": "330040"},
-
-    # --- RAMANAGARA (Code 42) ---
-    "Ramanagara Town Police Station": {"ward": "001", "reg_no": "420001"},
-    "Ramanagara Rural Police Station": {"ward": "005", "reg_no": "420005"},
-    "Ijoor Police Station": {"ward": "002", "reg_no": "420002"},
-    "Channapatna Town Police Station": {"ward": "010", "reg_no": "420010"},
-    "Kanakapura Town Police Station": {"ward": "020", "reg_no": "420020"},
-    "Kanakapura Rural Police Station": {"ward": "021", "reg_no": "420021"},
-    "Magadi Police Station": {"ward": "030", "reg_no": "420030"},
-    "Bidadi Police Station": {"ward": "040", "reg_no": "420040"},
-    "Harohalli Police Station": {"ward": "050", "reg_no": "420050"},
-
-    # --- CHIKKABALLAPURA (Code 40) ---
-    "Chikkaballapura Town Police Station": {"ward": "001", "reg_no": "400001"},
-    "Chikkaballapura Rural Police Station": {"ward": "005", "reg_no": "400005"},
-    "Chintamani Town Police Station": {"ward": "010", "reg_no": "400010"},
-    "Sidlaghatta Police Station": {"ward": "020", "reg_no": "400020"},
-    "Gauribidanur Town Police Station": {"ward": "030", "reg_no": "400030"},
-    "Bagepalli Police Station": {"ward": "040", "reg_no": "400040"},
-    "Gudibande Police Station": {"ward": "050", "reg_no": "400050"},
-    "Shidlaghatta Rural Police Station": {"ward": "021", "reg_no": "400021"},
-
-    # --- KODAGU (Code 12) ---
-    "Madikeri Town Police Station": {"ward": "001", "reg_no": "120001"},
-    "Madikeri Rural Police Station": {"ward": "005", "reg_no": "120005"},
-    "Virajpet Town Police Station": {"ward": "010", "reg_no": "120010"},
-    "Somwarpet Police Station": {"ward": "020", "reg_no": "120020"},
-    "Kushalnagar Town Police Station": {"ward": "030", "reg_no": "120030"},
-    "Gonikoppa Police Station": {"ward": "040", "reg_no": "120040"},
-    "Ponnampet Police Station": {"ward": "050", "reg_no": "120050"},
-    "Siddapura Police Station": {"ward": "060", "reg_no": "120060"},
-
-    # --- DAKSHINA KANNADA (Code 21) ---
-    "Puttur Town Police Station": {"ward": "001", "reg_no": "210001"},
-    "Puttur Rural Police Station": {"ward": "005", "reg_no": "210005"},
-    "Dakshina Kannada Puttur Police Station": {"ward": "006", "reg_no": "210006"},
-    "Bantwal Town Police Station": {"ward": "010", "reg_no": "210010"},
-    "Bantwal Rural Police Station": {"ward": "011", "reg_no": "210011"},
-    "Belthangady Police Station": {"ward": "020", "reg_no": "210020"},
-    "Sullia Police Station": {"ward": "030", "reg_no": "210030"},
-    "Subramanya Police Station": {"ward": "040", "reg_no": "210040"},
-    "Uppinangady Police Station": {"ward": "050", "reg_no": "210050"},
-    "Vittal Police Station": {"ward": "060", "reg_no": "210060"},
-    "Moodbidri Police Station": {"ward": "070", "reg_no": "210070"}
-}
-
-STATION_NAMES = sorted(list(POLICE_DATABASE.keys()))
+# Station names, wards and registration numbers live in data/police_stations.csv
+station_registry = StationRegistry.from_csv(app.config['STATION_REGISTRY_PATH'])
 
 # --- DATABASE CONNECTION ---
+# Per-request breakdown of Mongo, geocoder, bcrypt and template time (see REQUEST METRICS)
+request_metrics = RequestMetrics()
+pool_metrics = PoolMetrics()
+command_metrics = CommandMetrics(slow_ms=app.config['MONGODB_SLOW_COMMAND_MS'],
+                                 observer=lambda seconds: request_metrics.add('mongo', seconds))
+
 def get_mongodb_connection():
-    mongodb_uri = app.config['MONGODB_URI']
-    print(f"🔗 Connecting to MongoDB Atlas...")
-    try:
-        client = MongoClient(mongodb_uri, retryWrites=True, w='majority')
-        client.admin.command('ismaster')
-        print("✅ MongoDB Atlas connection successful!")
-        db_name = 'SwiftAid'
-        return client, db_name
-    except Exception as e:
-        print(f"❌ MongoDB Atlas connection failed: {e}")
-        raise e
-
-# Initialize MongoDB connection
-try:
-    client, db_name = get_mongodb_connection()
-    db = client[db_name]
-    print("✅ Database connection established.")
-except Exception as e:
-    print(f"❌ Critical Error: {e}")
-    exit(1)
+    """Client that connects on first use; building it still resolves a mongodb+srv:// URI"""
+    return MongoClient(app.config['MONGODB_URI'], retryWrites=True, w='majority', connect=False,
+                       serverSelectionTimeoutMS=app.config['MONGODB_SERVER_SELECTION_TIMEOUT_MS'],
+                       maxPoolSize=app.config['MONGODB_MAX_POOL_SIZE'],
+                       minPoolSize=app.config['MONGODB_MIN_POOL_SIZE'],
+                       waitQueueTimeoutMS=app.config['MONGODB_WAIT_QUEUE_TIMEOUT_MS'],
+                       event_listeners=[pool_metrics, command_metrics])
+
+# Built on first use, so importing the app (web workers, report job processes) does no
+# DNS or network I/O at all; reachability is reported by /readyz
+client = Deferred(get_mongodb_connection)
+db = Deferred(lambda: client[app.config['MONGODB_DB_NAME']])
+
+def lazy_collection(name):
+    return Deferred(lambda: db[name])
 
 # Collections
-POLICE_users = db.POLICE_users
-incidents_collection = db.incidents
-incidents_police_collection = db.incidents_police
-police_officers_collection = db.police_officers
-assigned_cases_collection = db.ASSIGNED_CASES
-police_stations_collection = db.police_stations
-
-# --- DATABASE OPTIMIZATION ---
-def init_indexes():
-    """Create indexes to speed up queries"""
+POLICE_users = lazy_collection('POLICE_users')
+incidents_collection = lazy_collection('incidents')
+incidents_police_collection = lazy_collection('incidents_police')
+police_officers_collection = lazy_collection('police_officers')
+assigned_cases_collection = lazy_collection('ASSIGNED_CASES')
+police_stations_collection = lazy_collection('police_stations')
+geocode_cache_collection = lazy_collection('geocode_cache')
+incident_sync_collection = lazy_collection('incident_sync')
+incident_tombstones_collection = lazy_collection('incident_tombstones')
+incident_stats_collection = lazy_collection('incident_stats')
+incident_rollups_collection = lazy_collection('incident_rollups')
+rate_limits_collection = lazy_collection('rate_limits')
+
+# --- INCIDENT SYNC SEQUENCE ---
+# Every incident write stamps the document with the next value of a single counter
+# ('sync_seq'), so clients can ask for "everything after N" and the current value
+# doubles as a cheap version for ETags. A reservation stays listed under 'pending' until
+# its write is done, and the watermark handed to clients stays below it meanwhile.
+@contextmanager
+def reserve_sync_seq(n=1):
+    """Reserve n sequence numbers for the write inside the block, yields the last one"""
+    token = ObjectId()
+    expires_at = datetime.now(IST) + timedelta(seconds=app.config['SYNC_SEQ_RESERVATION_SECONDS'])
+    doc = incident_sync_collection.find_one_and_update({'_id': 'incidents'}, [
+        {'$set': {'seq': {'$add': [{'$ifNull': ['$seq', 0]}, n]}}},
+        # Reservations of writers that died mid-write expire instead of holding the watermark back
+        {'$set': {'pending': {'$concatArrays': [
+            {'$filter': {'input': {'$ifNull': ['$pending', []]}, 'cond': {'$gt': ['$$this.expires_at', '$$NOW']}}},
+            [{'token': token, 'first': {'$subtract': ['$seq', n - 1]}, 'expires_at': expires_at}]
+        ]}}}
+    ], upsert=True, return_document=ReturnDocument.AFTER)
     try:
-        print("🚀 Optimizing database with indexes...")
-        incidents_police_collection.create_index([("created_at", -1)])
-        incidents_police_collection.create_index([("status", 1)])
-        incidents_police_collection.create_index([("severity", 1)])
-        incidents_police_collection.create_index([("assigned_officer", 1)])
-        
-        incidents_collection.create_index([("created_at", -1)])
-        incidents_collection.create_index([("status", 1)])
-        
-        assigned_cases_collection.create_index([("incident_id", 1)])
-        assigned_cases_collection.create_index([("assigned_officer", 1)])
-        
-        POLICE_users.create_index([("username", 1)])
-        police_officers_collection.create_index([("police_station", 1)])
-        print("✅ Database indexes created successfully!")
-    except Exception as e:
-        print(f"⚠️ Index creation warning: {e}")
-
-init_indexes()
-
-# Fix existing data issues (Legacy Cleanup)
-def fix_existing_null_usernames():
-    try:
-        police_officers_collection.update_many({'username': None}, {'$set': {'username': ''}})
-        police_officers_collection.update_many({'username': {'$exists': False}}, {'$set': {'username': ''}})
-    except Exception:
-        pass
-
-def fix_police_officers_index():
+        yield doc['seq']
+    finally:
+        incident_sync_collection.update_one({'_id': 'incidents'}, {'$pull': {'pending': {'token': token}}})
+
+def sync_state():
+    """(last reserved sequence number, watermark): everything at or below the watermark is written"""
+    doc = incident_sync_collection.with_options(codec_options=VIEW_CODEC_OPTIONS).find_one({'_id': 'incidents'})
+    if not doc:
+        return 0, 0
+    now = datetime.now(IST)
+    pending = [p['first'] for p in doc.get('pending', []) if p['expires_at'] > now]
+    return doc['seq'], min(pending) - 1 if pending else doc['seq']
+
+def record_tombstone(source, incident_id):
+    """Remember a deleted incident so delta clients can drop it; repeats are ignored"""
+    if incident_tombstones_collection.find_one({'_id': str(incident_id)}, {'_id': 1}):
+        return
+    with reserve_sync_seq() as seq:
+        try:
+            incident_tombstones_collection.insert_one({
+                '_id': str(incident_id),
+                'source': source,
+                'sync_seq': seq,
+                'deleted_at': datetime.now(IST)
+            })
+        except DuplicateKeyError:
+            pass
+
+# --- REVERSE GEOCODER ---
+geocode_cache = GeocodeCache(
+    geocode_cache_collection,
+    precision=app.config['GEOCODE_PRECISION'],
+    ttl=timedelta(days=app.config['GEOCODE_CACHE_TTL_DAYS']),
+    negative_ttl=timedelta(hours=app.config['GEOCODE_NEGATIVE_TTL_HOURS']),
+    max_entries=app.config['GEOCODE_CACHE_SIZE']
+)
+# Nominatim's usage policy allows one request per second per application, not per
+# worker process; the local bucket only paces this process while MongoDB is unreachable
+nominatim_limiter = SharedRateLimiter(rate_limits_collection, 'nominatim', app.config['GEOCODE_RATE_PER_SEC'],
+                                      fallback=TokenBucket(app.config['GEOCODE_RATE_PER_SEC']))
+nominatim = NominatimGeocoder(app.config['NOMINATIM_URL'], limiter=nominatim_limiter,
+                              observer=lambda seconds: request_metrics.add('nominatim', seconds))
+offline_geocoder = OfflineGeocoder.from_csv(app.config['OFFLINE_GEOCODER_PATH'], max_km=app.config['OFFLINE_GEOCODER_MAX_KM'])
+geocoder = CachedGeocoder(geocode_cache, FallbackResolver(
+    offline_geocoder, nominatim if app.config['GEOCODE_ONLINE_FALLBACK'] else None))
+batch_geocoder = Deferred(lambda: BatchGeocoder(geocoder, max_workers=app.config['GEOCODE_BATCH_WORKERS']))
+ADDRESS_PENDING = 'Resolving address…'
+
+def store_resolved_address(source, incident_id, lat, lng, address, resolved):
+    """Write an enriched address back onto the incident and its view"""
+    collection = incidents_police_collection if source == 'police' else incidents_collection
+    if not resolved:
+        address = f"Location at {lat}, {lng}"
+    with reserve_sync_seq() as seq:
+        collection.update_one({'_id': incident_id}, {'$set': {
+            'address': address or 'Address not found',
+            'view.address': address or 'Address not found',
+            'address_status': 'resolved' if resolved else 'failed',
+            'updated_at': datetime.now(IST),
+            'sync_seq': seq
+        }})
+
+address_enricher = Deferred(lambda: AddressEnricher(
+    geocoder, store_resolved_address,
+    workers=app.config['GEOCODE_WORKERS'],
+    queue_size=app.config['GEOCODE_QUEUE_SIZE'],
+    max_retries=app.config['GEOCODE_MAX_RETRIES']
+))
+
+def enqueue_pending_addresses(limit=1000):
+    """Re-queue incidents still waiting for an address (e.g. after a restart)"""
+    for source, collection in (('police', incidents_police_collection), ('public', incidents_collection)):
+        try:
+            for raw in collection.find({'address_status': 'pending'}, {'view.latitude': 1, 'view.longitude': 1}).limit(limit):
+                view = raw.get('view') or {}
+                if 'latitude' in view:
+                    address_enricher.submit(source, raw['_id'], view['latitude'], view['longitude'])
+        except Exception as e:
+            print(f"⚠️ Pending address sweep failed: {e}")
+
+# --- DATABASE MIGRATIONS ---
+# Index builds and data fixes run once per deploy via `flask migrate`, not at import;
+# add new ones with the next version number and never edit an applied migration.
+migration_runner = MigrationRunner(lazy_collection('schema_migrations'))
+
+@migration_runner.register(1, 'Create incident, user and cache indexes')
+def create_indexes():
+    incidents_police_collection.create_index([("created_at", -1)])
+    incidents_police_collection.create_index([("status", 1)])
+    incidents_police_collection.create_index([("severity", 1)])
+    incidents_police_collection.create_index([("assigned_officer", 1)])
+    incidents_police_collection.create_index([("view_version", 1)])
+    incidents_police_collection.create_index([("location", "2dsphere")])
+    incidents_police_collection.create_index([("view.created_at", -1)])
+    incidents_police_collection.create_index([("view.severity", 1), ("view.created_at", -1)])
+    incidents_police_collection.create_index([("view.status", 1), ("view.created_at", -1)])
+    incidents_police_collection.create_index([("view.reported_by", 1), ("view.created_at", -1)])
+    incidents_police_collection.create_index([("updated_at", -1)])
+    incidents_police_collection.create_index([("police_station", 1), ("view.created_at", -1)])
+    incidents_police_collection.create_index([("police_station", 1), ("view.status", 1)])
+    
+    incidents_collection.create_index([("created_at", -1)])
+    incidents_collection.create_index([("status", 1)])
+    incidents_collection.create_index([("view_version", 1)])
+    incidents_collection.create_index([("location", "2dsphere")])
+    incidents_collection.create_index([("view.created_at", -1)])
+    incidents_collection.create_index([("view.severity", 1), ("view.created_at", -1)])
+    incidents_collection.create_index([("updated_at", -1)])
+    incidents_collection.create_index([("police_station", 1), ("view.created_at", -1)])
+    incidents_collection.create_index([("police_station", 1), ("view.status", 1)])
+    incidents_collection.create_index([("sync_seq", 1)])
+    incidents_police_collection.create_index([("sync_seq", 1)])
+    incident_tombstones_collection.create_index([("sync_seq", 1)])
+    incident_tombstones_collection.create_index([("deleted_at", 1)], expireAfterSeconds=app.config['INCIDENT_TOMBSTONE_TTL_DAYS'] * 86400)
+    
+    assigned_cases_collection.create_index([("incident_id", 1)])
+    assigned_cases_collection.create_index([("assigned_officer", 1)])
+    
+    POLICE_users.create_index([("username", 1)])
+    POLICE_users.create_index([("police_station", 1), ("police_station_reg_no", 1)])
+    police_officers_collection.create_index([("police_station", 1)])
+    geocode_cache.ensure_indexes()
+    incidents_police_collection.create_index([("address_status", 1)], sparse=True)
+    incidents_collection.create_index([("address_status", 1)], sparse=True)
+
+@migration_runner.register(2, 'Drop the unique username index on police officers')
+def drop_officer_username_index():
+    for index in police_officers_collection.list_indexes():
+        if 'username' in index['key']:
+            police_officers_collection.drop_index(index['name'])
+
+@migration_runner.register(3, 'Replace missing officer usernames with empty strings')
+def fix_null_officer_usernames():
+    police_officers_collection.update_many({'username': None}, {'$set': {'username': ''}})
+    police_officers_collection.update_many({'username': {'$exists': False}}, {'$set': {'username': ''}})
+
+@migration_runner.register(4, 'Index public incident views by status')
+def index_public_view_status():
+    # Added for the resolved count in /api/database-stats, which migration 5's counters now
+    # answer; it still serves ?status= on state-wide exports (parse_export_filters), police
+    # incidents got the same index in migration 1
+    incidents_collection.create_index([("view.status", 1), ("view.created_at", -1)])
+
+@migration_runner.register(5, 'Build the incident_stats counters')
+def build_incident_stats():
+    # Index-only: migration 7 does the one recount that fills incident_stats (and the rollups)
+    incidents_collection.create_index([("assigned_officer", 1)])
+    db.resolved_cases.create_index([("police_station", 1)])
+
+@migration_runner.register(6, 'Build the hourly incident rollups')
+def build_incident_rollups():
+    incident_rollups_collection.create_index([("scope", 1), ("hour", 1)])
+    incident_rollups_collection.create_index([("updated_at", 1)])
+
+@migration_runner.register(7, 'Scope public SOS by district and recount')
+def scope_public_incidents_by_district():
+    for collection in (incidents_police_collection, incidents_collection):
+        collection.create_index([("police_station", 1), ("district_code", 1), ("view.created_at", -1)])
+    # The only recount among the migrations: rebuilds every view at version 4, then fills
+    # incident_stats (station, district, untagged, global) and the hourly rollups
+    reconcile_incident_stats()
+
+@migration_runner.register(8, 'Keep change stream pre-images of incidents')
+def enable_incident_pre_images():
+    # Lets the live feed tell which station a deleted incident belonged to. Pre-images
+    # live as long as the oplog; servers before 6.0 don't support them and keep working without.
+    for collection in (incidents_police_collection, incidents_collection):
+        try:
+            db.command('collMod', collection.name, changeStreamPreAndPostImages={'enabled': True})
+        except OperationFailure as e:
+            print(f"⚠️ Pre-images not enabled on {collection.name}: {e}")
+
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations and whether they have been applied')
+def migrate_command(status):
+    """Apply pending database migrations"""
+    if status:
+        for m in migration_runner.status():
+            state = m['applied_at'].strftime('%Y-%m-%d %H:%M') if m['applied_at'] else 'pending'
+            print(f"{m['version']:>4}  {state:<16}  {m['name']}")
+        return
     try:
-        indexes = list(police_officers_collection.list_indexes())
-        username_index = next((index for index in indexes if 'username' in index['key']), None)
-        if username_index:
-            police_officers_collection.drop_index(username_index['name'])
-    except Exception:
-        pass
-
-fix_police_officers_index()
-fix_existing_null_usernames()
+        applied = migration_runner.run()
+    except MigrationLockedError as e:
+        raise click.ClickException(str(e))
+    print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Database is up to date")
 
 # --- LOGIN & AUTHENTICATION ---
 login_manager = LoginManager()
@@ -477,34 +310,71 @@ class User(UserMixin):
         self.designation = user_data.get('designation', 'Police Officer')
         self.created_at = user_data.get('created_at', datetime.now(IST))
 
+# Saves a POLICE_users round trip on every authenticated request, including map polls
+user_cache = TTLCache(ttl=app.config['USER_CACHE_TTL_SECONDS'], max_entries=app.config['USER_CACHE_MAX_ENTRIES'])
+
 @login_manager.user_loader
 def load_user(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
     try:
         user_data = POLICE_users.find_one({'_id': ObjectId(user_id)})
         if user_data:
-            return User(user_data)
+            user = User(user_data)
+            user_cache.put(user_id, user)
+            return user
     except Exception:
         pass
     return None
 
+# bcrypt runs on its own threads so a burst of logins can't occupy every request thread
+password_hasher = Deferred(lambda: PasswordHasher(rounds=app.config['BCRYPT_ROUNDS'], workers=app.config['BCRYPT_WORKERS'],
+                                                 max_pending=app.config['BCRYPT_MAX_PENDING']))
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with request_metrics.timed('bcrypt'):
+        return password_hasher.hash(password)
 
 def check_password(hashed_password, password):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    with request_metrics.timed('bcrypt'):
+        return password_hasher.verify(hashed_password, password)
+
+def upgrade_password_hash(user_data, password):
+    """Re-hash a verified password in the background when its cost differs from BCRYPT_ROUNDS"""
+    if password_hasher.needs_rehash(user_data['password_hash']):
+        user_id = user_data['_id']
+        password_hasher.rehash_async(password, lambda hashed: POLICE_users.update_one(
+            {'_id': user_id}, {'$set': {'password_hash': hashed}}))
 
 # --- HELPER FUNCTIONS ---
-def get_address_from_coordinates(lat, lng):
+def fill_pending_addresses(incidents):
+    """Resolve addresses still pending on a list of incidents, one lookup per distinct location"""
+    pending = [d for d in incidents if d.get('address') == ADDRESS_PENDING]
+    if not pending:
+        return incidents
+    # Lookups run on the geocoder's pool threads; the request's share is the time spent waiting here
+    with request_metrics.timed('geocode'):
+        resolved = batch_geocoder.resolve_many(
+            [(d['latitude'], d['longitude']) for d in pending],
+            timeout=app.config['GEOCODE_BATCH_TIMEOUT'])
+    for d in pending:
+        key = geocode_cache.key(d['latitude'], d['longitude'])
+        if key in resolved:
+            d['address'] = resolved[key] or 'Address not found'
+        else:
+            d['address'] = f"Location at {d['latitude']}, {d['longitude']}"
+    return incidents
+
+def cached_address(lat, lng):
+    """Non-blocking lookup: the cached address, or None until the enricher resolves it"""
     try:
-        url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lng}&zoom=18&addressdetails=1"
-        headers = {'User-Agent': 'SwiftAid Police System/1.0'}
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('display_name', 'Address not found')
-        return f"Location at {lat}, {lng}"
+        found, address = geocode_cache.get(lat, lng)
     except Exception:
-        return f"Location at {lat}, {lng}"
+        return None
+    if found:
+        return address or 'Address not found'
+    return None
 
 def convert_to_ist(dt):
     """Helper to convert any datetime to IST"""
@@ -530,7 +400,7 @@ def process_public_incident(incident):
             incident_type = "Possible Accident"
         
         severity = "high" if (incident.get('speed', 0) > 0) else ("medium" if incident.get('accel_mag', 0) > 1.0 else "low")
-        address = get_address_from_coordinates(lat, lng)
+        address = incident.get('address') or cached_address(lat, lng) or ADDRESS_PENDING
         created_at = convert_to_ist(incident.get('timestamp') or incident.get('created_at'))
 
         return {
@@ -597,53 +467,680 @@ def assign_case_to_officer(incident_id, source, assigned_officer, incident_data)
         print(f"Error assigning case: {e}")
         return None
 
+# --- NORMALIZED INCIDENT VIEW ---
+# Each incident document carries a ready-to-render copy of its processed form under
+# 'view', written on insert/update so read paths don't re-run process_*_incident().
+# Version 3 added the owning police_station / district_code; version 4 stopped tagging
+# public SOS with a single station (see incident_jurisdiction).
+INCIDENT_VIEW_VERSION = 4
+EARTH_RADIUS_M = 6378100.0
+VIEW_CODEC_OPTIONS = CodecOptions(tz_aware=True, tzinfo=IST)
+
+def incident_jurisdiction(view, station_name=None):
+    """(police_station, district_code) an incident belongs to.
+
+    Police incidents belong to the reporting station. Anything else only gets the district
+    of the nearest registered station: station coordinates are town level and many stations
+    share one point, so a single-station tag would hide an SOS from its neighbours. Beyond
+    STATION_TAG_MAX_KM both stay None and every station sees the incident.
+    """
+    station = station_registry.get(station_name) if station_name else None
+    if station:
+        return station['name'], station['reg_no'][:2]
+    if view['latitude'] or view['longitude']:
+        nearest, _ = station_registry.nearest(view['latitude'], view['longitude'], app.config['STATION_TAG_MAX_KM'])
+        if nearest:
+            return None, nearest['reg_no'][:2]
+    return None, None
+
+def build_incident_view(incident, source, station_name=None):
+    """Process a raw incident into the stored view sub-document, tagged with its jurisdiction"""
+    d = process_police_incident(incident) if source == 'police' else process_public_incident(incident)
+    if d:
+        d.pop('_id', None)
+        if source == 'police':
+            station_name = incident.get('police_station') or station_name
+        else:
+            station_name = None
+        d['police_station'], d['district_code'] = incident_jurisdiction(d, station_name)
+    return d
+
+def geo_point(lat, lng):
+    """GeoJSON point for the 2dsphere index, None for coordinates it would reject"""
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return {'type': 'Point', 'coordinates': [lng, lat]}
+    return None
+
+def view_fields(view):
+    """$set payload that stores a freshly built view on the source document"""
+    fields = {'view': view, 'view_version': INCIDENT_VIEW_VERSION,
+              'police_station': view['police_station'], 'district_code': view['district_code']}
+    location = geo_point(view['latitude'], view['longitude'])
+    if location:
+        fields['location'] = location
+    return fields
+
+def parse_geo_filter(args):
+    """Build a $geoWithin match from ?bbox=west,south,east,north or ?near=lat,lng&radius=metres"""
+    if args.get('bbox'):
+        west, south, east, north = [float(v) for v in args['bbox'].split(',')]
+        # Leaflet reports bounds past the antimeridian when zoomed far out
+        west, east = max(west, -180.0), min(east, 180.0)
+        south, north = max(south, -90.0), min(north, 90.0)
+        if west >= east or south >= north:
+            raise ValueError('bbox must be west,south,east,north in degrees')
+        if east - west >= 180:
+            # A polygon this wide is read as its complement (or rejected at exactly 360°),
+            # and a view that wide shows everything anyway
+            return None
+        ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+        return {'location': {'$geoWithin': {'$geometry': {'type': 'Polygon', 'coordinates': [ring]}}}}
+    if args.get('near'):
+        lat, lng = [float(v) for v in args['near'].split(',')]
+        radius = float(args.get('radius', 5000))
+        if radius <= 0:
+            raise ValueError('radius must be positive')
+        # $nearSphere isn't allowed inside an aggregation, $centerSphere uses the same index
+        return {'location': {'$geoWithin': {'$centerSphere': [[lng, lat], radius / EARTH_RADIUS_M]}}}
+    return None
+
+def refresh_incident_views(source, ids):
+    """Rebuild and persist the view for the given incident ids, returns {_id: view}"""
+    collection = incidents_police_collection if source == 'police' else incidents_collection
+    views, updates, unresolved = {}, [], []
+    raws = list(collection.find({'_id': {'$in': list(ids)}}))
+    reporter_stations = {}
+    if source == 'police':
+        # One lookup for the stations of every reporting account in the batch
+        usernames = list({raw.get('reported_by') for raw in raws if raw.get('reported_by')})
+        reporter_stations = {u['username']: u.get('police_station')
+                             for u in POLICE_users.find({'username': {'$in': usernames}}, {'username': 1, 'police_station': 1})}
+    assigned = set(assigned_cases_collection.distinct('incident_id', {'incident_id': {'$in': [str(raw['_id']) for raw in raws]}}))
+    stats_changes = []
+    for raw in raws:
+        view = build_incident_view(raw, source, reporter_stations.get(raw.get('reported_by')))
+        if view:
+            views[raw['_id']] = view
+            snapshot = stats_snapshot(view, source, str(raw['_id']) in assigned)
+            fields = dict(view_fields(view), updated_at=datetime.now(IST), stats_counted=snapshot)
+            if view['address'] == ADDRESS_PENDING:
+                fields['address_status'] = 'pending'
+                unresolved.append((raw['_id'], view))
+            updates.append((raw['_id'], raw.get('stats_counted'), fields))
+    if updates:
+        # Every write is conditional on the snapshot read above, so of two processes rebuilding
+        # the same document only the one whose write lands moves the counters
+        same, changed = [], []
+        with reserve_sync_seq(len(updates)) as last_seq:
+            for seq, (_id, counted, fields) in enumerate(updates, last_seq - len(updates) + 1):
+                op = ({'_id': _id, 'stats_counted': counted}, {'$set': dict(fields, sync_seq=seq)})
+                (same if counted == fields['stats_counted'] else changed).append(op)
+            if same:
+                collection.bulk_write([UpdateOne(*op) for op in same], ordered=False)
+            # bulk_write only reports a total, so writes that move counters go one at a time
+            for query, update in changed:
+                if collection.update_one(query, update).matched_count:
+                    stats_changes.append((query['stats_counted'], update['$set']['stats_counted']))
+        apply_stats_changes(stats_changes)
+    for _id, view in unresolved:
+        address_enricher.submit(source, _id, view['latitude'], view['longitude'])
+    return views
+
+def repair_stale_views(batch_size=500, rebuild_all=False):
+    """Rebuild views that are missing or from an older INCIDENT_VIEW_VERSION, returns {source: count}.
+
+    An edit another app makes to an incident's raw fields leaves view_version alone, so it
+    isn't found here: the tombstone recorder rebuilds those from the change stream (see
+    refresh_changed_incident). Without change streams they stay stale until
+    `flask backfill-views --all` (rebuild_all) rewrites every view.
+    """
+    repaired = {}
+    query = {} if rebuild_all else {'view_version': {'$ne': INCIDENT_VIEW_VERSION}}
+    for source, collection in (('police', incidents_police_collection), ('public', incidents_collection)):
+        total = 0
+        ids = []
+        for raw in collection.find(query, {'_id': 1}):
+            ids.append(raw['_id'])
+            if len(ids) >= batch_size:
+                total += len(refresh_incident_views(source, ids))
+                ids = []
+        if ids:
+            total += len(refresh_incident_views(source, ids))
+        repaired[source] = total
+    return repaired
+
+_views_repaired_at = None
+_view_repair_lock = threading.Lock()
+
+def throttled_view_repair(batch_size=500):
+    """repair_stale_views() for request paths: at most once every VIEW_REPAIR_INTERVAL_SECONDS per process.
+
+    A request that finds another one repairing goes ahead without waiting. With change
+    streams the tombstone recorder builds views of new SOS as they arrive, so this only
+    catches what it missed; without them a new public SOS can take one interval to show up
+    in station-scoped lists.
+    """
+    global _views_repaired_at
+    if not _view_repair_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        if _views_repaired_at is not None and now - _views_repaired_at < app.config['VIEW_REPAIR_INTERVAL_SECONDS']:
+            return
+        repair_stale_views(batch_size)
+        _views_repaired_at = now
+    finally:
+        _view_repair_lock.release()
+
+def backfill_incident_views(batch_size=500, rebuild_all=False):
+    """Write the normalized view onto every incident that is missing it or is stale"""
+    for source, total in repair_stale_views(batch_size, rebuild_all).items():
+        print(f"✅ Backfilled {total} {source} incident views")
+
+@app.cli.command('backfill-views')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild every view, not only missing or outdated ones')
+def backfill_views_command(rebuild_all):
+    """Backfill normalized incident views for existing data"""
+    backfill_incident_views(rebuild_all=rebuild_all)
+
+# --- INCIDENT COUNTERS ---
+# incident_stats holds one document per station, per district (public SOS), 'untagged'
+# and a 'global' one, moved with $inc wherever a view is written or an incident is first
+# assigned. Each incident remembers what it was counted as ('stats_counted'), so a rebuilt
+# view only moves the difference. incident_rollups does the same per IST hour, with counts
+# by type, severity and source inside the document, so a 90 day trend reads at most ~2,160
+# documents per counter scope (a station view is made of three, see counter_scope).
+# Deletes made by other apps aren't seen here; `flask reconcile-stats` recounts everything.
+def rollup_hour(created_at):
+    """Start of the IST hour an incident falls in, as the ISO string stored in stats_counted"""
+    return convert_to_ist(created_at).replace(minute=0, second=0, microsecond=0).isoformat()
+
+def stats_snapshot(view, source, assigned):
+    return {'station': view.get('police_station'), 'district': view.get('district_code'), 'source': source,
+            'status': view['status'], 'severity': view['severity'], 'assigned': bool(assigned),
+            'type': view['incident_type'], 'hour': rollup_hour(view['created_at'])}
+
+def stats_fields(snapshot):
+    return ['total', f"source.{snapshot['source']}", f"status.{snapshot['status']}",
+            f"severity.{snapshot['severity']}", 'assigned' if snapshot['assigned'] else 'unassigned']
+
+def stats_doc_ids(snapshot):
+    if snapshot['station']:
+        return ['global', f"station:{snapshot['station']}"]
+    if snapshot.get('district'):
+        return ['global', f"district:{snapshot['district']}"]
+    return ['global', 'untagged']
+
+def rollup_key(value):
+    # Incident types are free text; '.' and a leading '$' aren't allowed in field names
+    return str(value).replace('.', '_').lstrip('$') or '-'
+
+def rollup_fields(snapshot):
+    return ['total', f"source.{rollup_key(snapshot['source'])}", f"incident_type.{rollup_key(snapshot['type'])}",
+            f"severity.{rollup_key(snapshot['severity'])}"]
+
+def rollup_doc_ids(snapshot):
+    return [(scope, f"{scope}|{snapshot['hour']}") for scope in stats_doc_ids(snapshot)]
+
+def add_counts(incs, doc_id, fields, step):
+    inc = incs.setdefault(doc_id, {})
+    for field in fields:
+        inc[field] = inc.get(field, 0) + step
+
+def apply_stats_changes(changes):
+    """One $inc per counter and rollup document for a list of (old snapshot, new snapshot) pairs"""
+    incs, rollup_incs, rollup_keys = {}, {}, {}
+    for old, new in changes:
+        for snapshot, step in ((old, -1), (new, 1)):
+            if not snapshot:
+                continue
+            for doc_id in stats_doc_ids(snapshot):
+                add_counts(incs, doc_id, stats_fields(snapshot), step)
+            # Snapshots taken before the rollups existed were never added to them
+            if 'hour' not in snapshot:
+                continue
+            for scope, doc_id in rollup_doc_ids(snapshot):
+                add_counts(rollup_incs, doc_id, rollup_fields(snapshot), step)
+                rollup_keys[doc_id] = (scope, snapshot['hour'])
+    now = datetime.now(IST)
+    ops = [UpdateOne({'_id': doc_id}, {'$inc': {k: v for k, v in inc.items() if v}, '$set': {'updated_at': now}}, upsert=True)
+           for doc_id, inc in incs.items() if any(inc.values())]
+    if ops:
+        incident_stats_collection.bulk_write(ops, ordered=False)
+    ops = [UpdateOne({'_id': doc_id}, {'$inc': {k: v for k, v in inc.items() if v}, '$set': {'updated_at': now},
+                                       '$setOnInsert': {'scope': rollup_keys[doc_id][0],
+                                                        'hour': datetime.fromisoformat(rollup_keys[doc_id][1])}},
+                    upsert=True)
+           for doc_id, inc in rollup_incs.items() if any(inc.values())]
+    if ops:
+        incident_rollups_collection.bulk_write(ops, ordered=False)
+
+def incident_counts(doc_ids=('global',)):
+    """Counters summed over the given counter documents (see counter_scope())"""
+    counts = {'total': 0, 'source': {}, 'status': {}, 'severity': {}, 'assigned': 0, 'unassigned': 0}
+    for doc in incident_stats_collection.find({'_id': {'$in': list(doc_ids)}}):
+        for field, value in counts.items():
+            if isinstance(value, dict):
+                for key, count in doc.get(field, {}).items():
+                    value[key] = value.get(key, 0) + count
+            else:
+                counts[field] += doc.get(field, 0)
+    return counts
+
+def count_into(doc, fields):
+    for field in fields:
+        if '.' in field:
+            group, key = field.split('.', 1)
+            doc[group][key] = doc[group].get(key, 0) + 1
+        else:
+            doc[field] += 1
+
+def reconcile_incident_stats(batch_size=500):
+    """Recount every incident, rewrite its stats_counted and replace incident_stats and incident_rollups; returns the count"""
+    repair_stale_views(batch_size)
+    assigned = {a['incident_id'] for a in assigned_cases_collection.find({}, {'incident_id': 1, '_id': 0})}
+    totals, rollups = {}, {}
+    counted = 0
+    for source, collection in (('police', incidents_police_collection), ('public', incidents_collection)):
+        fixes = []
+        projection = {'view.police_station': 1, 'view.district_code': 1, 'view.status': 1, 'view.severity': 1, 'view.incident_type': 1,
+                      'view.created_at': 1, 'stats_counted': 1}
+        for raw in collection.find({'view_version': INCIDENT_VIEW_VERSION}, projection).batch_size(batch_size):
+            snapshot = stats_snapshot(raw['view'], source, str(raw['_id']) in assigned)
+            for doc_id in stats_doc_ids(snapshot):
+                doc = totals.setdefault(doc_id, {'total': 0, 'source': {}, 'status': {}, 'severity': {}, 'assigned': 0, 'unassigned': 0})
+                count_into(doc, stats_fields(snapshot))
+            for scope, doc_id in rollup_doc_ids(snapshot):
+                doc = rollups.setdefault(doc_id, {'scope': scope, 'hour': datetime.fromisoformat(snapshot['hour']),
+                                                  'total': 0, 'source': {}, 'incident_type': {}, 'severity': {}})
+                count_into(doc, rollup_fields(snapshot))
+            if raw.get('stats_counted') != snapshot:
+                fixes.append(UpdateOne({'_id': raw['_id']}, {'$set': {'stats_counted': snapshot}}))
+                if len(fixes) >= batch_size:
+                    collection.bulk_write(fixes, ordered=False)
+                    fixes = []
+            counted += 1
+        if fixes:
+            collection.bulk_write(fixes, ordered=False)
+    now = datetime.now(IST)
+    ops = [ReplaceOne({'_id': doc_id}, dict(doc, updated_at=now), upsert=True) for doc_id, doc in totals.items()]
+    ops.append(DeleteMany({'_id': {'$nin': list(totals)}}))
+    incident_stats_collection.bulk_write(ops, ordered=False)
+    ops = [ReplaceOne({'_id': doc_id}, dict(doc, updated_at=now), upsert=True) for doc_id, doc in rollups.items()]
+    for start in range(0, len(ops), batch_size):
+        incident_rollups_collection.bulk_write(ops[start:start + batch_size], ordered=False)
+    # Everything rewritten above carries `now`; older documents are hours that no longer have incidents
+    incident_rollups_collection.delete_many({'updated_at': {'$lt': now}})
+    return counted
+
+@app.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Rebuild the incident_stats counters and hourly rollups from the incident collections"""
+    counted = reconcile_incident_stats()
+    print(f"✅ Recounted {counted} incidents")
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups_command():
+    """Build the hourly incident rollups for existing data"""
+    counted = reconcile_incident_stats()
+    print(f"✅ Rolled up {counted} incidents into {incident_rollups_collection.estimated_document_count()} hourly documents")
+
+# --- INCIDENT READ LAYER ---
+def parse_export_filters(args):
+    """Translate ?from=&to=&severity=&status=&station= into a match on indexed view fields"""
+    match = {}
+    created = {}
+    if args.get('from'):
+        created['$gte'] = datetime.strptime(args['from'], '%Y-%m-%d').replace(tzinfo=IST)
+    if args.get('to'):
+        # 'to' is inclusive of the whole day
+        created['$lt'] = datetime.strptime(args['to'], '%Y-%m-%d').replace(tzinfo=IST) + timedelta(days=1)
+    if created:
+        match['view.created_at'] = created
+    for field in ('severity', 'status'):
+        if args.get(field):
+            match[f'view.{field}'] = args[field].lower()
+    if args.get('station'):
+        match.update(station_incident_match(args['station']))
+    return match
+
+def iter_incident_views(match=None, batch_size=500, sources=('police', 'public')):
+    """Stream police then public incident views, newest first, in chunks of batch_size"""
+    throttled_view_repair(batch_size)
+    query = dict(match or {}, view_version=INCIDENT_VIEW_VERSION)
+    for source in sources:
+        collection = incidents_police_collection if source == 'police' else incidents_collection
+        cursor = (collection.with_options(codec_options=VIEW_CODEC_OPTIONS)
+                  .find(query, {'view': 1})
+                  .sort('view.created_at', -1)
+                  .batch_size(batch_size))
+        chunk = []
+        for raw in cursor:
+            d = raw['view']
+            d['_id'] = str(raw['_id'])
+            chunk.append(d)
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def incident_data_version():
+    """Watermark that changes whenever any incident is inserted, updated or deleted"""
+    parts = []
+    for collection in (incidents_police_collection, incidents_collection):
+        latest = collection.find_one({}, {'updated_at': 1}, sort=[('updated_at', -1)])
+        newest = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        parts.append([
+            latest.get('updated_at').isoformat() if latest and latest.get('updated_at') else None,
+            str(newest['_id']) if newest else None,
+            collection.estimated_document_count()
+        ])
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+def fetch_incidents(match=None, limit=None):
+    """Load police + public incidents (the newest `limit` if given) with their assignment flag in one aggregation"""
+    branch = [{'$match': match}] if match else []
+    newest = [{'$sort': {'view.created_at': -1}}, {'$limit': limit}] if limit else []
+    pipeline = branch + newest + [
+        {'$project': {'view': 1, 'view_version': 1, '_source': {'$literal': 'police'}}},
+        {'$unionWith': {
+            'coll': incidents_collection.name,
+            'pipeline': branch + newest + [{'$project': {'view': 1, 'view_version': 1, '_source': {'$literal': 'public'}}}]
+        }},
+    ] + newest + [
+        {'$addFields': {'_sid': {'$toString': '$_id'}}},
+        {'$lookup': {
+            'from': assigned_cases_collection.name,
+            'localField': '_sid',
+            'foreignField': 'incident_id',
+            'pipeline': [{'$project': {'_id': 1}}, {'$limit': 1}],
+            'as': '_assignment'
+        }},
+        {'$addFields': {'is_assigned': {'$gt': [{'$size': '$_assignment'}, 0]}}},
+        {'$project': {'_assignment': 0, '_sid': 0}}
+    ]
+
+    results = []
+    stale = {'police': [], 'public': []}
+    collection = incidents_police_collection.with_options(codec_options=VIEW_CODEC_OPTIONS)
+    for raw in collection.aggregate(pipeline, allowDiskUse=True):
+        if raw.get('view_version') != INCIDENT_VIEW_VERSION:
+            stale[raw['_source']].append(raw)
+            continue
+        d = raw['view']
+        d['_id'] = str(raw['_id'])
+        d['is_assigned'] = raw['is_assigned']
+        results.append(d)
+
+    # Documents written before the view existed (or by the public app) are repaired once
+    for source, rows in stale.items():
+        if not rows:
+            continue
+        views = refresh_incident_views(source, [r['_id'] for r in rows])
+        for r in rows:
+            d = views.get(r['_id'])
+            if d:
+                d['_id'] = str(r['_id'])
+                d['is_assigned'] = r['is_assigned']
+                results.append(d)
+
+    # Sort by latest first
+    results.sort(key=lambda x: x['created_at'], reverse=True)
+    return results
+
+# Enum tables for the compact map payload; codes are list positions
+COMPACT_ENUMS = {
+    'source': ['police', 'public'],
+    'severity': ['low', 'medium', 'high'],
+    'status': ['active', 'pending', 'assigned', 'resolved']
+}
+
+def fetch_incident_markers(match=None):
+    """Columnar map payload: parallel arrays of ids, scaled int coordinates and enum codes"""
+    throttled_view_repair()
+    query = dict(match or {}, view_version=INCIDENT_VIEW_VERSION)
+    # Only the fields the map draws are fetched; details load per incident on demand
+    projection = {'view.latitude': 1, 'view.longitude': 1, 'view.severity': 1, 'view.status': 1}
+    scale = 10 ** app.config['COMPACT_COORD_PRECISION']
+    enums = {field: list(values) for field, values in COMPACT_ENUMS.items()}
+    codes = {field: {value: i for i, value in enumerate(values)} for field, values in enums.items()}
+    columns = {'ids': [], 'lat': [], 'lng': [], 'source': [], 'severity': [], 'status': []}
+
+    def code(field, value):
+        if value not in codes[field]:
+            # Values outside the table (e.g. a new status) are appended and still decode
+            codes[field][value] = len(enums[field])
+            enums[field].append(value)
+        return codes[field][value]
+
+    for source, collection in (('police', incidents_police_collection), ('public', incidents_collection)):
+        for raw in collection.find(query, projection).batch_size(app.config['EXPORT_BATCH_SIZE']):
+            view = raw['view']
+            columns['ids'].append(str(raw['_id']))
+            columns['lat'].append(round(view['latitude'] * scale))
+            columns['lng'].append(round(view['longitude'] * scale))
+            columns['source'].append(code('source', source))
+            columns['severity'].append(code('severity', view['severity']))
+            columns['status'].append(code('status', view['status']))
+    return dict(columns, format='compact', count=len(columns['ids']), scale=scale, enums=enums)
+
+# --- BACKGROUND ENRICHMENT ---
+_background_started = False
+
+@app.before_request
+def start_background_work():
+    # Started from the first request so it runs inside the serving worker process
+    global _background_started
+    if not _background_started:
+        _background_started = True
+        threading.Thread(target=enqueue_pending_addresses, daemon=True).start()
+        tombstone_recorder.start()
+
+def fetch_incident_clusters(zoom, match=None):
+    """Grid-bucket incidents server side: one centroid, count and severity mix per cell"""
+    cell = 360.0 / (2 ** zoom) / app.config['CLUSTER_CELLS_PER_TILE']
+    branch = ([{'$match': match}] if match else []) + [
+        {'$match': {'view.latitude': {'$exists': True}}},
+        {'$project': {'lat': '$view.latitude', 'lng': '$view.longitude', 'severity': '$view.severity'}}
+    ]
+    severity_count = lambda level: {'$sum': {'$cond': [{'$eq': ['$severity', level]}, 1, 0]}}
+    pipeline = branch + [
+        {'$unionWith': {'coll': incidents_collection.name, 'pipeline': branch}},
+        {'$group': {
+            '_id': {'x': {'$floor': {'$divide': ['$lng', cell]}}, 'y': {'$floor': {'$divide': ['$lat', cell]}}},
+            'count': {'$sum': 1},
+            'lat': {'$avg': '$lat'},
+            'lng': {'$avg': '$lng'},
+            'high': severity_count('high'),
+            'medium': severity_count('medium'),
+            'low': severity_count('low')
+        }}
+    ]
+    clusters = []
+    for c in incidents_police_collection.aggregate(pipeline, allowDiskUse=True):
+        clusters.append({
+            'lat': round(c['lat'], 6),
+            'lng': round(c['lng'], 6),
+            'count': c['count'],
+            'severity': {'high': c['high'], 'medium': c['medium'], 'low': c['low']}
+        })
+    return clusters
+
+# --- LIVE FEED ---
+def incident_event(collection_name, operation, _id, doc):
+    """Turn a changed incident document into a live feed event.
+
+    Incident events say whether they are an 'insert' or an 'update', so pages only count
+    new incidents. For deletes `doc` is the pre-image when the server keeps one; without
+    it the jurisdiction is unknown ('known': False) and the event goes to every station.
+    """
+    source = 'police' if collection_name == incidents_police_collection.name else 'public'
+    if operation == 'delete' or doc is None:
+        # Tombstones for delta sync are written by tombstone_recorder, not per watcher
+        view = (doc or {}).get('view') or {}
+        return {'type': 'deleted', 'source': source, 'id': str(_id), 'known': operation == 'delete' and doc is not None,
+                'station': view.get('police_station'), 'district': view.get('district_code')}
+    view = doc['view'] if doc.get('view_version') == INCIDENT_VIEW_VERSION else None
+    if view is None:
+        # Rebuilding the view writes the document again, which produces its own update event;
+        # an insert by the public app is announced here, with the view just built
+        view = refresh_incident_views(source, [_id]).get(_id)
+        if operation != 'insert' or view is None:
+            return None
+    d = dict(view, _id=str(_id))
+    d['is_assigned'] = assigned_cases_collection.count_documents({'incident_id': str(_id)}, limit=1) > 0
+    return {'type': 'incident', 'operation': 'insert' if operation == 'insert' else 'update', 'source': source,
+            'id': str(_id), 'station': view.get('police_station'), 'district': view.get('district_code'), 'incident': d}
+
+def live_feed_source():
+    names = [incidents_police_collection.name, incidents_collection.name]
+    # Pre-images of deleted incidents (MongoDB 6.0+, enabled by migration 8) carry their jurisdiction
+    before_change = client.server_info()['versionArray'][0] >= 6
+    stream = ChangeStreamSource(db.with_options(codec_options=VIEW_CODEC_OPTIONS), names, incident_event,
+                                before_change=before_change)
+    if app.config['LIVE_FEED_CHANGE_STREAMS'] and stream.supported():
+        print("✅ Live feed using MongoDB change streams")
+        return stream
+    print(f"⚠️ Change streams unavailable, live feed polls every {app.config['LIVE_FEED_POLL_SECONDS']}s")
+    return WatermarkTailer({
+        name: db[name].with_options(codec_options=VIEW_CODEC_OPTIONS) for name in names
+    }, incident_event, interval=app.config['LIVE_FEED_POLL_SECONDS'])
+
+live_feed = LiveFeed(live_feed_source, queue_size=app.config['LIVE_FEED_QUEUE_SIZE'])
+
+# Fields whose updates on their own don't change what a view shows
+VIEW_BOOKKEEPING_FIELDS = ('stats_counted', 'sync_seq', 'updated_at')
+
+def is_external_incident_change(change):
+    """Whether a change stream event is another app inserting or editing an incident.
+
+    This app inserts incidents with their view and updates them together with a view
+    field (or only their bookkeeping), so anything else, e.g. the public SOS app changing
+    a status, left the stored view behind the raw document.
+    """
+    operation = change['operationType']
+    if operation == 'insert':
+        return (change.get('fullDocument') or {}).get('view_version') != INCIDENT_VIEW_VERSION
+    if operation == 'replace':
+        return True
+    description = change.get('updateDescription') or {}
+    fields = list(description.get('updatedFields', {})) + list(description.get('removedFields', []))
+    if any(f.split('.')[0] in ('view', 'view_version') for f in fields):
+        return False
+    return any(f.split('.')[0] not in VIEW_BOOKKEEPING_FIELDS for f in fields)
+
+def refresh_changed_incident(source, change):
+    """Rebuild the view of an incident another app inserted or edited; the new sync_seq moves ETags"""
+    if is_external_incident_change(change):
+        refresh_incident_views(source, [change['documentKey']['_id']])
+
+# One process per deployment (whichever holds the lease) records deletes for delta sync
+# and rebuilds views of incidents other apps change, whether or not anyone has the live feed open
+tombstone_recorder = TombstoneRecorder(
+    {'police': incidents_police_collection, 'public': incidents_collection},
+    incident_sync_collection, record_tombstone,
+    use_change_streams=lambda: app.config['LIVE_FEED_CHANGE_STREAMS'] and ChangeStreamSource(db, [], None).supported(),
+    lease_ttl=app.config['TOMBSTONE_LEASE_SECONDS'],
+    interval=app.config['TOMBSTONE_SWEEP_SECONDS'],
+    on_change=refresh_changed_incident
+)
+
+# --- JURISDICTION ---
+# Stations see their own incidents; state admins can switch to every station with ?scope=state
+def state_wide_view():
+    """True while a state admin has the all-stations view on (the choice is kept in the session)"""
+    if current_user.role not in app.config['STATE_ADMIN_ROLES']:
+        return False
+    if request.args.get('scope') in ('state', 'station'):
+        session['incident_scope'] = request.args['scope']
+    return session.get('incident_scope') == 'state'
+
+def user_jurisdiction():
+    """(police_station, district_code) the current user is limited to, (None, None) when state-wide"""
+    if state_wide_view():
+        return None, None
+    station = station_registry.get(current_user.police_station)
+    district = station['reg_no'][:2] if station else (current_user.police_station_reg_no or '')[:2] or None
+    return current_user.police_station, district
+
+def station_incident_match(station_name, district=None):
+    """A station's own incidents, plus untagged ones and public SOS in its district"""
+    if district is None:
+        station = station_registry.get(station_name)
+        district = station['reg_no'][:2] if station else None
+    return {'$or': [{'police_station': station_name},
+                    {'police_station': None, 'district_code': {'$in': [district, None]}}]}
+
+def incident_scope(match=None):
+    """Limit an incident match to the current user's jurisdiction, unless state-wide"""
+    match = dict(match or {})
+    station, district = user_jurisdiction()
+    if station:
+        match.update(station_incident_match(station, district))
+    return match
+
+def station_scope(match=None):
+    """Add the current user's station to an officer or resolved case match, unless state-wide"""
+    match = dict(match or {})
+    station, _ = user_jurisdiction()
+    if station:
+        match['police_station'] = station
+    return match
+
+def counter_scope():
+    """incident_stats / incident_rollups documents that make up the current user's view"""
+    station, district = user_jurisdiction()
+    if not station:
+        return ['global']
+    return [f"station:{station}", f"district:{district}", 'untagged'] if district else [f"station:{station}", 'untagged']
+
+def in_jurisdiction(event, station, district):
+    """Whether a live feed incident or delete event is visible to the given jurisdiction"""
+    if not station or event['station'] == station:
+        return True
+    return event['station'] is None and event.get('district') in (district, None)
+
+def scoped_report_args(args):
+    """Report filters with the station pinned to the user's own outside the state-wide view"""
+    filters = {k: args[k] for k in REPORT_FILTER_KEYS if args.get(k)}
+    if not state_wide_view():
+        filters['station'] = current_user.police_station
+    return filters
+
+@app.context_processor
+def inject_incident_scope():
+    if not current_user.is_authenticated or current_user.role not in app.config['STATE_ADMIN_ROLES']:
+        return {'can_view_state': False, 'state_wide': False}
+    return {'can_view_state': True, 'state_wide': state_wide_view()}
+
 # --- ROUTES ---
 
 @app.route('/')
 @login_required
 def dashboard():
     try:
-        # Fetch ALL incidents from both collections (No Limits for Stats)
-        raw_police = list(incidents_police_collection.find().sort('created_at', -1))
-        raw_public = list(incidents_collection.find().sort('created_at', -1))
-        
-        all_incidents = []
-        
-        # Process and combine
-        for i in raw_police:
-            d = process_police_incident(i)
-            if d:
-                assignment = assigned_cases_collection.find_one({'incident_id': str(i['_id'])})
-                d['is_assigned'] = assignment is not None
-                all_incidents.append(d)
-        
-        for i in raw_public:
-            d = process_public_incident(i)
-            if d:
-                assignment = assigned_cases_collection.find_one({'incident_id': str(i['_id'])})
-                d['is_assigned'] = assignment is not None
-                all_incidents.append(d)
-        
-        # Sort by latest first
-        all_incidents.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        # Calculate Statistics for Dashboard (Fixing "No Numbers" Issue)
-        total_incidents = len(all_incidents)
-        police_count = sum(1 for x in all_incidents if x['source'] == 'police')
-        public_count = sum(1 for x in all_incidents if x['source'] == 'public')
-        high_severity_count = sum(1 for x in all_incidents if x['severity'] == 'high')
+        # Statistics come from the jurisdiction's counter document, not from loading every incident
+        scope = incident_scope()
+        throttled_view_repair()
+        counts = incident_counts(counter_scope())
+        total_incidents = counts['total']
+        police_count = counts['source'].get('police', 0)
+        public_count = counts['source'].get('public', 0)
+        high_severity_count = counts['severity'].get('high', 0)
         
-        active_incidents = sum(1 for x in all_incidents if x['status'] == 'active')
-        resolved_incidents = sum(1 for x in all_incidents if x['status'] == 'resolved')
+        active_incidents = counts['status'].get('active', 0)
+        resolved_incidents = counts['status'].get('resolved', 0)
         
-        assigned_count = sum(1 for x in all_incidents if x['is_assigned'])
-        unassigned_count = total_incidents - assigned_count
+        assigned_count = counts['assigned']
+        unassigned_count = counts['unassigned']
         
-        active_officers = police_officers_collection.count_documents({'status': 'active'})
-        user_incidents = sum(1 for x in all_incidents if x.get('assigned_officer') == current_user.username)
+        active_officers = police_officers_collection.count_documents(station_scope({'status': 'active'}))
+        mine = dict(scope, assigned_officer=current_user.username)
+        user_incidents = incidents_police_collection.count_documents(mine) + incidents_collection.count_documents(mine)
         
         # Pass 10 most recent incidents for the list
-        recent_list = all_incidents[:10]
+        recent_list = fetch_incidents(scope, limit=10)
         
         return render_template('dashboard.html', 
                              incidents=recent_list,
@@ -669,11 +1166,37 @@ def dashboard():
 @app.route('/api/get-station-data')
 def get_station_data():
     """API for registration form validation"""
-    station_name = request.args.get('station')
-    if station_name in POLICE_DATABASE:
-        return jsonify(POLICE_DATABASE[station_name])
+    station = station_registry.get(request.args.get('station'))
+    if station:
+        return jsonify({'ward': station['ward'], 'reg_no': station['reg_no']})
     return jsonify({'error': 'Station not found'}), 404
 
+# Public (login and register use it), so repeated queries are answered without searching again;
+# the registry only changes on deploy
+station_search_cache = TTLCache(ttl=86400, max_entries=app.config['STATION_SEARCH_CACHE_SIZE'])
+
+@app.route('/api/stations/search')
+def search_stations():
+    """Autocomplete for the login and registration forms: ?q=name or reg_no prefix"""
+    try:
+        limit = min(int(request.args.get('limit', 10)), app.config['STATION_SEARCH_MAX_RESULTS'])
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    query = request.args.get('q', '')
+    if len(query) > app.config['STATION_SEARCH_MAX_CHARS']:
+        return jsonify({'error': f"q must be at most {app.config['STATION_SEARCH_MAX_CHARS']} characters"}), 400
+    q = normalize_name(query)
+    if len(q) < app.config['STATION_SEARCH_MIN_CHARS']:
+        results = []
+    else:
+        results = station_search_cache.get((q, limit))
+        if results is None:
+            results = station_registry.search(q, limit)
+            station_search_cache.put((q, limit), results)
+    response = jsonify({'results': results})
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -685,28 +1208,28 @@ def register():
         
         if not all([password, confirm_password, police_station, ward_number, police_station_reg_no]):
             flash('All fields are required', 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
         
         # Validation
-        if police_station not in POLICE_DATABASE:
+        if police_station not in station_registry:
             flash('Invalid Police Station selected.', 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
             
-        real_data = POLICE_DATABASE[police_station]
+        real_data = station_registry.get(police_station)
         if real_data['ward'] != ward_number:
             flash(f"Security Alert: Ward Number mismatch. Expected: {real_data['ward']}", 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
         if real_data['reg_no'] != police_station_reg_no:
             flash(f"Security Alert: Registration Number mismatch. Expected: {real_data['reg_no']}", 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
 
         if POLICE_users.find_one({'police_station_reg_no': police_station_reg_no}):
             flash('Station already registered.', 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
         
         if password != confirm_password:
             flash('Passwords do not match', 'danger')
-            return render_template('register.html', police_stations=STATION_NAMES)
+            return render_template('register.html')
         
         try:
             base_username = re.sub(r'[^a-zA-Z0-9]', '', police_station).lower()[:15]
@@ -758,7 +1281,7 @@ def register():
         except Exception as e:
             flash(f'Registration error: {e}', 'danger')
             
-    return render_template('register.html', police_stations=STATION_NAMES)
+    return render_template('register.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -770,64 +1293,80 @@ def login():
         password = request.form.get('password')
         
         user_data = POLICE_users.find_one({'police_station': police_station, 'police_station_reg_no': reg_no})
-        if user_data and check_password(user_data['password_hash'], password):
+        try:
+            verified = bool(user_data) and check_password(user_data['password_hash'], password)
+        except HasherBusyError:
+            flash('Too many sign-ins in progress, please try again in a moment.', 'warning')
+            return render_template('login.html'), 503
+        if verified:
+            upgrade_password_hash(user_data, password)
             user = User(user_data)
             login_user(user)
+            # Seeded here so the redirect to the dashboard doesn't reload the account
+            user_cache.put(user.id, user)
             POLICE_users.update_one({'_id': user_data['_id']}, {'$set': {'last_login': datetime.now(IST)}})
             return redirect(url_for('dashboard'))
         flash('Invalid credentials', 'danger')
     
-    return render_template('login.html', registered_stations=STATION_NAMES)
+    return render_template('login.html')
 
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     return redirect(url_for('login'))
 
 @app.route('/incidents')
 @login_required
 def incidents():
-    # Same logic as dashboard to get full list
-    raw_police = list(incidents_police_collection.find())
-    raw_public = list(incidents_collection.find())
-    
-    all_incidents = []
-    for i in raw_police:
-        d = process_police_incident(i)
-        if d:
-            d['is_assigned'] = assigned_cases_collection.find_one({'incident_id': str(i['_id'])}) is not None
-            all_incidents.append(d)
-    for i in raw_public:
-        d = process_public_incident(i)
-        if d:
-            d['is_assigned'] = assigned_cases_collection.find_one({'incident_id': str(i['_id'])}) is not None
-            all_incidents.append(d)
-            
-    all_incidents.sort(key=lambda x: x['created_at'], reverse=True)
+    # Full list for the table; the stat tiles read the counter document
+    scope = incident_scope()
+    # New public SOS have no jurisdiction tags until their view is built, so the scoped query can't find them
+    throttled_view_repair()
+    all_incidents = fetch_incidents(scope)
+    counts = incident_counts(counter_scope())
     
     stats = {
-        'total_incidents': len(all_incidents),
-        'police_count': sum(1 for i in all_incidents if i['source'] == 'police'),
-        'public_count': sum(1 for i in all_incidents if i['source'] == 'public'),
-        'high_severity_count': sum(1 for i in all_incidents if i['severity'] == 'high'),
-        'active_count': sum(1 for i in all_incidents if i['status'] == 'active'),
-        'resolved_count': sum(1 for i in all_incidents if i['status'] == 'resolved'),
-        'assigned_count': sum(1 for i in all_incidents if i['is_assigned']),
-        'unassigned_count': len(all_incidents) - sum(1 for i in all_incidents if i['is_assigned'])
+        'total_incidents': counts['total'],
+        'police_count': counts['source'].get('police', 0),
+        'public_count': counts['source'].get('public', 0),
+        'high_severity_count': counts['severity'].get('high', 0),
+        'active_count': counts['status'].get('active', 0),
+        'resolved_count': counts['status'].get('resolved', 0),
+        'assigned_count': counts['assigned'],
+        'unassigned_count': counts['unassigned']
     }
     
-    officers = list(police_officers_collection.find({'status': 'active'}))
+    officers = list(police_officers_collection.find(station_scope({'status': 'active'})))
     return render_template('incidents.html', all_incidents=all_incidents, officers=officers, **stats)
 
+def incidents_etag(args, scope):
+    """Strong ETag for an /api/incidents query from counters, without reading incident documents"""
+    # Inserts by the public app don't touch the counter until their view is built,
+    # so the newest public _id and the collection sizes are folded in as well
+    newest = incidents_collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    version = [
+        # The watermark moves when an in-flight write lands, even if nothing new was reserved
+        sync_state(),
+        str(newest['_id']) if newest else None,
+        incidents_police_collection.estimated_document_count(),
+        incidents_collection.estimated_document_count(),
+        sorted(args.items(multi=True)),
+        scope
+    ]
+    return hashlib.sha1(json.dumps(version).encode()).hexdigest()
+
 @app.route('/api/incidents', methods=['GET', 'POST'])
 @login_required
 def api_incidents_route():
     if request.method == 'POST':
         data = request.get_json()
+        if data.get('severity', 'medium') not in COMPACT_ENUMS['severity']:
+            return jsonify({'error': 'severity must be low, medium or high'}), 400
         address = data.get('address')
-        if not address and data.get('latitude'):
-            address = get_address_from_coordinates(data.get('latitude'), data.get('longitude'))
+        # Addresses are resolved in the background so the request never waits on Nominatim
+        needs_address = not address and bool(data.get('latitude'))
             
         new_incident = {
             'incident_id': f'POL-{datetime.now(IST).strftime("%Y%m%d-%H%M%S")}',
@@ -838,26 +1377,112 @@ def api_incidents_route():
             'status': 'active',
             'latitude': float(data.get('latitude', 14.4664)),
             'longitude': float(data.get('longitude', 75.9238)),
-            'address': address or 'Unknown',
+            'address': address or (ADDRESS_PENDING if needs_address else 'Unknown'),
             'reported_by': current_user.username,
             'assigned_officer': data.get('assigned_officer', 'Unassigned'),
             'created_at': datetime.now(IST),
-            'source': 'police'
+            'source': 'police',
+            'police_station': current_user.police_station
         }
-        res = incidents_police_collection.insert_one(new_incident)
+        new_incident['_id'] = ObjectId()
+        new_incident['updated_at'] = new_incident['created_at']
+        if needs_address:
+            new_incident['address_status'] = 'pending'
+        view = build_incident_view(new_incident, 'police')
+        new_incident.update(view_fields(view))
+        new_incident['stats_counted'] = stats_snapshot(view, 'police', False)
+        with reserve_sync_seq() as seq:
+            res = incidents_police_collection.insert_one(dict(new_incident, sync_seq=seq))
+        apply_stats_changes([(None, new_incident['stats_counted'])])
+        if needs_address:
+            address_enricher.submit('police', res.inserted_id, new_incident['latitude'], new_incident['longitude'])
         return jsonify({'message': 'Added', 'id': str(res.inserted_id)})
     
     # GET Logic for Maps
-    raw_police = list(incidents_police_collection.find())
-    raw_public = list(incidents_collection.find())
-    data = []
-    for i in raw_police:
-        d = process_police_incident(i)
-        if d: data.append(d)
-    for i in raw_public:
-        d = process_public_incident(i)
-        if d: data.append(d)
-    return jsonify(data)
+    try:
+        geo_filter = parse_geo_filter(request.args)
+        since = int(request.args['since']) if request.args.get('since') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid incidents query: {e}'}), 400
+
+    # Unchanged polls are answered from the counter alone, before any incident is read
+    scope = incident_scope()
+    etag = incidents_etag(request.args, scope)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # Untagged documents from the public app only match the scope once their view is built
+    throttled_view_repair()
+    # Read before the query: every write at or below the watermark has landed, so a client
+    # asking for since=watermark next time can't skip one that was still in flight
+    _, watermark = sync_state()
+    fetch = fetch_incident_markers if request.args.get('format') == 'compact' else fetch_incidents
+    try:
+        if since is None:
+            response = jsonify(fetch(incident_scope(geo_filter)))
+        else:
+            changed = {'sync_seq': {'$gt': since}}
+            match = incident_scope({'$and': [geo_filter, changed]} if geo_filter else changed)
+            tombstones = [{'id': t['_id'], 'source': t['source']}
+                          for t in incident_tombstones_collection.find({'sync_seq': {'$gt': since}})]
+            response = jsonify({'since': since, 'watermark': watermark, 'incidents': fetch(match), 'tombstones': tombstones})
+    except OperationFailure as e:
+        # MongoDB rejects some shapes parse_geo_filter lets through (e.g. degenerate polygons)
+        if geo_filter is None:
+            raise
+        return jsonify({'error': f'Invalid incidents query: {e}'}), 400
+    response.headers['X-Sync-Watermark'] = str(watermark)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/incidents/stream')
+@login_required
+def incident_stream():
+    """Server-Sent Events: pushes incident inserts, updates, assignments and deletes"""
+    keepalive = app.config['LIVE_FEED_KEEPALIVE_SECONDS']
+    station, district = user_jurisdiction()
+
+    def generate():
+        subscription = live_feed.subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = subscription.get(timeout=keepalive)
+                if event is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                if event['type'] in ('incident', 'deleted') and not in_jurisdiction(event, station, district):
+                    continue
+                yield f"event: {event['type']}\ndata: {app.json.dumps(event)}\n\n"
+        finally:
+            live_feed.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/incidents/clusters')
+@login_required
+def api_incident_clusters():
+    try:
+        zoom = int(request.args.get('zoom', 13))
+        geo_filter = parse_geo_filter(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid cluster query: {e}'}), 400
+    zoom = max(0, min(zoom, 22))
+
+    throttled_view_repair()
+    match = incident_scope(geo_filter)
+    try:
+        if zoom >= app.config['CLUSTER_MAX_ZOOM']:
+            return jsonify({'zoom': zoom, 'clustered': False, 'incidents': fetch_incidents(match)})
+        return jsonify({'zoom': zoom, 'clustered': True, 'clusters': fetch_incident_clusters(zoom, match)})
+    except OperationFailure as e:
+        if geo_filter is None:
+            raise
+        return jsonify({'error': f'Invalid cluster query: {e}'}), 400
 
 @app.route('/api/incidents/<incident_id>/details')
 @login_required
@@ -865,10 +1490,14 @@ def get_incident_details(incident_id):
     source = request.args.get('source', 'police')
     collection = incidents_police_collection if source == 'police' else incidents_collection
     try:
-        inc = collection.find_one({'_id': ObjectId(incident_id)})
+        # Incidents outside the user's jurisdiction look the same as missing ones
+        inc = collection.with_options(codec_options=VIEW_CODEC_OPTIONS).find_one(incident_scope({'_id': ObjectId(incident_id)}))
         if not inc: return jsonify({'error': 'Not found'}), 404
         
-        data = process_police_incident(inc) if source == 'police' else process_public_incident(inc)
+        if inc.get('view_version') == INCIDENT_VIEW_VERSION:
+            data = dict(inc['view'], _id=str(inc['_id']))
+        else:
+            data = process_police_incident(inc) if source == 'police' else process_public_incident(inc)
         return jsonify(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -882,7 +1511,7 @@ def assign_officer_route(incident_id):
         officer = data.get('assigned_officer')
         
         collection = incidents_police_collection if source == 'police' else incidents_collection
-        inc = collection.find_one({'_id': ObjectId(incident_id)})
+        inc = collection.find_one(incident_scope({'_id': ObjectId(incident_id)}))
         if not inc: return jsonify({'error': 'Incident not found'}), 404
         
         proc_inc = process_police_incident(inc) if source == 'police' else process_public_incident(inc)
@@ -895,9 +1524,15 @@ def assign_officer_route(incident_id):
             })
         else:
             assign_case_to_officer(incident_id, source, officer, proc_inc)
+            # Only the request that flips the flag moves the assigned/unassigned counters
+            counted = collection.find_one_and_update({'_id': ObjectId(incident_id), 'stats_counted.assigned': False},
+                                                     {'$set': {'stats_counted.assigned': True}}, {'stats_counted': 1})
+            if counted:
+                apply_stats_changes([(counted['stats_counted'], dict(counted['stats_counted'], assigned=True))])
             
         # Update original record too
-        collection.update_one({'_id': ObjectId(incident_id)}, {'$set': {'assigned_officer': officer}})
+        with reserve_sync_seq() as seq:
+            collection.update_one({'_id': ObjectId(incident_id)}, {'$set': {'assigned_officer': officer, 'view.assigned_officer': officer, 'updated_at': datetime.now(IST), 'sync_seq': seq}})
         
         return jsonify({'message': 'Assigned'})
     except Exception as e:
@@ -946,7 +1581,7 @@ def police_officers_route():
 def recent_activity():
     # Simple activity feed
     try:
-        recs = list(incidents_police_collection.find().sort('created_at', -1).limit(3))
+        recs = list(incidents_police_collection.find(incident_scope()).sort('view.created_at', -1).limit(3))
         activities = []
         for r in recs:
             t = convert_to_ist(r.get('created_at'))
@@ -960,97 +1595,304 @@ def recent_activity():
     except:
         return jsonify({'activities': []})
 
+EXPORT_COLUMNS = ['Source', 'Incident ID', 'Title', 'Type', 'Severity', 'Status', 'Address', 'Reported By', 'Created At']
+
+def export_row(d):
+    return [d['source'].title(), d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'], d['address'], d['reported_by'], d['created_at']]
+
+def csv_export_chunks(match, progress=None):
+    """Yield the CSV export one cursor batch at a time; progress(rows) is called per batch"""
+    # One small buffer per cursor batch keeps memory flat regardless of row count
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in iter_incident_views(match, app.config['EXPORT_BATCH_SIZE']):
+        for d in fill_pending_addresses(chunk):
+            writer.writerow(export_row(d))
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        if progress:
+            progress(len(chunk))
+    yield output.getvalue()
+
 @app.route('/reports/export/csv')
 @login_required
 def export_csv():
+    args = scoped_report_args(request.args)
     try:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Source', 'Incident ID', 'Title', 'Type', 'Severity', 'Status', 'Address', 'Reported By', 'Created At'])
-        
-        for i in incidents_police_collection.find():
-            d = process_police_incident(i)
-            writer.writerow(['Police', d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'], d['address'], d['reported_by'], d['created_at']])
-            
-        for i in incidents_collection.find():
-            d = process_public_incident(i)
-            writer.writerow(['Public', d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'], d['address'], d['reported_by'], d['created_at']])
-            
-        return Response(output.getvalue(), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=swiftaid_incidents.csv"})
-    except Exception as e:
-        flash(f"Export error: {e}", "danger")
+        match = parse_export_filters(args)
+    except ValueError as e:
+        flash(f"Export error: invalid filter ({e})", "danger")
         return redirect(url_for('reports'))
+    return Response(stream_with_context(csv_export_chunks(match)), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=swiftaid_incidents.csv"})
+
+XLSX_COLUMNS = ['Incident ID', 'Title', 'Type', 'Severity', 'Status', 'Address', 'Reported By', 'Assigned Officer', 'Created At', 'Latitude', 'Longitude']
+XLSX_WIDTHS = [22, 40, 20, 10, 10, 50, 20, 20, 18, 11, 11]
+
+def xlsx_export_chunks(match, progress=None):
+    """Yield the workbook bytes as they are produced; progress(rows) is called per batch"""
+    # The workbook zip is written incrementally and drained after every cursor batch
+    buffer = ChunkBuffer()
+    workbook = StreamingXlsxWriter(buffer)
+    for source, title in (('police', 'Police Incidents'), ('public', 'Public Incidents')):
+        workbook.add_sheet(title, XLSX_COLUMNS, XLSX_WIDTHS)
+        for chunk in iter_incident_views(match, app.config['EXPORT_BATCH_SIZE'], sources=(source,)):
+            for d in fill_pending_addresses(chunk):
+                workbook.write_row([d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'],
+                                    d['address'], d['reported_by'], d['assigned_officer'], d['created_at'],
+                                    d['latitude'], d['longitude']])
+            yield buffer.drain()
+            if progress:
+                progress(len(chunk))
+    workbook.close()
+    yield buffer.drain()
 
 @app.route('/reports/export/excel')
 @login_required
 def export_excel():
+    args = scoped_report_args(request.args)
     try:
-        output = io.BytesIO()
-        output.write(b'\xef\xbb\xbf')
-        text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
-        writer = csv.writer(text_output)
-        writer.writerow(['Source', 'Incident ID', 'Title', 'Type', 'Severity', 'Status', 'Address', 'Reported By', 'Created At'])
-        
-        for i in incidents_police_collection.find():
-            d = process_police_incident(i)
-            writer.writerow(['Police', d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'], d['address'], d['reported_by'], d['created_at']])
-            
-        for i in incidents_collection.find():
-            d = process_public_incident(i)
-            writer.writerow(['Public', d['incident_id'], d['title'], d['incident_type'], d['severity'], d['status'], d['address'], d['reported_by'], d['created_at']])
-            
-        text_output.flush()
-        return Response(output.getvalue(), mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=swiftaid_incidents_excel.csv"})
-    except Exception:
+        match = parse_export_filters(args)
+    except ValueError as e:
+        flash(f"Export error: invalid filter ({e})", "danger")
         return redirect(url_for('reports'))
+    return Response(stream_with_context(xlsx_export_chunks(match)),
+                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    headers={"Content-Disposition": "attachment;filename=swiftaid_incidents.xlsx"})
+
+PDF_COLUMNS = ['ID', 'Title', 'Severity', 'Status', 'Date']
+PDF_WIDTHS = [1.1*inch, 3.0*inch, 0.7*inch, 0.7*inch, 1.1*inch]
+REPORT_FILTER_KEYS = ('from', 'to', 'severity', 'status', 'station')
+
+def report_cache_path(kind, args, version):
+    """Cache file for a report, keyed by its filter set and the incident data version"""
+    filters = {k: args[k] for k in REPORT_FILTER_KEYS if args.get(k)}
+    key = hashlib.sha1(json.dumps({'filters': filters, 'version': version}, sort_keys=True).encode()).hexdigest()
+    return os.path.join(app.config['REPORT_CACHE_DIR'], f"{kind}-{key}")
+
+def store_cached_report(path, data):
+    """Write a finished report atomically and evict the oldest beyond REPORT_CACHE_MAX_FILES"""
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if not f.endswith('.tmp')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for old in files[app.config['REPORT_CACHE_MAX_FILES']:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+def build_incidents_pdf(match, fileobj, progress=None):
+    """Render the incidents report; rows go into page-sized tables so layout cost stays linear"""
+    doc = SimpleDocTemplate(fileobj, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30, alignment=1, textColor=colors.HexColor('#0d6efd'))
+
+    elements.append(Paragraph("SWIFTAID POLICE DEPARTMENT - INCIDENTS REPORT", title_style))
+    elements.append(Paragraph(f"Generated on: {datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S IST')}", styles["Normal"]))
+    elements.append(Spacer(1, 20))
+
+    rows_per_table = app.config['PDF_ROWS_PER_TABLE']
+    for source, heading, header_color in (('police', 'POLICE INCIDENTS', '#0d6efd'), ('public', 'PUBLIC INCIDENTS', '#6c757d')):
+        elements.append(Paragraph(heading, styles['Heading2']))
+        table_style = TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)), ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), ('GRID', (0, 0), (-1, -1), 1, colors.black)])
+        rows = 0
+        for chunk in iter_incident_views(match, rows_per_table, sources=(source,)):
+            data = [PDF_COLUMNS]
+            for d in chunk:
+                data.append([d['incident_id'][:12], d['title'][:50], d['severity'].title(), d['status'].title(), d['created_at'].strftime('%m/%d %H:%M')])
+            # repeatRows carries the header onto the next page if a chunk still splits
+            t = Table(data, colWidths=PDF_WIDTHS, repeatRows=1)
+            t.setStyle(table_style)
+            elements.append(t)
+            rows += len(chunk)
+            if progress:
+                progress(len(chunk))
+        if not rows:
+            elements.append(Paragraph("No incidents match the selected filters.", styles["Normal"]))
+        elements.append(Spacer(1, 20))
+
+    doc.build(elements)
+
+def cached_incidents_pdf(match, args, progress=None):
+    """PDF bytes for the filter set, rebuilt only when the incident data has changed"""
+    # Repair first so views written by the public app count towards the watermark
+    throttled_view_repair(app.config['EXPORT_BATCH_SIZE'])
+    path = report_cache_path('pdf', args, incident_data_version())
+    if os.path.exists(path):
+        with open(path, 'rb') as fh:
+            return fh.read()
+    buffer = io.BytesIO()
+    build_incidents_pdf(match, buffer, progress)
+    pdf = buffer.getvalue()
+    try:
+        store_cached_report(path, pdf)
+    except OSError as e:
+        print(f"⚠️ Report cache write failed: {e}")
+    return pdf
 
 @app.route('/reports/export/pdf')
 @login_required
 def export_pdf():
+    args = scoped_report_args(request.args)
     try:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        elements = []
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30, alignment=1, textColor=colors.HexColor('#0d6efd'))
-        
-        elements.append(Paragraph("SWIFTAID POLICE DEPARTMENT - INCIDENTS REPORT", title_style))
-        elements.append(Paragraph(f"Generated on: {datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S IST')}", styles["Normal"]))
-        elements.append(Spacer(1, 20))
-        
-        # Police Section
-        elements.append(Paragraph("POLICE INCIDENTS", styles['Heading2']))
-        data = [['ID', 'Title', 'Severity', 'Status', 'Date']]
-        for i in incidents_police_collection.find().sort('created_at', -1):
-            d = process_police_incident(i)
-            data.append([d['incident_id'][:12], d['title'][:50], d['severity'].title(), d['status'].title(), d['created_at'].strftime('%m/%d %H:%M')])
-        
-        t = Table(data, colWidths=[1.1*inch, 3.0*inch, 0.7*inch, 0.7*inch, 1.1*inch])
-        t.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')), ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        elements.append(t)
-        elements.append(Spacer(1, 20))
-        
-        # Public Section
-        elements.append(Paragraph("PUBLIC INCIDENTS", styles['Heading2']))
-        data2 = [['ID', 'Title', 'Severity', 'Status', 'Date']]
-        for i in incidents_collection.find().sort('created_at', -1):
-            d = process_public_incident(i)
-            data2.append([d['incident_id'][:12], d['title'][:50], d['severity'].title(), d['status'].title(), d['created_at'].strftime('%m/%d %H:%M')])
-            
-        t2 = Table(data2, colWidths=[1.1*inch, 3.0*inch, 0.7*inch, 0.7*inch, 1.1*inch])
-        t2.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6c757d')), ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        elements.append(t2)
+        match = parse_export_filters(args)
+    except ValueError as e:
+        flash(f"Export error: invalid filter ({e})", "danger")
+        return redirect(url_for('reports'))
 
-        doc.build(elements)
-        return Response(buffer.getvalue(), mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=swiftaid_report.pdf'})
+    try:
+        pdf = cached_incidents_pdf(match, args)
+        return Response(pdf, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=swiftaid_report.pdf'})
     except Exception as e:
         print(f"PDF Error: {e}")
+        flash(f"Export error: {e}", "danger")
         return redirect(url_for('reports'))
 
+# --- REPORT JOBS ---
+REPORT_FILES = {
+    'csv': ('swiftaid_incidents.csv', 'text/csv'),
+    'xlsx': ('swiftaid_incidents.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': ('swiftaid_report.pdf', 'application/pdf')
+}
+
+report_jobs = Deferred(lambda: ReportJobManager(
+    app.config['REPORT_JOB_DIR'],
+    workers=app.config['REPORT_JOB_WORKERS'],
+    per_user=app.config['REPORT_JOB_PER_USER'],
+    ttl_seconds=app.config['REPORT_JOB_TTL_HOURS'] * 3600,
+    stale_seconds=app.config['REPORT_JOB_STALE_MINUTES'] * 60
+))
+
+def count_incident_views(match=None):
+    query = dict(match or {}, view_version=INCIDENT_VIEW_VERSION)
+    return incidents_police_collection.count_documents(query) + incidents_collection.count_documents(query)
+
+def render_report_job(kind, args, path, progress):
+    """Report job entry point; runs in a pool process that imports this module"""
+    match = parse_export_filters(args)
+    throttled_view_repair(app.config['EXPORT_BATCH_SIZE'])
+    progress.set_total(count_incident_views(match))
+    if kind == 'pdf':
+        with open(path, 'wb') as fh:
+            fh.write(cached_incidents_pdf(match, args, progress.advance))
+        return
+    chunks = csv_export_chunks(match, progress.advance) if kind == 'csv' else xlsx_export_chunks(match, progress.advance)
+    with open(path, 'wb') as fh:
+        for data in chunks:
+            fh.write(data.encode('utf-8') if isinstance(data, str) else data)
+
+def report_job_json(state):
+    total = state.get('total')
+    done = state['status'] == 'done'
+    return {
+        'job_id': state['job_id'],
+        'kind': state['kind'],
+        'status': state['status'],
+        'rows': state.get('rows', 0),
+        'total': total,
+        'progress': 1.0 if done else (round(min(state.get('rows', 0) / total, 1.0), 3) if total else 0.0),
+        'error': state.get('error'),
+        'download_url': url_for('download_report_job', job_id=state['job_id']) if done else None
+    }
+
+def owned_report_job(job_id):
+    state = report_jobs.get(job_id)
+    if not state or state['owner'] != current_user.username:
+        return None
+    return state
+
+@app.route('/reports/jobs', methods=['POST'])
+@login_required
+def create_report_job():
+    data = request.get_json(silent=True) or request.form
+    kind = data.get('kind')
+    if kind not in REPORT_FILES:
+        return jsonify({'error': 'kind must be csv, xlsx or pdf'}), 400
+    args = scoped_report_args(data)
+    try:
+        parse_export_filters(args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    try:
+        state = report_jobs.submit(current_user.username, kind, args, render_report_job, REPORT_FILES[kind][0])
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(report_job_json(state)), 202
+
+@app.route('/reports/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    state = owned_report_job(job_id)
+    if not state: return jsonify({'error': 'Job not found'}), 404
+    return jsonify(dict(report_job_json(state), args=state['args']))
+
+@app.route('/reports/jobs/<job_id>/progress')
+@login_required
+def report_job_progress(job_id):
+    state = owned_report_job(job_id)
+    if not state: return jsonify({'error': 'Job not found'}), 404
+    job = report_job_json(state)
+    return jsonify({k: job[k] for k in ('status', 'rows', 'total', 'progress', 'download_url')})
+
+@app.route('/reports/jobs/<job_id>/download')
+@login_required
+def download_report_job(job_id):
+    state = owned_report_job(job_id)
+    if not state: return jsonify({'error': 'Job not found'}), 404
+    if state['status'] != 'done':
+        return jsonify({'error': f"Job is {state['status']}"}), 409
+    filename, mimetype = REPORT_FILES[state['kind']]
+    return send_file(report_jobs.artifact_path(state), mimetype=mimetype, as_attachment=True, download_name=filename)
+
+@app.route('/api/geocode-cache/stats')
+@login_required
+def geocode_cache_stats():
+    return jsonify(dict(geocode_cache.stats(), enrichment=address_enricher.stats(), batch=batch_geocoder.stats()))
+
+@app.route('/api/user-cache/stats')
+@login_required
+def user_cache_stats():
+    return jsonify(user_cache.stats())
+
+@app.route('/api/password-hasher/stats')
+@login_required
+def password_hasher_stats():
+    return jsonify(password_hasher.stats())
+
+# Collection sizes change slowly; caching them keeps the 60 s dashboard poll off the database
+db_stats_cache = TTLCache(ttl=app.config['DB_STATS_CACHE_SECONDS'], max_entries=1)
+
+def database_counts():
+    counts = db_stats_cache.get('counts')
+    if counts is None:
+        counts = {
+            'police_incidents': incidents_police_collection.estimated_document_count(),
+            'public_incidents': incidents_collection.estimated_document_count(),
+            'resolved_cases': db.resolved_cases.estimated_document_count(),
+            'officers': police_officers_collection.estimated_document_count(),
+            'users': POLICE_users.estimated_document_count(),
+            'collections': len(db.list_collection_names()),
+            'counted_at': datetime.now(IST).isoformat()
+        }
+        counts['total_resolved'] = incident_counts()['status'].get('resolved', 0) + counts['resolved_cases']
+        db_stats_cache.put('counts', counts)
+    return counts
+
 @app.route('/api/database-stats')
 @login_required
 def database_stats():
-    return jsonify({'status': 'ok'})
+    try:
+        counts = database_counts()
+    except PyMongoError as e:
+        return jsonify({'error': f'Database unavailable: {e}'}), 503
+    return jsonify(dict(counts, pool=pool_metrics.stats(), **command_metrics.stats()))
 
 @app.route('/api/profile', methods=['PUT'])
 @login_required
@@ -1064,6 +1906,7 @@ def profile_update():
             'ward_number': data.get('ward_number')
         }
         POLICE_users.update_one({'_id': ObjectId(current_user.id)}, {'$set': update_data})
+        user_cache.invalidate(current_user.id)
         return jsonify({'message': 'Profile updated'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1077,20 +1920,164 @@ def profile():
 @app.route('/reports')
 @login_required
 def reports():
-    total_police = incidents_police_collection.count_documents({})
-    total_public = incidents_collection.count_documents({})
-    active = incidents_police_collection.count_documents({'status': 'active'}) + incidents_collection.count_documents({'status': 'active'})
-    resolved = incidents_police_collection.count_documents({'status': 'resolved'}) + incidents_collection.count_documents({'status': 'resolved'}) + db.resolved_cases.count_documents({})
-    high = incidents_police_collection.count_documents({'severity': 'high'}) + incidents_collection.count_documents({'severity': 'high'})
+    throttled_view_repair(app.config['EXPORT_BATCH_SIZE'])
+    counts = incident_counts(counter_scope())
     
     stats = {
-        'total': total_police+total_public,
-        'active': active,
-        'resolved': resolved,
-        'high_severity': high
+        'total': counts['total'],
+        'active': counts['status'].get('active', 0),
+        'resolved': counts['status'].get('resolved', 0) + db.resolved_cases.count_documents(station_scope()),
+        'high_severity': counts['severity'].get('high', 0)
     }
     return render_template('reports.html', stats=stats, current_time=datetime.now(IST).strftime('%Y-%m-%d %H:%M'))
 
+# --- ANALYTICS ---
+ANALYTICS_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+ANALYTICS_GROUPS = ('severity', 'incident_type', 'source')
+
+def analytics_bucket(hour, granularity):
+    """Start of the IST hour, day or Monday-based week containing `hour`"""
+    if granularity == 'hour':
+        return hour
+    day = hour.replace(hour=0)
+    return day if granularity == 'day' else day - timedelta(days=day.weekday())
+
+def incident_timeseries(doc_scopes, days, granularity, group_by=None):
+    """Sum the hourly rollups of the counter_scope() documents into zero-filled buckets"""
+    end = datetime.now(IST).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'hour':
+        first = end - timedelta(hours=days * 24 - 1)
+    else:
+        first = analytics_bucket(end - timedelta(days=days - 1), granularity)
+    buckets = []
+    bucket = first
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket += ANALYTICS_STEPS[granularity]
+    index = {b: i for i, b in enumerate(buckets)}
+
+    series = {}
+    total = 0
+    cursor = (incident_rollups_collection.with_options(codec_options=VIEW_CODEC_OPTIONS)
+              .find({'scope': {'$in': list(doc_scopes)}, 'hour': {'$gte': first}}, {'_id': 0, 'hour': 1, group_by or 'total': 1}))
+    for doc in cursor:
+        i = index.get(analytics_bucket(doc['hour'], granularity))
+        if i is None:
+            # Future-dated incidents
+            continue
+        counts = doc.get(group_by, {}) if group_by else {'total': doc.get('total', 0)}
+        for key, count in counts.items():
+            if count:
+                series.setdefault(key, [0] * len(buckets))[i] += count
+                total += count
+    return {
+        'granularity': granularity,
+        'days': days,
+        'group_by': group_by,
+        'buckets': [b.isoformat() for b in buckets],
+        'series': series,
+        'total': total
+    }
+
+@app.route('/api/analytics/timeseries')
+@login_required
+def analytics_timeseries():
+    """Incident counts per hour, day or week over the last ?days=, optionally split by ?group_by="""
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    if not 1 <= days <= app.config['ANALYTICS_MAX_DAYS']:
+        return jsonify({'error': f"days must be between 1 and {app.config['ANALYTICS_MAX_DAYS']}"}), 400
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ANALYTICS_STEPS:
+        return jsonify({'error': 'granularity must be hour, day or week'}), 400
+    group_by = request.args.get('group_by') or None
+    if group_by is not None and group_by not in ANALYTICS_GROUPS:
+        return jsonify({'error': 'group_by must be severity, incident_type or source'}), 400
+    try:
+        station, _ = user_jurisdiction()
+        return jsonify(dict(incident_timeseries(counter_scope(), days, granularity, group_by), station=station))
+    except PyMongoError as e:
+        return jsonify({'error': f'Database unavailable: {e}'}), 503
+
+# --- REQUEST METRICS ---
+@app.before_request
+def start_request_trace():
+    request_metrics.start()
+
+@app.after_request
+def finish_request_trace(response):
+    # Streamed bodies (exports, SSE) are timed up to their headers
+    trace = request_metrics.finish(request.endpoint or 'unmatched', request.method, response.status_code)
+    if trace is not None:
+        response.headers['Server-Timing'] = request_metrics.server_timing(trace)
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_timing(sender, template, context, **extra):
+    request_metrics.begin_segment('render')
+
+@template_rendered.connect_via(app)
+def finish_render_timing(sender, template, context, **extra):
+    request_metrics.end_segment('render')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics for this worker process"""
+    token = app.config['METRICS_TOKEN']
+    # Off until a token is configured: the figures describe traffic and internals
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    pool = pool_metrics.stats()
+    hasher = password_hasher.stats()
+    gauges = {
+        'mongo_pool_open_connections': ('Open MongoDB connections', pool['open']),
+        'mongo_pool_in_use_connections': ('MongoDB connections checked out', pool['in_use']),
+        'mongo_pool_waiting_threads': ('Threads waiting for a MongoDB connection', pool['waiting']),
+        'password_queue_depth': ('bcrypt operations waiting for a worker', hasher['queue_depth']),
+        'user_cache_hit_ratio': ('load_user cache hit ratio', user_cache.stats()['hit_rate']),
+        'live_feed_subscribers': ('Open incident stream connections', live_feed.stats()['subscribers'])
+    }
+    return Response(request_metrics.render_prometheus(gauges=gauges), mimetype='text/plain; version=0.0.4')
+
+# --- HEALTH CHECKS ---
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is serving requests; never touches the database"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: MongoDB answers and every migration has been applied"""
+    checks = {}
+    try:
+        with pymongo.timeout(app.config['READINESS_TIMEOUT_SECONDS']):
+            client.admin.command('ping')
+            checks['mongodb'] = 'ok'
+            pending = migration_runner.pending()
+            checks['migrations'] = 'ok' if not pending else f"{len(pending)} pending"
+    except PyMongoError as e:
+        checks.setdefault('mongodb', f"unavailable: {e}")
+        checks.setdefault('migrations', 'unknown')
+    ready = all(v == 'ok' for v in checks.values())
+    return jsonify({'status': 'ready' if ready else 'not ready', 'checks': checks}), 200 if ready else 503
+
+def create_app(config=None):
+    """WSGI entry point, e.g. `gunicorn 'app:create_app()'`; `config` overrides settings (tests).
+
+    Routes live on the module-level app. The MongoDB client, its collections and the
+    geocoder, bcrypt and report-job pools are Deferred: each is built from app.config the
+    first time something uses it, so creating the app resolves no DNS, opens no sockets and
+    starts no threads, and overrides given here apply to everything not yet used. Run
+    `flask migrate` once per deploy before starting workers.
+    """
+    if config:
+        app.config.from_mapping(config)
+    return app
+
 if __name__ == '__main__':
     print("🚀 Starting SwiftAid Police Dashboard with FULL DATABASE (Un-optimized Length)...")
     app.run(debug=True)
\ No newline at end of file
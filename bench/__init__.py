@@ -0,0 +1,34 @@
+"""Benchmarks for the dashboard, incident and export paths against a seeded local mongod.
+
+    python -m bench.seed --scale 10k
+    python -m bench.run --scale 10k --output before.json
+    python -m bench.compare before.json after.json
+
+Everything runs in a separate database (MONGODB_DB_NAME, default SwiftAidBench) with
+online geocoding disabled, so results don't depend on Nominatim or production data.
+"""
+import os
+import tempfile
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+BENCH_DB_NAME = 'SwiftAidBench'
+BENCH_PASSWORD = 'bench-password'
+BENCH_STATION = 'Yelahanka Police Station'
+
+
+def load_app():
+    """Import app.py configured for benchmarking; must run before anything else imports it"""
+    os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017')
+    os.environ.setdefault('MONGODB_DB_NAME', BENCH_DB_NAME)
+    os.environ['GEOCODE_ONLINE_FALLBACK'] = 'false'
+    # Seeded passwords are throwaway; the minimum cost keeps login out of the measurements
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    os.environ.setdefault('REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'swiftaid-bench-report-cache'))
+    if os.environ['MONGODB_DB_NAME'] == 'SwiftAid':
+        raise SystemExit('Refusing to benchmark against the production database name "SwiftAid"')
+    import app as swiftaid
+    # Stub the online geocoder outright in case a resolver still reaches for it
+    swiftaid.nominatim.reverse = lambda lat, lng: None
+    # No background address sweep or tombstone recorder: they would add untimed database traffic to every scenario
+    swiftaid._background_started = True
+    return swiftaid
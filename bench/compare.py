@@ -0,0 +1,44 @@
+"""Compare two bench.run JSON reports scenario by scenario"""
+import argparse
+import json
+
+METRICS = ['p50_ms', 'p95_ms', 'db_round_trips', 'peak_rss_mb']
+
+
+def change(before, after):
+    if not before:
+        return 'n/a'
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='flag p95 regressions larger than this many percent')
+    args = parser.parse_args()
+    with open(args.before, encoding='utf-8') as fh:
+        before = json.load(fh)
+    with open(args.after, encoding='utf-8') as fh:
+        after = json.load(fh)
+
+    print(f"{before.get('commit')} -> {after.get('commit')}  ({after['scale']}, scope {after['scope']})")
+    print(f"{'scenario':<24}" + ''.join(f"{m:>24}" for m in METRICS))
+    regressions = 0
+    for name, new in after['results'].items():
+        old = before['results'].get(name)
+        if not old or 'error' in old or 'error' in new:
+            print(f"{name:<24}  (missing or failed in one report)")
+            continue
+        cells = [f"{old[m]:>8} -> {new[m]:<8} {change(old[m], new[m]):>6}" for m in METRICS]
+        flag = ''
+        if old['p95_ms'] and (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 > args.threshold:
+            flag = '  ⚠️ slower'
+            regressions += 1
+        print(f"{name:<24}" + ''.join(f"{c:>24}" for c in cells) + flag)
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
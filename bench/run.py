@@ -0,0 +1,179 @@
+"""Time the dashboard, incident, map API, assignment and export paths; print or save JSON"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from bench import BENCH_PASSWORD, BENCH_STATION, SCALES, load_app
+from bench.seed import seed, seeded_total
+
+# Reads first: assign_officer writes, and every scenario runs in its own process anyway
+SCENARIOS = ['dashboard', 'incidents', 'api_incidents', 'api_incidents_compact', 'assign_officer',
+             'export_csv', 'export_excel', 'export_pdf']
+DEFAULT_ITERATIONS = {'export_csv': 5, 'export_excel': 5, 'export_pdf': 3}
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    rank = max(int(round(p / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def db_round_trips(swiftaid):
+    return sum(c['count'] for c in swiftaid.command_metrics.stats()['commands'])
+
+
+def scenario_requests(swiftaid, name, scope, rng):
+    """Callable issuing one request for the scenario through the test client"""
+    client = swiftaid.app.test_client()
+    station = swiftaid.station_registry.get(BENCH_STATION)
+    response = client.post('/login', data={'police_station': station['name'],
+                                           'police_station_reg_no': station['reg_no'],
+                                           'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise SystemExit(f"Benchmark login failed ({response.status_code}); run `python -m bench.seed` first")
+    # The first request with ?scope= stores the choice in the session
+    client.get(f'/?scope={scope}')
+
+    if name == 'assign_officer':
+        match = {} if scope == 'state' else swiftaid.station_incident_match(BENCH_STATION)
+        targets = [(str(d['_id']), 'police') for d in swiftaid.incidents_police_collection.find(match, {'_id': 1}).limit(200)]
+        targets += [(str(d['_id']), 'public') for d in swiftaid.incidents_collection.find(match, {'_id': 1}).limit(200)]
+        officers = [o['username'] for o in swiftaid.police_officers_collection.find({'police_station': BENCH_STATION}, {'username': 1})]
+
+        def assign():
+            incident_id, source = rng.choice(targets)
+            return client.put(f'/api/incidents/{incident_id}/assign-officer',
+                              json={'source': source, 'assigned_officer': rng.choice(officers)})
+        return assign
+
+    if name == 'export_pdf':
+        cache_dir = swiftaid.app.config['REPORT_CACHE_DIR']
+
+        def export_pdf():
+            # Measure a full render, not a cache hit
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return client.get('/reports/export/pdf')
+        return export_pdf
+
+    path = {
+        'dashboard': '/',
+        'incidents': '/incidents',
+        'api_incidents': '/api/incidents',
+        'api_incidents_compact': '/api/incidents?format=compact',
+        'export_csv': '/reports/export/csv',
+        'export_excel': '/reports/export/excel',
+    }[name]
+    return lambda: client.get(path)
+
+
+def run_scenario(name, iterations, warmup, scope):
+    swiftaid = load_app()
+    if not seeded_total(swiftaid):
+        raise SystemExit('The benchmark database is empty; run `python -m bench.seed` first')
+    request = scenario_requests(swiftaid, name, scope, random.Random(7))
+    for _ in range(warmup):
+        request()
+    latencies = []
+    trips_before = db_round_trips(swiftaid)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = request()
+        # Streamed exports are only finished once the whole body has been read
+        size = len(response.get_data())
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise SystemExit(f"{name}: HTTP {response.status_code}")
+    trips = db_round_trips(swiftaid) - trips_before
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'db_round_trips': round(trips / iterations, 1),
+        'response_bytes': size,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='run only these scenarios (repeatable)')
+    parser.add_argument('--iterations', type=int, help='timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--scope', choices=['station', 'state'], default='station')
+    parser.add_argument('--reseed', action='store_true', help='regenerate the data even if the scale matches')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_scenario(args.child, args.iterations, args.warmup, args.scope)
+        print(json.dumps(result))
+        return
+
+    swiftaid = load_app()
+    if args.reseed or seeded_total(swiftaid) != SCALES[args.scale]:
+        seed(swiftaid, SCALES[args.scale], log=lambda msg: print(msg, file=sys.stderr))
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        iterations = args.iterations or DEFAULT_ITERATIONS.get(name, 20)
+        # A fresh process per scenario keeps peak RSS and caches from leaking between them
+        out = subprocess.run([sys.executable, '-m', 'bench.run', '--child', name, '--iterations', str(iterations),
+                              '--warmup', str(args.warmup), '--scope', args.scope],
+                             capture_output=True, text=True, env=os.environ.copy())
+        if out.returncode != 0:
+            print(f"❌ {name} failed:\n{out.stderr or out.stdout}", file=sys.stderr)
+            results[name] = {'error': (out.stderr or out.stdout).strip().splitlines()[-1:]}
+            continue
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+        r = results[name]
+        print(f"{name:<24} p50 {r['p50_ms']:>9.1f} ms  p95 {r['p95_ms']:>9.1f} ms  "
+              f"{r['db_round_trips']:>7.1f} db trips  {r['peak_rss_mb']:>7.1f} MB", file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'scale': args.scale,
+        'incidents': SCALES[args.scale],
+        'scope': args.scope,
+        'python': platform.python_version(),
+        'run_at': datetime.now(timezone.utc).isoformat(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Seed a benchmark database with synthetic stations, officers, users and incidents"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from bench import BENCH_PASSWORD, BENCH_STATION, SCALES, load_app
+
+INCIDENT_TYPES = ['Theft', 'Assault', 'Traffic Accident', 'Burglary', 'Missing Person', 'Public Nuisance',
+                  'Cyber Crime', 'Fire', 'Domestic Dispute', 'Other']
+SOS_TYPES = ['medical', 'harassment', 'accident', 'fire', 'general']
+FIRST_NAMES = ['Arun', 'Kavya', 'Ravi', 'Deepa', 'Suresh', 'Lakshmi', 'Manjunath', 'Asha', 'Prakash', 'Nandini']
+LAST_NAMES = ['Gowda', 'Rao', 'Shetty', 'Naik', 'Patil', 'Hegde', 'Kumar', 'Reddy', 'Murthy', 'Kulkarni']
+DESIGNATIONS = ['Constable', 'Head Constable', 'Sub-Inspector', 'Inspector']
+# Share of incidents near the benchmark station, so station-scoped pages have real work
+HOME_SHARE = 0.2
+BATCH = 5000
+
+
+def station_username(station):
+    return re.sub(r'[^a-zA-Z0-9]', '', station['name']).lower()[:15] + station['reg_no'][-4:]
+
+
+def jitter(rng, station, km=4.0):
+    # ~111 km per degree; stations without coordinates fall back to central Karnataka
+    lat, lng = station.get('lat') or 14.4664, station.get('lng') or 75.9238
+    return round(lat + rng.uniform(-km, km) / 111.0, 6), round(lng + rng.uniform(-km, km) / 111.0, 6)
+
+
+def seed(swiftaid, total, rng_seed=42, log=print):
+    """Drop and regenerate the benchmark collections with `total` incidents"""
+    rng = random.Random(rng_seed)
+    db = swiftaid.db
+    now = datetime.now(swiftaid.IST).replace(microsecond=0)
+    stations = [swiftaid.station_registry.get(name) for name in swiftaid.station_registry.names()]
+    home = swiftaid.station_registry.get(BENCH_STATION)
+
+    for name in ('POLICE_users', 'police_officers', 'incidents', 'incidents_police', 'ASSIGNED_CASES',
+                 'resolved_cases', 'incident_sync', 'incident_tombstones', 'geocode_cache', 'bench_meta'):
+        db.drop_collection(name)
+    swiftaid.migration_runner.collection.delete_many({})
+    swiftaid.migration_runner.run(log=log)
+
+    started = time.monotonic()
+    password_hash = swiftaid.hash_password(BENCH_PASSWORD)
+    users = []
+    for station in stations:
+        users.append({
+            'username': station_username(station),
+            'email': f"{station_username(station)}@swiftaid.local",
+            'password_hash': password_hash,
+            'police_station': station['name'],
+            'police_station_reg_no': station['reg_no'],
+            'ward_number': station['ward'],
+            'full_name': station['name'],
+            'role': 'police_admin',
+            'designation': 'Station House Officer',
+            'created_at': now - timedelta(days=365)
+        })
+    # The benchmark account may switch to the state-wide view (--scope state)
+    next(u for u in users if u['police_station'] == BENCH_STATION)['role'] = 'state_admin'
+    db.POLICE_users.insert_many(users)
+
+    officers = []
+    for i in range(max(total // 20, len(stations))):
+        station = home if i % 5 == 0 else rng.choice(stations)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        officers.append({
+            'badge_number': f"KA{100000 + i}",
+            'full_name': name,
+            'designation': rng.choice(DESIGNATIONS),
+            'police_station': station['name'],
+            'email': f"officer{i}@swiftaid.local",
+            'username': f"{name.lower().replace(' ', '')}_KA{100000 + i}",
+            'phone': f"9{rng.randrange(10 ** 8, 10 ** 9)}",
+            'status': 'active' if rng.random() < 0.9 else 'inactive',
+            'created_at': now - timedelta(days=rng.randrange(365))
+        })
+    db.police_officers.insert_many(officers)
+    officers_by_station = {}
+    for o in officers:
+        officers_by_station.setdefault(o['police_station'], []).append(o['username'])
+
+    police, public = [], []
+    for i in range(total):
+        station = home if rng.random() < HOME_SHARE else rng.choice(stations)
+        lat, lng = jitter(rng, station)
+        created_at = now - timedelta(minutes=rng.randrange(90 * 24 * 60))
+        officer_pool = officers_by_station.get(station['name']) or ['Unassigned']
+        if rng.random() < 0.6:
+            police.append({
+                'incident_id': f"POL-{created_at.strftime('%Y%m%d-%H%M%S')}-{i}",
+                'title': f"{rng.choice(INCIDENT_TYPES)} reported near {station['name'].replace(' Police Station', '')}",
+                'description': 'Synthetic incident generated for benchmarking.',
+                'incident_type': rng.choice(INCIDENT_TYPES),
+                'severity': rng.choices(['low', 'medium', 'high'], [5, 3, 2])[0],
+                'status': rng.choices(['active', 'pending', 'resolved'], [5, 2, 3])[0],
+                'latitude': lat,
+                'longitude': lng,
+                'address': f"Near {station['name'].replace(' Police Station', '')}, {station['district']}, Karnataka",
+                'reported_by': station_username(station),
+                'assigned_officer': rng.choice(officer_pool) if rng.random() < 0.3 else 'Unassigned',
+                'created_at': created_at,
+                'source': 'police'
+            })
+        else:
+            user_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            public.append({
+                'user_name': user_name,
+                'lat': lat,
+                'lng': lng,
+                'timestamp': created_at,
+                'speed': rng.choice([0, 0, 0, rng.uniform(1, 20)]),
+                'accel_mag': round(rng.uniform(0, 2.5), 2),
+                'metadata': {'sos_type': rng.choice(SOS_TYPES)},
+                # The public app sends an address most of the time; the rest go through the geocoder
+                'address': f"{station['district']}, Karnataka" if rng.random() < 0.9 else None
+            })
+    for name, docs in (('incidents_police', police), ('incidents', public)):
+        for start in range(0, len(docs), BATCH):
+            db[name].insert_many(docs[start:start + BATCH], ordered=False)
+
+    assigned = []
+    for source, docs in (('police', police), ('public', public)):
+        for doc in docs:
+            if rng.random() < 0.3:
+                officer = doc.get('assigned_officer') if doc.get('assigned_officer', 'Unassigned') != 'Unassigned' else rng.choice(officers)['username']
+                assigned.append({
+                    'incident_id': str(doc['_id']),
+                    'source_collection': source,
+                    'assigned_officer': officer,
+                    'assigned_by': rng.choice(users)['username'],
+                    'assigned_at': now,
+                    'incident_data': {'incident_id': doc.get('incident_id'), 'title': doc.get('title')},
+                    'status': 'assigned',
+                    'last_updated': now
+                })
+    for start in range(0, len(assigned), BATCH):
+        db.ASSIGNED_CASES.insert_many(assigned[start:start + BATCH], ordered=False)
+    db.resolved_cases.insert_many([{'incident_id': str(d['_id']), 'police_station': BENCH_STATION, 'resolved_at': now}
+                                   for d in police[:max(total // 100, 1)]])
+
+    # Build views, station tags and sync stamps up front, as a migrated production database has them
+    repaired = swiftaid.repair_stale_views(swiftaid.app.config['EXPORT_BATCH_SIZE'])
+    db.bench_meta.insert_one({'_id': 'seed', 'total': total, 'rng_seed': rng_seed, 'seeded_at': now})
+    log(f"✅ Seeded {len(police)} police + {len(public)} public incidents, {len(assigned)} assignments, "
+        f"{len(officers)} officers, {len(users)} users in {time.monotonic() - started:.1f}s (views: {repaired})")
+
+
+def seeded_total(swiftaid):
+    meta = swiftaid.db.bench_meta.find_one({'_id': 'seed'})
+    return meta['total'] if meta else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--seed', type=int, default=42, help='random seed; the same seed gives the same data')
+    args = parser.parse_args()
+    seed(load_app(), SCALES[args.scale], args.seed)
+
+
+if __name__ == '__main__':
+    main()
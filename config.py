@@ -6,4 +6,85 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/SwiftAid'
-    DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
\ No newline at end of file
+    MONGODB_DB_NAME = os.environ.get('MONGODB_DB_NAME') or 'SwiftAid'
+    DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
+    # The client connects lazily; these bound how long a request or /readyz waits for Atlas
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    READINESS_TIMEOUT_SECONDS = float(os.environ.get('READINESS_TIMEOUT_SECONDS', 2))
+    # MongoClient connection pool
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000))
+    # /api/database-stats: commands slower than this are logged, document counts are cached this long
+    MONGODB_SLOW_COMMAND_MS = int(os.environ.get('MONGODB_SLOW_COMMAND_MS', 100))
+    DB_STATS_CACHE_SECONDS = float(os.environ.get('DB_STATS_CACHE_SECONDS', 30))
+    # Bearer token Prometheus sends to /metrics (it scrapes without a login session);
+    # /metrics answers 404 while this is empty, e.g. METRICS_TOKEN=$(openssl rand -hex 32)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    # /api/analytics/timeseries: longest window a trend query may cover
+    ANALYTICS_MAX_DAYS = int(os.environ.get('ANALYTICS_MAX_DAYS', 90))
+    # Reverse geocoding (Nominatim) and its cache
+    NOMINATIM_URL = os.environ.get('NOMINATIM_URL') or 'https://nominatim.openstreetmap.org/reverse'
+    GEOCODE_PRECISION = int(os.environ.get('GEOCODE_PRECISION', 4))
+    GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 10000))
+    GEOCODE_CACHE_TTL_DAYS = int(os.environ.get('GEOCODE_CACHE_TTL_DAYS', 30))
+    GEOCODE_NEGATIVE_TTL_HOURS = int(os.environ.get('GEOCODE_NEGATIVE_TTL_HOURS', 24))
+    GEOCODE_WORKERS = int(os.environ.get('GEOCODE_WORKERS', 2))
+    # Nominatim calls per second for the whole deployment: every worker books slots on one MongoDB document
+    GEOCODE_RATE_PER_SEC = float(os.environ.get('GEOCODE_RATE_PER_SEC', 1.0))
+    GEOCODE_MAX_RETRIES = int(os.environ.get('GEOCODE_MAX_RETRIES', 4))
+    GEOCODE_QUEUE_SIZE = int(os.environ.get('GEOCODE_QUEUE_SIZE', 10000))
+    GEOCODE_BATCH_WORKERS = int(os.environ.get('GEOCODE_BATCH_WORKERS', 4))
+    GEOCODE_BATCH_TIMEOUT = float(os.environ.get('GEOCODE_BATCH_TIMEOUT', 30))
+    # Offline gazetteer lookups; Nominatim is only asked when nothing is within range
+    OFFLINE_GEOCODER_PATH = os.environ.get('OFFLINE_GEOCODER_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'karnataka_gazetteer.csv')
+    OFFLINE_GEOCODER_MAX_KM = float(os.environ.get('OFFLINE_GEOCODER_MAX_KM', 15))
+    GEOCODE_ONLINE_FALLBACK = os.environ.get('GEOCODE_ONLINE_FALLBACK', 'True').lower() == 'true'
+    # Map marker clustering: grid cells per 256px tile, and the zoom where raw markers are returned
+    CLUSTER_CELLS_PER_TILE = int(os.environ.get('CLUSTER_CELLS_PER_TILE', 4))
+    CLUSTER_MAX_ZOOM = int(os.environ.get('CLUSTER_MAX_ZOOM', 15))
+    # Exports stream incidents from batched cursors of this size
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+    # PDF reports: rows per table chunk, and the on-disk cache of finished reports
+    PDF_ROWS_PER_TABLE = int(os.environ.get('PDF_ROWS_PER_TABLE', 40))
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'report_cache')
+    REPORT_CACHE_MAX_FILES = int(os.environ.get('REPORT_CACHE_MAX_FILES', 50))
+    # Background report jobs: process pool size, per-user limit and artifact lifetime
+    REPORT_JOB_DIR = os.environ.get('REPORT_JOB_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'report_jobs')
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+    REPORT_JOB_PER_USER = int(os.environ.get('REPORT_JOB_PER_USER', 2))
+    REPORT_JOB_TTL_HOURS = int(os.environ.get('REPORT_JOB_TTL_HOURS', 24))
+    REPORT_JOB_STALE_MINUTES = int(os.environ.get('REPORT_JOB_STALE_MINUTES', 15))
+    # Live incident feed (SSE): change streams when the cluster supports them, else polling
+    LIVE_FEED_CHANGE_STREAMS = os.environ.get('LIVE_FEED_CHANGE_STREAMS', 'True').lower() == 'true'
+    LIVE_FEED_POLL_SECONDS = float(os.environ.get('LIVE_FEED_POLL_SECONDS', 2))
+    LIVE_FEED_KEEPALIVE_SECONDS = float(os.environ.get('LIVE_FEED_KEEPALIVE_SECONDS', 15))
+    LIVE_FEED_QUEUE_SIZE = int(os.environ.get('LIVE_FEED_QUEUE_SIZE', 256))
+    # Delta sync on /api/incidents: tombstone retention, how long an unfinished write may hold
+    # the watermark back, and the lease / id-sweep interval of the single tombstone recorder
+    INCIDENT_TOMBSTONE_TTL_DAYS = int(os.environ.get('INCIDENT_TOMBSTONE_TTL_DAYS', 7))
+    SYNC_SEQ_RESERVATION_SECONDS = float(os.environ.get('SYNC_SEQ_RESERVATION_SECONDS', 60))
+    TOMBSTONE_LEASE_SECONDS = float(os.environ.get('TOMBSTONE_LEASE_SECONDS', 30))
+    TOMBSTONE_SWEEP_SECONDS = float(os.environ.get('TOMBSTONE_SWEEP_SECONDS', 10))
+    # Request paths look for incidents without a current view at most this often per worker
+    VIEW_REPAIR_INTERVAL_SECONDS = float(os.environ.get('VIEW_REPAIR_INTERVAL_SECONDS', 30))
+    # format=compact map payloads send coordinates as ints scaled by 10**precision
+    COMPACT_COORD_PRECISION = int(os.environ.get('COMPACT_COORD_PRECISION', 5))
+    # Police station registry data file and autocomplete result cap
+    STATION_REGISTRY_PATH = os.environ.get('STATION_REGISTRY_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'police_stations.csv')
+    STATION_SEARCH_MAX_RESULTS = int(os.environ.get('STATION_SEARCH_MAX_RESULTS', 25))
+    # Shorter queries get no results, longer ones a 400; distinct queries kept in the search cache
+    STATION_SEARCH_MIN_CHARS = int(os.environ.get('STATION_SEARCH_MIN_CHARS', 2))
+    STATION_SEARCH_MAX_CHARS = int(os.environ.get('STATION_SEARCH_MAX_CHARS', 64))
+    STATION_SEARCH_CACHE_SIZE = int(os.environ.get('STATION_SEARCH_CACHE_SIZE', 2048))
+    # Jurisdiction: police incidents belong to a station; public SOS to the district of the nearest station within this radius
+    STATION_TAG_MAX_KM = float(os.environ.get('STATION_TAG_MAX_KM', 50))
+    # Account roles allowed to switch to the state-wide incident view
+    STATE_ADMIN_ROLES = os.environ.get('STATE_ADMIN_ROLES', 'state_admin').split(',')
+    # Per-process cache of logged-in users for Flask-Login's user_loader
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 30))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1000))
+    # bcrypt work factor for new hashes (existing ones are re-hashed at login) and its thread pool
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', 4))
+    BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', 64))
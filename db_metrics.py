@@ -0,0 +1,144 @@
+"""pymongo monitoring listeners that keep connection-pool and command statistics"""
+import threading
+import time
+from collections import deque
+
+from pymongo import monitoring
+
+# Commands whose first field names the collection they act on
+_COLLECTION_COMMANDS = {'find', 'insert', 'update', 'delete', 'aggregate', 'count', 'distinct',
+                        'findAndModify', 'createIndexes', 'listIndexes', 'dropIndexes', 'getMore'}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Open and in-use connections, and how long threads waited to check one out.
+
+    Listeners run on the thread doing the checkout, so the start time is kept per
+    (server, thread) until the matching checked-out or failed event arrives.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting = {}
+        self.counters = {'open': 0, 'in_use': 0, 'checkouts': 0, 'checkout_failures': 0,
+                         'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'waiting': 0, 'pool_cleared': 0}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        checkouts = stats['checkouts']
+        stats['avg_wait_ms'] = round(stats.pop('wait_seconds') / checkouts * 1000, 2) if checkouts else 0.0
+        stats['max_wait_ms'] = round(stats.pop('max_wait_seconds') * 1000, 2)
+        return stats
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._waiting[(event.address, threading.get_ident())] = time.perf_counter()
+            self.counters['waiting'] += 1
+
+    def connection_checked_out(self, event):
+        self._checked_out(event, ok=True)
+
+    def connection_check_out_failed(self, event):
+        self._checked_out(event, ok=False)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.counters['in_use'] -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.counters['open'] += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.counters['open'] -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.counters['pool_cleared'] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def _checked_out(self, event, ok):
+        now = time.perf_counter()
+        with self._lock:
+            start = self._waiting.pop((event.address, threading.get_ident()), None)
+            self.counters['waiting'] = max(self.counters['waiting'] - 1, 0)
+            if not ok:
+                self.counters['checkout_failures'] += 1
+                return
+            self.counters['in_use'] += 1
+            self.counters['checkouts'] += 1
+            if start is not None:
+                wait = now - start
+                self.counters['wait_seconds'] += wait
+                self.counters['max_wait_seconds'] = max(self.counters['max_wait_seconds'], wait)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Count, latency and failures per (collection, command), plus the most recent slow commands.
+
+    `observer(seconds)`, if given, is called for every finished command on the thread
+    that ran it.
+    """
+
+    def __init__(self, slow_ms=100, slow_log_size=20, observer=None):
+        self.slow_ms = slow_ms
+        self.observer = observer
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._by_key = {}
+        self.slow = deque(maxlen=slow_log_size)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == 'getMore':
+            target = event.command.get('collection')
+        collection = target if event.command_name in _COLLECTION_COMMANDS and isinstance(target, str) else None
+        with self._lock:
+            self._inflight[(event.request_id, event.connection_id)] = collection
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def stats(self):
+        with self._lock:
+            commands = [
+                {'collection': collection, 'command': command, 'count': s['count'], 'failures': s['failures'],
+                 'avg_ms': round(s['total_ms'] / s['count'], 2), 'max_ms': round(s['max_ms'], 2)}
+                for (collection, command), s in self._by_key.items()
+            ]
+            slow = list(self.slow)
+        commands.sort(key=lambda c: c['avg_ms'] * c['count'], reverse=True)
+        return {'commands': commands, 'slow_commands': slow, 'slow_ms': self.slow_ms}
+
+    def _finished(self, event, failed):
+        ms = event.duration_micros / 1000.0
+        if self.observer is not None:
+            self.observer(ms / 1000.0)
+        with self._lock:
+            collection = self._inflight.pop((event.request_id, event.connection_id), None)
+            s = self._by_key.setdefault((collection, event.command_name),
+                                        {'count': 0, 'failures': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            s['count'] += 1
+            s['total_ms'] += ms
+            s['max_ms'] = max(s['max_ms'], ms)
+            if failed:
+                s['failures'] += 1
+            if ms >= self.slow_ms:
+                self.slow.append({'collection': collection, 'command': event.command_name, 'ms': round(ms, 1),
+                                  'failed': failed, 'at': time.time()})
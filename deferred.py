@@ -0,0 +1,45 @@
+"""Module-level objects that are only built on first use"""
+import threading
+
+
+class Deferred:
+    """Proxy that builds its target with `factory()` on first attribute access, once per process.
+
+    Lets app.py bind the MongoDB client, its collections and the worker pools at import
+    while doing no I/O there: a `mongodb+srv://` URI is only resolved when a request,
+    CLI command or background thread first touches the database.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_deferred_factory', factory)
+        object.__setattr__(self, '_deferred_target', None)
+        object.__setattr__(self, '_deferred_lock', threading.Lock())
+
+    def __getattr__(self, name):
+        return getattr(resolve(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(resolve(self), name, value)
+
+    def __getitem__(self, key):
+        return resolve(self)[key]
+
+    def __repr__(self):
+        target = object.__getattribute__(self, '_deferred_target')
+        return f"Deferred({target!r})" if target is not None else 'Deferred(<not built>)'
+
+
+def resolve(proxy):
+    """The proxied object, building it if this is the first use"""
+    target = object.__getattribute__(proxy, '_deferred_target')
+    if target is None:
+        with object.__getattribute__(proxy, '_deferred_lock'):
+            target = object.__getattribute__(proxy, '_deferred_target')
+            if target is None:
+                target = object.__getattribute__(proxy, '_deferred_factory')()
+                object.__setattr__(proxy, '_deferred_target', target)
+    return target
+
+
+def is_built(proxy):
+    return object.__getattribute__(proxy, '_deferred_target') is not None
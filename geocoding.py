@@ -0,0 +1,371 @@
+"""Reverse geocoding with a two-tier cache (in-process LRU + MongoDB)"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import requests
+from pymongo import ReturnDocument
+
+
+class GeocodeError(Exception):
+    """Transient lookup failure (network, rate limit, 5xx) - never cached"""
+
+
+class NominatimGeocoder:
+    """Thin client for a Nominatim-compatible /reverse endpoint"""
+
+    def __init__(self, url, user_agent='SwiftAid Police System/1.0', timeout=5, limiter=None, observer=None):
+        self.url = url
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.limiter = limiter
+        # observer(seconds) is told how long each HTTP call took, successful or not
+        self.observer = observer
+
+    def reverse(self, lat, lng):
+        """Return the display name, None if the service has no address for the point"""
+        if self.limiter is not None:
+            self.limiter.acquire()
+        params = {'format': 'json', 'lat': lat, 'lon': lng, 'zoom': 18, 'addressdetails': 1}
+        start = time.perf_counter()
+        try:
+            response = requests.get(self.url, params=params, headers={'User-Agent': self.user_agent}, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GeocodeError(str(e))
+        finally:
+            if self.observer is not None:
+                self.observer(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise GeocodeError(f"HTTP {response.status_code}")
+        return response.json().get('display_name')
+
+
+class GeocodeCache:
+    """LRU in front of a persistent store, keyed by coordinates rounded to `precision` digits.
+
+    Negative results (no address for a point) are cached too, with their own shorter TTL.
+    """
+
+    def __init__(self, collection=None, precision=4, ttl=timedelta(days=30),
+                 negative_ttl=timedelta(hours=24), max_entries=10000):
+        self.collection = collection
+        self.precision = precision
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'negative_hits': 0, 'evictions': 0}
+
+    def key(self, lat, lng):
+        p = self.precision
+        return f"{round(float(lat), p):.{p}f},{round(float(lng), p):.{p}f}"
+
+    def ensure_indexes(self):
+        if self.collection is not None:
+            self.collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+
+    def get(self, lat, lng):
+        """Return (found, address); address is None for a cached negative result"""
+        key = self.key(lat, lng)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._count('memory_hits', entry[0])
+                    return True, entry[0]
+                del self._entries[key]
+
+        doc = None
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({'_id': key})
+            except Exception as e:
+                print(f"⚠️ Geocode cache read failed: {e}")
+        if doc:
+            expires_at = doc['expires_at']
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if remaining > 0:
+                with self._lock:
+                    self._remember(key, doc.get('address'), now + remaining)
+                    self._count('store_hits', doc.get('address'))
+                return True, doc.get('address')
+
+        with self._lock:
+            self.counters['misses'] += 1
+        return False, None
+
+    def put(self, lat, lng, address):
+        key = self.key(lat, lng)
+        ttl = self.ttl if address else self.negative_ttl
+        with self._lock:
+            self._remember(key, address, time.monotonic() + ttl.total_seconds())
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {'_id': key},
+                    {'_id': key, 'address': address, 'expires_at': datetime.now(timezone.utc) + ttl},
+                    upsert=True)
+            except Exception as e:
+                print(f"⚠️ Geocode cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), max_entries=self.max_entries)
+        lookups = stats['memory_hits'] + stats['store_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remember(self, key, address, expires):
+        self._entries[key] = (address, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _count(self, counter, address):
+        self.counters[counter] += 1
+        if address is None:
+            self.counters['negative_hits'] += 1
+
+
+class CachedGeocoder:
+    """Resolve coordinates through the cache, falling back to the resolver on a miss"""
+
+    def __init__(self, cache, resolver):
+        self.cache = cache
+        self.resolver = resolver
+
+    def lookup(self, lat, lng):
+        """Return an address or None; raises GeocodeError on transient failures"""
+        found, address = self.cache.get(lat, lng)
+        if found:
+            return address
+        address = self.resolver.reverse(lat, lng)
+        self.cache.put(lat, lng, address)
+        return address
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """Paces callers across every process sharing `collection` to `rate` acquisitions per second.
+
+    Each acquire() atomically books the next free slot on one document and sleeps until
+    it comes round, so N workers together still make `rate` calls a second. If the store
+    can't be reached the `fallback` limiter (per process) is used for that call.
+    """
+
+    def __init__(self, collection, name, rate, fallback=None):
+        self.collection = collection
+        self.name = name
+        self.interval_ms = 1000.0 / float(rate)
+        self.fallback = fallback
+        self.counters = {'acquired': 0, 'fallbacks': 0}
+
+    def acquire(self):
+        try:
+            # $$NOW is the server clock, so slots don't depend on the workers' clocks agreeing
+            doc = self.collection.find_one_and_update({'_id': self.name}, [
+                {'$set': {'slot': {'$max': ['$$NOW', {'$ifNull': ['$next_at', '$$NOW']}]}, 'now': '$$NOW'}},
+                {'$set': {'next_at': {'$add': ['$slot', self.interval_ms]}}},
+            ], upsert=True, return_document=ReturnDocument.AFTER)
+        except Exception as e:
+            print(f"⚠️ Shared rate limit unavailable, pacing locally: {e}")
+            self.counters['fallbacks'] += 1
+            if self.fallback is not None:
+                self.fallback.acquire()
+            return
+        self.counters['acquired'] += 1
+        wait = (doc['slot'] - doc['now']).total_seconds()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AddressEnricher:
+    """Bounded worker pool that resolves incident addresses in the background.
+
+    Jobs are (source, incident_id, lat, lng). Cache hits are written back immediately;
+    misses go to the resolver (which applies its own rate limit) and are retried with
+    exponential backoff on transient errors.
+    `writer(source, incident_id, lat, lng, address, resolved)` persists the outcome.
+    """
+
+    def __init__(self, geocoder, writer, workers=2, queue_size=10000, max_retries=4, backoff=2.0):
+        self.geocoder = geocoder
+        self.writer = writer
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.counters = {'queued': 0, 'resolved': 0, 'failed': 0, 'retries': 0, 'dropped': 0}
+
+    def submit(self, source, incident_id, lat, lng):
+        """Queue an incident for enrichment; returns False if it is already queued or the queue is full"""
+        key = (source, incident_id)
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        try:
+            self._queue.put_nowait((source, incident_id, lat, lng))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(key)
+                self.counters['dropped'] += 1
+            return False
+        with self._lock:
+            self.counters['queued'] += 1
+        self._ensure_started()
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, backlog=self._queue.qsize(), workers=len(self._threads))
+
+    def _ensure_started(self):
+        # Threads start lazily so a pre-forking server doesn't lose them in the parent
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._run, name=f"address-enricher-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self):
+        while True:
+            source, incident_id, lat, lng = self._queue.get()
+            try:
+                address, resolved = self._resolve(lat, lng)
+                self.writer(source, incident_id, lat, lng, address, resolved)
+                with self._lock:
+                    self.counters['resolved' if resolved else 'failed'] += 1
+            except Exception as e:
+                print(f"⚠️ Address enrichment failed for {incident_id}: {e}")
+                with self._lock:
+                    self.counters['failed'] += 1
+            finally:
+                with self._lock:
+                    self._pending.discard((source, incident_id))
+                self._queue.task_done()
+
+    def _resolve(self, lat, lng):
+        found, address = self.geocoder.cache.get(lat, lng)
+        if found:
+            return address, True
+        for attempt in range(self.max_retries + 1):
+            try:
+                address = self.geocoder.resolver.reverse(lat, lng)
+                self.geocoder.cache.put(lat, lng, address)
+                return address, True
+            except GeocodeError:
+                if attempt == self.max_retries:
+                    break
+                with self._lock:
+                    self.counters['retries'] += 1
+                time.sleep(self.backoff * (2 ** attempt))
+        return None, False
+
+
+class BatchGeocoder:
+    """Resolve many coordinates concurrently on a bounded pool.
+
+    Lookups are keyed by the cache's rounded coordinates, and every caller asking for
+    a key that is already being resolved waits on the same in-flight future.
+    """
+
+    def __init__(self, geocoder, max_workers=4):
+        self.geocoder = geocoder
+        self.max_workers = max_workers
+        self._executor = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {'lookups': 0, 'coalesced': 0}
+
+    def lookup_async(self, lat, lng):
+        key = self.geocoder.cache.key(lat, lng)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+                return future
+            if self._executor is None:
+                # Created on first use so a pre-forking server doesn't start threads in the parent
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='geocode')
+            future = self._executor.submit(self._resolve, lat, lng)
+            self._inflight[key] = future
+            self.counters['lookups'] += 1
+        future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        return future
+
+    def lookup(self, lat, lng, timeout=None):
+        return self.lookup_async(lat, lng).result(timeout)
+
+    def resolve_many(self, coords, timeout=None):
+        """Return {cache key: address or None} for the distinct keys that resolved in time"""
+        cache = self.geocoder.cache
+        results, futures = {}, {}
+        for lat, lng in coords:
+            key = cache.key(lat, lng)
+            if key in results or key in futures:
+                continue
+            found, address = cache.get(lat, lng)
+            if found:
+                results[key] = address
+            else:
+                futures[key] = self.lookup_async(lat, lng)
+        if futures:
+            done, _ = wait(futures.values(), timeout=timeout)
+            for key, future in futures.items():
+                if future in done and future.exception() is None:
+                    results[key] = future.result()
+        return results
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, inflight=len(self._inflight))
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _resolve(self, lat, lng):
+        # Another caller may have filled the cache while this one was queued
+        found, address = self.geocoder.cache.get(lat, lng)
+        if found:
+            return address
+        address = self.geocoder.resolver.reverse(lat, lng)
+        self.geocoder.cache.put(lat, lng, address)
+        return address
@@ -0,0 +1,190 @@
+"""Fan-out of incident changes to Server-Sent Event subscribers"""
+import queue
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+
+class Subscription:
+    """One connected client; events are dropped for a resync marker if it falls behind"""
+
+    def __init__(self, queue_size):
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Too far behind to catch up event by event: tell the page to reload instead
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            self._queue.put_nowait({'type': 'resync'})
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LiveFeed:
+    """A single watcher thread per process, fanning events out to every subscriber.
+
+    `source_factory()` is called on the watcher thread and must return an iterable that
+    yields event dicts, blocking between changes. The source is recreated after errors.
+    """
+
+    def __init__(self, source_factory, queue_size=256, retry_delay=5.0):
+        self.source_factory = source_factory
+        self.queue_size = queue_size
+        self.retry_delay = retry_delay
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.source_name = None
+        self.counters = {'published': 0, 'source_errors': 0}
+
+    def subscribe(self):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        self._ensure_started()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.counters['published'] += 1
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, subscribers=len(self._subscribers), source=self.source_name)
+
+    def _ensure_started(self):
+        # Started on first subscribe so it runs inside the serving worker process
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                source = self.source_factory()
+                self.source_name = type(source).__name__
+                for event in source:
+                    self.publish(event)
+            except Exception as e:
+                print(f"⚠️ Live feed source failed: {e}")
+                with self._lock:
+                    self.counters['source_errors'] += 1
+                # Clients may have missed changes while the source was down
+                self.publish({'type': 'resync'})
+            time.sleep(self.retry_delay)
+
+
+class ChangeStreamSource:
+    """Incident changes from a MongoDB change stream (replica sets and Atlas only).
+
+    `to_event(collection_name, operation, _id, document)` turns a change into an event
+    dict, or None to skip it. With `before_change` the document of a delete is its
+    pre-image, when the collection keeps them (MongoDB 6.0+). The resume token survives
+    reconnects of the same source.
+    """
+
+    OPERATIONS = ['insert', 'update', 'replace', 'delete']
+
+    def __init__(self, db, collection_names, to_event, before_change=False):
+        self.db = db
+        self.collection_names = list(collection_names)
+        self.to_event = to_event
+        self.before_change = before_change
+        self._resume_token = None
+
+    def supported(self):
+        try:
+            with self.db.watch(max_await_time_ms=1) as stream:
+                stream.try_next()
+            return True
+        except OperationFailure:
+            return False
+
+    def __iter__(self):
+        pipeline = [{'$match': {'ns.coll': {'$in': self.collection_names}, 'operationType': {'$in': self.OPERATIONS}}}]
+        options = {'full_document_before_change': 'whenAvailable'} if self.before_change else {}
+        with self.db.watch(pipeline, full_document='updateLookup', resume_after=self._resume_token, **options) as stream:
+            for change in stream:
+                self._resume_token = stream.resume_token
+                operation = change['operationType']
+                document = change.get('fullDocumentBeforeChange' if operation == 'delete' else 'fullDocument')
+                event = self.to_event(change['ns']['coll'], operation, change['documentKey']['_id'], document)
+                if event:
+                    yield event
+
+
+class WatermarkTailer:
+    """Fallback for deployments without change streams: poll for documents past a watermark.
+
+    A document is new to the tailer when its `updated_at` or its `_id` moved past the
+    highest value seen, so inserts from writers that don't set `updated_at` still show up.
+    An `_id` past the highest one seen is reported as an insert, anything else as an
+    update. Deletes are not visible to the tailer.
+    """
+
+    def __init__(self, collections, to_event, interval=2.0, batch_size=500):
+        self.collections = collections
+        self.to_event = to_event
+        self.interval = interval
+        self.batch_size = batch_size
+
+    def __iter__(self):
+        marks = {name: self._latest(collection) for name, collection in self.collections.items()}
+        while True:
+            for name, collection in self.collections.items():
+                try:
+                    docs = list(collection.find(self._query(marks[name]))
+                                .sort([('updated_at', 1), ('_id', 1)]).limit(self.batch_size))
+                except PyMongoError as e:
+                    print(f"⚠️ Live feed poll failed: {e}")
+                    continue
+                updated_at, last_id, seen = marks[name]
+                for doc in docs:
+                    # $gte on updated_at re-reads ties, skip the ones already sent
+                    key = (doc['_id'], doc.get('updated_at'))
+                    if key in seen:
+                        continue
+                    if doc.get('updated_at') and (updated_at is None or doc['updated_at'] > updated_at):
+                        updated_at, seen = doc['updated_at'], set()
+                    operation = 'update'
+                    if last_id is None or doc['_id'] > last_id:
+                        last_id = doc['_id']
+                        operation = 'insert'
+                    seen.add(key)
+                    event = self.to_event(name, operation, doc['_id'], doc)
+                    if event:
+                        yield event
+                marks[name] = (updated_at, last_id, seen)
+            time.sleep(self.interval)
+
+    def _latest(self, collection):
+        latest = collection.find_one({}, {'updated_at': 1}, sort=[('updated_at', -1)])
+        newest = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        updated_at = latest.get('updated_at') if latest else None
+        return updated_at, newest['_id'] if newest else None, set()
+
+    def _query(self, mark):
+        updated_at, last_id, _ = mark
+        clauses = []
+        if updated_at is not None:
+            clauses.append({'updated_at': {'$gte': updated_at}})
+        if last_id is not None:
+            clauses.append({'_id': {'$gt': last_id}})
+        return {'$or': clauses} if clauses else {}
@@ -0,0 +1,86 @@
+"""Versioned, run-once database migrations recorded in a MongoDB collection"""
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+LOCK_ID = 'lock'
+
+
+class MigrationLockedError(Exception):
+    """Another process is applying migrations right now"""
+
+
+class MigrationRunner:
+    """Apply registered migrations in version order, each exactly once.
+
+    Applied versions are stored as `{_id: version, name, applied_at, seconds}` documents.
+    A lock document keeps two deploy hooks from running the same migration concurrently;
+    a lock older than `lock_timeout` is assumed to belong to a crashed run and is taken over.
+    A migration that raises is not recorded, so the next run retries it.
+    """
+
+    def __init__(self, collection, lock_timeout=timedelta(minutes=30)):
+        self.collection = collection
+        self.lock_timeout = lock_timeout
+        self._migrations = {}
+        self._owner = None
+
+    def register(self, version, name):
+        """Decorator adding fn() as migration `version`"""
+        def decorator(fn):
+            if version in self._migrations:
+                raise ValueError(f"Migration {version} is already registered")
+            self._migrations[version] = (name, fn)
+            return fn
+        return decorator
+
+    def applied(self):
+        return {doc['_id']: doc for doc in self.collection.find({'_id': {'$ne': LOCK_ID}})}
+
+    def pending(self):
+        applied = self.applied()
+        return [(v, self._migrations[v][0]) for v in sorted(self._migrations) if v not in applied]
+
+    def status(self):
+        applied = self.applied()
+        return [{'version': v, 'name': name, 'applied_at': applied[v]['applied_at'] if v in applied else None}
+                for v, (name, _) in sorted(self._migrations.items())]
+
+    def run(self, log=print):
+        """Apply every pending migration, returns the versions applied"""
+        self._acquire()
+        try:
+            done = []
+            for version, name in self.pending():
+                log(f"⏳ Migration {version}: {name}")
+                start = time.monotonic()
+                self._migrations[version][1]()
+                seconds = round(time.monotonic() - start, 3)
+                self.collection.insert_one({'_id': version, 'name': name, 'seconds': seconds,
+                                            'applied_at': datetime.now(timezone.utc)})
+                log(f"✅ Migration {version} applied in {seconds}s")
+                done.append(version)
+            return done
+        finally:
+            self._release()
+
+    def _acquire(self):
+        now = datetime.now(timezone.utc)
+        owner = self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            self.collection.insert_one({'_id': LOCK_ID, 'owner': owner, 'acquired_at': now})
+            return
+        except DuplicateKeyError:
+            pass
+        taken = self.collection.find_one_and_update(
+            {'_id': LOCK_ID, 'acquired_at': {'$lt': now - self.lock_timeout}},
+            {'$set': {'owner': owner, 'acquired_at': now}})
+        if taken is None:
+            lock = self.collection.find_one({'_id': LOCK_ID}) or {}
+            raise MigrationLockedError(f"Migrations are locked by {lock.get('owner', 'another process')}")
+
+    def _release(self):
+        self.collection.delete_one({'_id': LOCK_ID, 'owner': self._owner})
@@ -0,0 +1,160 @@
+"""Offline reverse geocoder backed by a static KD-tree over a local gazetteer"""
+import csv
+import math
+import sys
+import time
+from array import array
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 110.574
+# Equirectangular projection centred on Karnataka (~15°N), good enough to rank neighbours
+KM_PER_DEG_LNG = 111.320 * math.cos(math.radians(15.0))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class OfflineGeocoder:
+    """Nearest-place lookups over gazetteer rows (name, kind, district, lat, lng).
+
+    Coordinates live in flat `array('d')` buffers laid out as an implicit balanced KD-tree:
+    the node for range [lo, hi) is the median `(lo + hi) // 2`, split on x at even depths
+    and y at odd depths. `reverse()` matches the resolver interface used by the geocode cache.
+    """
+
+    def __init__(self, places, max_km=15.0):
+        self.max_km = max_km
+        self._places = []
+        self._x = array('d')
+        self._y = array('d')
+        points = []
+        for place in places:
+            lat, lng = float(place['lat']), float(place['lng'])
+            points.append((lng * KM_PER_DEG_LNG, lat * KM_PER_DEG_LAT, place))
+        self._build(points, 0)
+
+    @classmethod
+    def from_csv(cls, path, max_km=15.0):
+        with open(path, newline='', encoding='utf-8') as fh:
+            return cls(list(csv.DictReader(fh)), max_km=max_km)
+
+    def __len__(self):
+        return len(self._places)
+
+    def _build(self, points, depth):
+        # Write nodes in-order so that index == implicit tree position
+        if not points:
+            return
+        points.sort(key=lambda p: p[depth % 2])
+        mid = len(points) // 2
+        self._build(points[:mid], depth + 1)
+        x, y, place = points[mid]
+        self._x.append(x)
+        self._y.append(y)
+        self._places.append(place)
+        self._build(points[mid + 1:], depth + 1)
+
+    def nearest(self, lat, lng):
+        """Return (place, distance_km) for the closest gazetteer entry, or (None, None)"""
+        if not self._places:
+            return None, None
+        qx, qy = float(lng) * KM_PER_DEG_LNG, float(lat) * KM_PER_DEG_LAT
+        xs, ys = self._x, self._y
+        best_i, best_d2 = -1, float('inf')
+        stack = [(0, len(self._places), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            dx, dy = xs[mid] - qx, ys[mid] - qy
+            d2 = dx * dx + dy * dy
+            if d2 < best_d2:
+                best_i, best_d2 = mid, d2
+            diff = dx if depth % 2 == 0 else dy
+            near, far = ((lo, mid), (mid + 1, hi)) if diff > 0 else ((mid + 1, hi), (lo, mid))
+            # Far side is only worth visiting if the splitting plane is closer than the best hit
+            if diff * diff < best_d2:
+                stack.append((far[0], far[1], depth + 1))
+            stack.append((near[0], near[1], depth + 1))
+        place = self._places[best_i]
+        return place, haversine_km(float(lat), float(lng), float(place['lat']), float(place['lng']))
+
+    def describe(self, place, distance_km):
+        label = f"{place['name']}, {place['district']} District, Karnataka"
+        if distance_km < 1:
+            return label
+        return f"{distance_km:.1f} km from {label}"
+
+    def reverse(self, lat, lng):
+        """Address for the nearest place within max_km, None beyond it"""
+        place, distance = self.nearest(lat, lng)
+        if place is None or distance > self.max_km:
+            return None
+        return self.describe(place, distance)
+
+
+class FallbackResolver:
+    """Offline index first, optional online resolver when nothing is close enough.
+
+    If the online resolver fails (e.g. the station is offline or rate-limited) the
+    nearest offline place is returned regardless of distance.
+    """
+
+    def __init__(self, offline, online=None):
+        self.offline = offline
+        self.online = online
+
+    def reverse(self, lat, lng):
+        place, distance = self.offline.nearest(lat, lng)
+        if place is not None and distance <= self.offline.max_km:
+            return self.offline.describe(place, distance)
+        if self.online is not None:
+            try:
+                return self.online.reverse(lat, lng)
+            except Exception:
+                if place is None:
+                    raise
+        return self.offline.describe(place, distance) if place is not None else None
+
+
+def _benchmark(path, online_url=None, samples=20000):
+    import random
+    geocoder = OfflineGeocoder.from_csv(path)
+    rng = random.Random(42)
+    points = [(rng.uniform(11.6, 18.4), rng.uniform(74.1, 78.5)) for _ in range(samples)]
+
+    start = time.perf_counter()
+    for lat, lng in points:
+        geocoder.nearest(lat, lng)
+    elapsed = time.perf_counter() - start
+    print(f"offline: {len(geocoder)} places, {samples} lookups, {elapsed / samples * 1e6:.1f} µs/lookup")
+
+    # Brute-force check keeps the index honest
+    for lat, lng in points[:500]:
+        place, d = geocoder.nearest(lat, lng)
+        best = min(haversine_km(lat, lng, float(p['lat']), float(p['lng'])) for p in geocoder._places)
+        assert abs(best - d) < 1.0, (lat, lng, place, d, best)
+
+    if online_url:
+        from geocoding import NominatimGeocoder
+        online = NominatimGeocoder(online_url)
+        timings = []
+        for lat, lng in points[:5]:
+            start = time.perf_counter()
+            try:
+                online.reverse(lat, lng)
+            except Exception as e:
+                print(f"online lookup failed: {e}")
+            timings.append(time.perf_counter() - start)
+            time.sleep(1)  # Nominatim usage policy
+        print(f"online: {len(timings)} lookups, {sum(timings) / len(timings) * 1e3:.1f} ms/lookup")
+
+
+if __name__ == '__main__':
+    # python offline_geocoder.py data/karnataka_gazetteer.csv [nominatim reverse url]
+    _benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,119 @@
+"""bcrypt hashing on a dedicated thread pool with a configurable work factor"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class HasherBusyError(Exception):
+    """Too many hash operations are already waiting for a worker"""
+
+
+def hash_cost(hashed):
+    """Work factor encoded in a bcrypt hash, None if it isn't one"""
+    match = _COST.match(hashed or '')
+    return int(match.group(1)) if match else None
+
+
+class PasswordHasher:
+    """Run bcrypt on `workers` threads instead of the request threads.
+
+    bcrypt releases the GIL, so the pool hashes in parallel while request threads only
+    wait on a future. At most `max_pending` operations may be queued or running; beyond
+    that callers get HasherBusyError instead of piling up behind a login storm.
+    """
+
+    def __init__(self, rounds=12, workers=4, max_pending=64):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.counters = {'hashed': 0, 'verified': 0, 'rejected_passwords': 0, 'rehashed': 0,
+                         'busy': 0, 'verify_seconds': 0.0}
+
+    def hash(self, password):
+        return self._call(self._hash, password).decode('utf-8')
+
+    def verify(self, hashed, password):
+        return self._call(self._verify, hashed, password)
+
+    def needs_rehash(self, hashed):
+        return hash_cost(hashed) != self.rounds
+
+    def rehash_async(self, password, on_done):
+        """Hash at the target cost in the background and pass the result to on_done(hashed)"""
+        def run():
+            hashed = self._hash(password).decode('utf-8')
+            with self._lock:
+                self.counters['rehashed'] += 1
+            on_done(hashed)
+        try:
+            future = self._submit(run)
+        except HasherBusyError:
+            # Upgrading the hash is opportunistic; the next login tries again
+            return
+        future.add_done_callback(self._log_failure)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, rounds=self.rounds, workers=self.workers, max_pending=self.max_pending,
+                         in_flight=self._pending, running=self._running,
+                         queue_depth=self._pending - self._running)
+        verified = stats['verified'] + stats['rejected_passwords']
+        stats['avg_verify_ms'] = round(stats.pop('verify_seconds') / verified * 1000, 1) if verified else 0.0
+        return stats
+
+    def _call(self, fn, *args):
+        return self._submit(fn, *args).result()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.counters['busy'] += 1
+                raise HasherBusyError(f"{self._pending} password operations already queued")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            executor = self._executor
+        try:
+            return executor.submit(self._tracked, fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _tracked(self, fn, *args):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+
+    def _hash(self, password):
+        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds))
+        with self._lock:
+            self.counters['hashed'] += 1
+        return hashed
+
+    def _verify(self, hashed, password):
+        start = time.perf_counter()
+        ok = bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        with self._lock:
+            self.counters['verified' if ok else 'rejected_passwords'] += 1
+            self.counters['verify_seconds'] += time.perf_counter() - start
+        return ok
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            print(f"⚠️ Password rehash failed: {future.exception()}")
@@ -0,0 +1,159 @@
+"""Disk-backed report jobs executed on a local process pool"""
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobLimitError(Exception):
+    """The user already has the maximum number of report jobs in flight"""
+
+
+def read_state(job_dir):
+    try:
+        with open(os.path.join(job_dir, 'job.json'), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(job_dir, **changes):
+    """Merge changes into job.json; the rename keeps readers from seeing a partial file"""
+    state = read_state(job_dir) or {}
+    state.update(changes, heartbeat=time.time())
+    tmp_path = os.path.join(job_dir, f'job.json.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(state, fh)
+    os.replace(tmp_path, os.path.join(job_dir, 'job.json'))
+    return state
+
+
+class JobProgress:
+    """Progress reporter handed to the render function inside the worker process"""
+
+    def __init__(self, job_dir, interval=0.5):
+        self.job_dir = job_dir
+        self.interval = interval
+        self.total = None
+        self.rows = 0
+        self._written = 0.0
+
+    def set_total(self, total):
+        self.total = total
+        write_state(self.job_dir, total=total, rows=self.rows)
+
+    def advance(self, rows):
+        self.rows += rows
+        # Throttle job.json rewrites; pollers only need a couple of updates a second
+        now = time.monotonic()
+        if now - self._written >= self.interval:
+            self._written = now
+            write_state(self.job_dir, rows=self.rows)
+
+
+def _execute(render, job_dir, kind, args):
+    """Worker process entry point: render the artifact and record the outcome"""
+    state = write_state(job_dir, status='running', started_at=time.time())
+    progress = JobProgress(job_dir)
+    path = os.path.join(job_dir, state['filename'])
+    try:
+        render(kind, args, path, progress)
+        write_state(job_dir, status='done', rows=progress.rows, finished_at=time.time(),
+                    size=os.path.getsize(path))
+    except Exception as e:
+        print(f"❌ Report job {os.path.basename(job_dir)} failed: {e}")
+        write_state(job_dir, status='failed', rows=progress.rows, finished_at=time.time(), error=str(e))
+
+
+class ReportJobManager:
+    """Queue exports onto a process pool and track them in one directory per job.
+
+    All state lives in `<root>/<job_id>/job.json`, so any web worker can answer status
+    and download requests for jobs submitted by another. `render(kind, args, path, progress)`
+    must be a module-level function: it is pickled by reference into spawned workers.
+    """
+
+    def __init__(self, root, workers=2, per_user=2, ttl_seconds=86400, stale_seconds=900):
+        self.root = root
+        self.workers = workers
+        self.per_user = per_user
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, owner, kind, args, render, filename):
+        """Create and enqueue a job, returns its state; raises JobLimitError over the per-user limit"""
+        self.cleanup()
+        with self._lock:
+            if len(self.active_jobs(owner)) >= self.per_user:
+                raise JobLimitError(f"At most {self.per_user} report jobs can run at once")
+            job_id = uuid.uuid4().hex
+            job_dir = os.path.join(self.root, job_id)
+            os.makedirs(job_dir)
+            state = write_state(job_dir, job_id=job_id, owner=owner, kind=kind, args=args,
+                                filename=filename, status='queued', rows=0, total=None,
+                                created_at=time.time())
+        try:
+            self._pool().submit(_execute, render, job_dir, kind, args)
+        except Exception as e:
+            # A worker that died leaves the pool broken; start a fresh one next time
+            with self._lock:
+                self._executor = None
+            state = write_state(job_dir, status='failed', finished_at=time.time(), error=str(e))
+        return state
+
+    def get(self, job_id):
+        """Job state or None; jobs whose worker stopped reporting are marked failed"""
+        if not JOB_ID_RE.match(job_id or ''):
+            return None
+        job_dir = os.path.join(self.root, job_id)
+        state = read_state(job_dir)
+        if state and state['status'] in ACTIVE_STATUSES and time.time() - state['heartbeat'] > self.stale_seconds:
+            state = write_state(job_dir, status='failed', finished_at=time.time(),
+                                error='Job stopped responding (the server may have restarted)')
+        return state
+
+    def artifact_path(self, state):
+        return os.path.join(self.root, state['job_id'], state['filename'])
+
+    def active_jobs(self, owner):
+        return [s for s in self._states() if s.get('owner') == owner and s['status'] in ACTIVE_STATUSES]
+
+    def cleanup(self):
+        """Remove jobs (and their artifacts) older than the TTL, returns how many were removed"""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for state in self._states():
+            if state['status'] not in ACTIVE_STATUSES and state.get('finished_at', state['created_at']) < cutoff:
+                shutil.rmtree(os.path.join(self.root, state['job_id']), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _states(self):
+        if not os.path.isdir(self.root):
+            return []
+        states = []
+        for job_id in os.listdir(self.root):
+            state = self.get(job_id)
+            if state:
+                states.append(state)
+        return states
+
+    def _pool(self):
+        # Created lazily (like the address enricher threads) so a pre-forking server
+        # doesn't hand a half-initialised pool to its workers; spawn avoids forking
+        # a parent that holds MongoClient sockets and background threads.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
@@ -0,0 +1,147 @@
+"""Per-request timing breakdown (Server-Timing) and Prometheus text-format metrics"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(**labels):
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class RequestMetrics:
+    """Thread-local trace of the current request plus process-wide aggregates.
+
+    Code that talks to MongoDB, waits on the geocoder, or runs bcrypt or the template engine
+    reports its time with `add(segment, seconds)`. Time spent on a request thread goes into that
+    request's trace (for the Server-Timing header) and into per-endpoint totals; time
+    spent on background threads only counts towards the process-wide segment totals.
+    Everything is plain counters under one lock, cheap enough to leave on.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._durations = {}
+        self._endpoint_segments = {}
+        self._segments = {}
+
+    def start(self):
+        self._local.trace = {'start': time.perf_counter(), 'segments': {}, 'open': {}}
+
+    def add(self, segment, seconds):
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            entry = trace['segments'].setdefault(segment, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        with self._lock:
+            entry = self._segments.setdefault(segment, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    @contextmanager
+    def timed(self, segment):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(segment, time.perf_counter() - start)
+
+    def begin_segment(self, segment):
+        """Start timing a segment whose end is reported by a separate callback (e.g. signals)"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['open'][segment] = time.perf_counter()
+
+    def end_segment(self, segment):
+        trace = getattr(self._local, 'trace', None)
+        start = trace['open'].pop(segment, None) if trace is not None else None
+        if start is not None:
+            self.add(segment, time.perf_counter() - start)
+
+    def finish(self, endpoint, method, status):
+        """Record the request, returns its trace (None if start() wasn't called)"""
+        trace = getattr(self._local, 'trace', None)
+        self._local.trace = None
+        if trace is None:
+            return None
+        duration = time.perf_counter() - trace['start']
+        trace['duration'] = duration
+        key = (endpoint, method)
+        with self._lock:
+            self._requests[key + (status,)] = self._requests.get(key + (status,), 0) + 1
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += duration
+            for segment, (count, seconds) in trace['segments'].items():
+                entry = self._endpoint_segments.setdefault((endpoint, segment), [0, 0.0])
+                entry[0] += count
+                entry[1] += seconds
+        return trace
+
+    @staticmethod
+    def server_timing(trace):
+        """Server-Timing header value: one entry per segment plus the total"""
+        parts = [f'{segment};dur={seconds * 1000:.1f};desc="{count} calls"'
+                 for segment, (count, seconds) in sorted(trace['segments'].items())]
+        parts.append(f"total;dur={trace['duration'] * 1000:.1f}")
+        return ', '.join(parts)
+
+    def render_prometheus(self, prefix='swiftaid', gauges=None):
+        """All metrics in Prometheus text exposition format; gauges is {name: (help, value)}"""
+        with self._lock:
+            requests = dict(self._requests)
+            durations = {k: ([c for c in v[0]], v[1], v[2]) for k, v in self._durations.items()}
+            endpoint_segments = {k: list(v) for k, v in self._endpoint_segments.items()}
+            segments = {k: list(v) for k, v in self._segments.items()}
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+
+        family('requests_total', 'counter', 'HTTP requests by endpoint, method and status')
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'{prefix}_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+        family('request_duration_seconds', 'histogram', 'Time to produce the response headers')
+        for (endpoint, method), (counts, total, seconds) in sorted(durations.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{prefix}_request_duration_seconds_bucket'
+                             f'{_labels(endpoint=endpoint, method=method, le=bound)} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{_labels(endpoint=endpoint, method=method, le="+Inf")} {total}')
+            lines.append(f'{prefix}_request_duration_seconds_count{_labels(endpoint=endpoint, method=method)} {total}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{_labels(endpoint=endpoint, method=method)} {seconds:.6f}')
+
+        family('request_segment_calls_total', 'counter', 'Calls made while serving requests, by endpoint and segment')
+        for (endpoint, segment), (count, _) in sorted(endpoint_segments.items()):
+            lines.append(f'{prefix}_request_segment_calls_total{_labels(endpoint=endpoint, segment=segment)} {count}')
+        family('request_segment_seconds_total', 'counter', 'Time spent in each segment while serving requests')
+        for (endpoint, segment), (_, seconds) in sorted(endpoint_segments.items()):
+            lines.append(f'{prefix}_request_segment_seconds_total{_labels(endpoint=endpoint, segment=segment)} {seconds:.6f}')
+
+        family('segment_calls_total', 'counter', 'Calls per segment, including background threads')
+        for segment, (count, _) in sorted(segments.items()):
+            lines.append(f'{prefix}_segment_calls_total{_labels(segment=segment)} {count}')
+        family('segment_seconds_total', 'counter', 'Time per segment, including background threads')
+        for segment, (_, seconds) in sorted(segments.items()):
+            lines.append(f'{prefix}_segment_seconds_total{_labels(segment=segment)} {seconds:.6f}')
+
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            family(name, 'gauge', help_text)
+            lines.append(f'{prefix}_{name} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,121 @@
+"""Police station registry loaded once from a CSV data file"""
+import bisect
+import csv
+import difflib
+import re
+
+from offline_geocoder import OfflineGeocoder
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_SUFFIX = re.compile(r'\s*police station$')
+
+
+def normalize_name(name):
+    """Lowercase, punctuation-free form used for lookups ("K.G. Halli" -> "k g halli")"""
+    name = _NON_ALNUM.sub(' ', name.lower()).strip()
+    return _SUFFIX.sub('', name)
+
+
+class StationRegistry:
+    """Stations (name, ward, reg_no, district, lat, lng) with lookup indexes built at load time.
+
+    `reg_no` is six digits; its first two are the district code. Search ranks
+    reg_no prefixes, then name prefixes, then prefixes of any word in the name,
+    and finally fuzzy matches for misspellings. Coordinates are approximate (town level)
+    and only used to pick the station nearest to an incident.
+    """
+
+    def __init__(self, stations):
+        self._stations = []
+        self._by_name = {}
+        self._by_normalized = {}
+        self._by_reg_no = {}
+        self._by_district = {}
+        for row in stations:
+            station = {'name': row['name'], 'ward': row['ward'], 'reg_no': row['reg_no'], 'district': row['district'],
+                       'lat': float(row['lat']) if row.get('lat') else None,
+                       'lng': float(row['lng']) if row.get('lng') else None}
+            i = len(self._stations)
+            self._stations.append(station)
+            self._by_name[station['name']] = i
+            self._by_normalized[normalize_name(station['name'])] = i
+            self._by_reg_no[station['reg_no']] = i
+            self._by_district.setdefault(station['reg_no'][:2], []).append(i)
+        # Sorted keys make every prefix lookup a bisect instead of a scan
+        self._reg_nos = sorted(self._by_reg_no)
+        self._names = sorted(self._by_normalized)
+        words = {}
+        for key, i in self._by_normalized.items():
+            for word in key.split():
+                words.setdefault(word, set()).add(i)
+        self._words = sorted(words)
+        self._word_ids = words
+        self._points = OfflineGeocoder([s for s in self._stations if s['lat'] is not None], max_km=None)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as fh:
+            return cls(csv.DictReader(fh))
+
+    def __len__(self):
+        return len(self._stations)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        i = self._by_name.get(name)
+        return dict(self._stations[i]) if i is not None else None
+
+    def names(self):
+        return [s['name'] for s in self._stations]
+
+    def by_reg_no(self, reg_no):
+        i = self._by_reg_no.get(reg_no)
+        return dict(self._stations[i]) if i is not None else None
+
+    def by_normalized_name(self, name):
+        i = self._by_normalized.get(normalize_name(name))
+        return dict(self._stations[i]) if i is not None else None
+
+    def by_district(self, code):
+        return [dict(self._stations[i]) for i in self._by_district.get(code, [])]
+
+    def nearest(self, lat, lng, max_km=None):
+        """(station, distance_km) for the station closest to a point, (None, None) beyond max_km"""
+        station, distance = self._points.nearest(lat, lng)
+        if station is None or (max_km is not None and distance > max_km):
+            return None, None
+        return dict(station), distance
+
+    def search(self, query, limit=10):
+        """Best matches for a partial name or reg_no, at most `limit` of them"""
+        q = normalize_name(query or '')
+        if not q or limit <= 0:
+            return []
+        found = []
+        seen = set()
+
+        def add(ids):
+            for i in sorted(ids, key=lambda i: self._stations[i]['name']):
+                if i not in seen and len(found) < limit:
+                    seen.add(i)
+                    found.append(i)
+
+        if q.isdigit():
+            add(self._by_reg_no[r] for r in self._prefixed(self._reg_nos, q))
+        add(self._by_normalized[n] for n in self._prefixed(self._names, q))
+        for word in self._prefixed(self._words, q):
+            add(self._word_ids[word])
+        if len(found) < limit and len(q) >= 3 and not q.isdigit():
+            close = difflib.get_close_matches(q, self._names, n=limit, cutoff=0.6)
+            close += difflib.get_close_matches(q, self._words, n=limit, cutoff=0.75)
+            for key in close:
+                add([self._by_normalized[key]] if key in self._by_normalized else self._word_ids[key])
+        return [dict(self._stations[i]) for i in found]
+
+    @staticmethod
+    def _prefixed(keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff')
+        return keys[start:end]
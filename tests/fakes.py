@@ -0,0 +1,360 @@
+"""In-memory stand-ins for the collection methods the app and its modules call.
+
+Enough of MongoDB's query, update and pipeline-update language for the tests to run
+without a server: comparison and $in/$or filters on dotted paths, $set/$inc/$pull/
+$setOnInsert updates with upserts, the handful of aggregation expressions used by
+reserve_sync_seq, and bulk_write with pymongo's operation objects.
+"""
+import copy
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def get_path(doc, path):
+    for part in path.split('.'):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _compare(value, op, arg):
+    if op == '$exists':
+        return (value is not _MISSING) == bool(arg)
+    value = None if value is _MISSING else value
+    if op == '$ne':
+        return value != arg
+    if op == '$in':
+        return value in arg
+    if op == '$nin':
+        return value not in arg
+    if value is None:
+        return False
+    if op == '$lt':
+        return value < arg
+    if op == '$lte':
+        return value <= arg
+    if op == '$gt':
+        return value > arg
+    if op == '$gte':
+        return value >= arg
+    raise NotImplementedError(op)
+
+
+def matches(doc, query):
+    for field, cond in query.items():
+        if field == '$or':
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif field == '$and':
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+            value = get_path(doc, field)
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        else:
+            value = get_path(doc, field)
+            if (None if value is _MISSING else value) != cond:
+                return False
+    return True
+
+
+def evaluate(expr, doc, variables):
+    """The aggregation expressions pipeline updates in the app use"""
+    if isinstance(expr, str) and expr.startswith('$$'):
+        name, _, path = expr[2:].partition('.')
+        value = variables[name]
+        return get_path(value, path) if path else value
+    if isinstance(expr, str) and expr.startswith('$'):
+        value = get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(e, doc, variables) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith('$'):
+        # Object literal, e.g. a new array element
+        return {k: evaluate(v, doc, variables) for k, v in expr.items()}
+    op, args = next(iter(expr.items()))
+    if op == '$filter':
+        items = evaluate(args['input'], doc, variables) or []
+        return [item for item in items if evaluate(args['cond'], doc, dict(variables, this=item))]
+    values = [evaluate(a, doc, variables) for a in (args if isinstance(args, list) else [args])]
+    if op == '$ifNull':
+        return next((v for v in values if v is not None), None)
+    if op == '$add':
+        # As on the server, numbers added to a date are milliseconds
+        if isinstance(values[0], datetime):
+            return values[0] + timedelta(milliseconds=sum(values[1:]))
+        return sum(values[1:], values[0])
+    if op == '$subtract':
+        return values[0] - values[1]
+    if op == '$concatArrays':
+        return list(itertools.chain.from_iterable(values))
+    if op in ('$gt', '$lt', '$gte', '$lte'):
+        return _compare(values[0], op, values[1])
+    if op == '$max':
+        return max(v for v in values if v is not None)
+    raise NotImplementedError(op)
+
+
+class Result:
+
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None, inserted_id=None, deleted_count=0):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.inserted_id = inserted_id
+        self.deleted_count = deleted_count
+
+
+class Cursor(list):
+    """find() result: a list that accepts the cursor modifiers the app chains"""
+
+    def batch_size(self, n):
+        return self
+
+    def hint(self, index):
+        return self
+
+    def limit(self, n):
+        return Cursor(self[:n]) if n else self
+
+    def sort(self, key, direction=1):
+        if isinstance(key, list):
+            key, direction = key[0]
+        return Cursor(sorted(self, key=lambda d: get_path(d, key), reverse=direction < 0))
+
+
+class FakeCollection:
+    """Dict-backed collection keyed by _id"""
+
+    def __init__(self, name='fake', database=None):
+        self.name = name
+        self.database = database
+        self.docs = {}
+        self.indexes = []
+        self._lock = threading.RLock()
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return '_'.join(f"{k}_{v}" for k, v in keys)
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            return Cursor(copy.deepcopy(d) for d in self.docs.values() if matches(d, query or {}))
+
+    def find_one(self, query=None, projection=None, sort=None):
+        found = self.find(query)
+        if sort:
+            found = found.sort(sort)
+        return found[0] if found else None
+
+    def count_documents(self, query, limit=0):
+        found = len(self.find(query))
+        return min(found, limit) if limit else found
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def distinct(self, field, query=None):
+        values = []
+        for doc in self.find(query):
+            value = get_path(doc, field)
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def insert_one(self, doc):
+        with self._lock:
+            doc.setdefault('_id', ObjectId())
+            if doc['_id'] in self.docs:
+                raise DuplicateKeyError(f"duplicate key: {doc['_id']}")
+            self.docs[doc['_id']] = copy.deepcopy(doc)
+            return Result(inserted_id=doc['_id'])
+
+    def insert_many(self, docs):
+        for doc in docs:
+            self.insert_one(doc)
+
+    def replace_one(self, query, doc, upsert=False):
+        with self._lock:
+            current = self._first(query)
+            if current is None and not upsert:
+                return Result()
+            _id = current['_id'] if current is not None else query.get('_id', doc.get('_id', ObjectId()))
+            self.docs[_id] = dict(copy.deepcopy(doc), _id=_id)
+            return Result(matched_count=int(current is not None), upserted_id=None if current is not None else _id)
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            doc = self._first(query)
+            if doc is not None:
+                self._apply(doc, update, inserting=False)
+                return Result(matched_count=1, modified_count=1)
+            if upsert:
+                doc = self._upsert(query, update)
+                return Result(upserted_id=doc['_id'])
+            return Result()
+
+    def update_many(self, query, update, upsert=False):
+        with self._lock:
+            found = [d for d in self.docs.values() if matches(d, query)]
+            for doc in found:
+                self._apply(doc, update, inserting=False)
+            if not found and upsert:
+                self._upsert(query, update)
+            return Result(matched_count=len(found), modified_count=len(found))
+
+    def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False):
+        with self._lock:
+            doc = self._first(query)
+            if doc is None:
+                if not upsert:
+                    return None
+                doc = self._upsert(query, update)
+                return copy.deepcopy(doc) if return_document else None
+            before = copy.deepcopy(doc)
+            self._apply(doc, update, inserting=False)
+            return copy.deepcopy(doc) if return_document else before
+
+    def delete_one(self, query):
+        with self._lock:
+            doc = self._first(query)
+            if doc is not None:
+                del self.docs[doc['_id']]
+            return Result(deleted_count=int(doc is not None))
+
+    def delete_many(self, query):
+        with self._lock:
+            found = [d['_id'] for d in self.docs.values() if matches(d, query)]
+            for _id in found:
+                del self.docs[_id]
+            return Result(deleted_count=len(found))
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            kind = type(op).__name__
+            if kind == 'InsertOne':
+                self.insert_one(op._doc)
+            elif kind == 'UpdateOne':
+                self.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif kind == 'UpdateMany':
+                self.update_many(op._filter, op._doc, upsert=op._upsert)
+            elif kind == 'ReplaceOne':
+                self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            elif kind == 'DeleteOne':
+                self.delete_one(op._filter)
+            elif kind == 'DeleteMany':
+                self.delete_many(op._filter)
+            else:
+                raise NotImplementedError(kind)
+
+    def _first(self, query):
+        return next((d for d in self.docs.values() if matches(d, query)), None)
+
+    def _upsert(self, query, update):
+        doc = {k: copy.deepcopy(v) for k, v in query.items()
+               if not k.startswith('$') and not (isinstance(v, dict) and any(op.startswith('$') for op in v))}
+        doc.setdefault('_id', ObjectId())
+        if doc['_id'] in self.docs:
+            raise DuplicateKeyError(f"duplicate key: {doc['_id']}")
+        self._apply(doc, update, inserting=True)
+        self.docs[doc['_id']] = doc
+        return doc
+
+    def _apply(self, doc, update, inserting):
+        if isinstance(update, list):
+            variables = {'NOW': datetime.now(timezone.utc)}
+            for stage in update:
+                for field, expr in stage['$set'].items():
+                    set_path(doc, field, copy.deepcopy(evaluate(expr, doc, variables)))
+            return
+        for op, fields in update.items():
+            for field, value in fields.items():
+                if op == '$set' or (op == '$setOnInsert' and inserting):
+                    set_path(doc, field, copy.deepcopy(value))
+                elif op == '$inc':
+                    current = get_path(doc, field)
+                    set_path(doc, field, (0 if current is _MISSING else current) + value)
+                elif op == '$unset':
+                    parent, _, last = field.rpartition('.')
+                    container = get_path(doc, parent) if parent else doc
+                    if isinstance(container, dict):
+                        container.pop(last, None)
+                elif op == '$pull':
+                    items = get_path(doc, field)
+                    if items is not _MISSING:
+                        set_path(doc, field, [i for i in items if not (matches(i, value) if isinstance(value, dict) else i == value)])
+                elif op != '$setOnInsert':
+                    raise NotImplementedError(op)
+
+
+class FakeDatabase:
+    """Collections created on first access, by attribute or by name"""
+
+    def __init__(self, name='fake'):
+        self.name = name
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, database=self)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def with_options(self, **kwargs):
+        return self
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+
+# app.py globals and the collection each one names
+APP_COLLECTIONS = {
+    'POLICE_users': 'POLICE_users',
+    'incidents_collection': 'incidents',
+    'incidents_police_collection': 'incidents_police',
+    'police_officers_collection': 'police_officers',
+    'assigned_cases_collection': 'ASSIGNED_CASES',
+    'police_stations_collection': 'police_stations',
+    'geocode_cache_collection': 'geocode_cache',
+    'incident_sync_collection': 'incident_sync',
+    'incident_tombstones_collection': 'incident_tombstones',
+    'incident_stats_collection': 'incident_stats',
+    'incident_rollups_collection': 'incident_rollups',
+    'rate_limits_collection': 'rate_limits',
+}
+
+
+def patch_app_database(test, module):
+    """Point app.py's db and collection globals at a FakeDatabase for the duration of a test"""
+    fake = FakeDatabase()
+    patches = {'db': fake}
+    patches.update({attr: fake[name] for attr, name in APP_COLLECTIONS.items()})
+    patcher = mock.patch.multiple(module, **patches)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return fake
@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+import app as swiftaid
+from tests.fakes import patch_app_database
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+
+def decode(payload):
+    """Rows of the columnar payload, as a client would rebuild them"""
+    rows = {}
+    for i, _id in enumerate(payload['ids']):
+        rows[_id] = {'lat': payload['lat'][i] / payload['scale'], 'lng': payload['lng'][i] / payload['scale']}
+        for field in ('source', 'severity', 'status'):
+            rows[_id][field] = payload['enums'][field][payload[field][i]]
+    return rows
+
+
+class CompactMarkersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = patch_app_database(self, swiftaid)
+        now = datetime.now(timezone.utc)
+        self.police = [
+            {'_id': ObjectId(), 'title': 'Accident', 'severity': 'high', 'status': 'assigned', 'latitude': 13.0160123,
+             'longitude': 77.6230456, 'address': 'K.G. Halli', 'police_station': 'K.G. Halli Police Station', 'created_at': now},
+            # A status the enum table doesn't know yet
+            {'_id': ObjectId(), 'title': 'Riot', 'severity': 'medium', 'status': 'escalated', 'latitude': 13.1,
+             'longitude': 77.59, 'address': 'Yelahanka', 'police_station': 'Yelahanka Police Station', 'created_at': now},
+        ]
+        self.public = [{'_id': ObjectId(), 'user_name': 'Asha', 'lat': 13.1010, 'lng': 77.5960, 'speed': 0,
+                        'address': 'Yelahanka', 'timestamp': now}]
+        self.db['incidents_police'].insert_many(self.police)
+        self.db['incidents'].insert_many(self.public)
+        swiftaid.refresh_incident_views('police', [raw['_id'] for raw in self.police])
+        swiftaid.refresh_incident_views('public', [raw['_id'] for raw in self.public])
+
+    def test_columns_decode_to_the_views(self):
+        payload = swiftaid.fetch_incident_markers()
+        self.assertEqual((payload['format'], payload['count'], payload['scale']), ('compact', 3, 10 ** 5))
+        self.assertTrue(all(isinstance(v, int) for v in payload['lat'] + payload['lng']))
+        rows = decode(payload)
+        self.assertEqual(rows[str(self.police[0]['_id'])],
+                         {'lat': 13.01601, 'lng': 77.62305, 'source': 'police', 'severity': 'high', 'status': 'assigned'})
+        self.assertEqual(rows[str(self.public[0]['_id'])],
+                         {'lat': 13.101, 'lng': 77.596, 'source': 'public', 'severity': 'low', 'status': 'active'})
+
+    def test_unknown_values_extend_this_payloads_table_only(self):
+        payload = swiftaid.fetch_incident_markers()
+        self.assertEqual(payload['enums']['status'], swiftaid.COMPACT_ENUMS['status'] + ['escalated'])
+        self.assertEqual(decode(payload)[str(self.police[1]['_id'])]['status'], 'escalated')
+        self.assertNotIn('escalated', swiftaid.COMPACT_ENUMS['status'])
+
+    def test_scoped_markers(self):
+        payload = swiftaid.fetch_incident_markers(swiftaid.station_incident_match('K.G. Halli Police Station'))
+        # The station's own incident plus the public SOS in its district (01), not Yelahanka's incident
+        self.assertEqual(sorted(payload['ids']), sorted([str(self.police[0]['_id']), str(self.public[0]['_id'])]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bson import ObjectId
+
+import app as swiftaid
+from tests.fakes import patch_app_database
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+
+class SyncSequenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = patch_app_database(self, swiftaid)
+
+    def test_watermark_stays_below_unfinished_writes(self):
+        self.assertEqual(swiftaid.sync_state(), (0, 0))
+        with swiftaid.reserve_sync_seq() as slow:
+            with swiftaid.reserve_sync_seq(3) as fast:
+                self.assertEqual((slow, fast), (1, 4))
+            # 2-4 have landed but 1 hasn't, so a client must not skip past 0 yet
+            self.assertEqual(swiftaid.sync_state(), (4, 0))
+        self.assertEqual(swiftaid.sync_state(), (4, 4))
+        self.assertEqual(self.db['incident_sync'].find_one({'_id': 'incidents'})['pending'], [])
+
+    def test_expired_reservations_release_the_watermark(self):
+        with mock.patch.dict(swiftaid.app.config, SYNC_SEQ_RESERVATION_SECONDS=-1):
+            with swiftaid.reserve_sync_seq():
+                # A writer that died mid-write stops holding clients back once its reservation expires
+                self.assertEqual(swiftaid.sync_state(), (1, 1))
+
+    def test_tombstones_are_recorded_once(self):
+        incident_id = ObjectId()
+        swiftaid.record_tombstone('public', incident_id)
+        swiftaid.record_tombstone('public', incident_id)
+        tombstones = self.db['incident_tombstones'].find()
+        self.assertEqual([(t['_id'], t['source'], t['sync_seq']) for t in tombstones], [(str(incident_id), 'public', 1)])
+        self.assertEqual(swiftaid.sync_state(), (1, 1))
+
+
+class IncidentsEtagTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = patch_app_database(self, swiftaid)
+        swiftaid.user_cache.clear()
+        self.addCleanup(swiftaid.user_cache.clear)
+        user_id = self.db['POLICE_users'].insert_one({
+            'username': 'kgh', 'email': 'kgh@example.com', 'role': 'police',
+            'police_station': 'K.G. Halli Police Station', 'police_station_reg_no': '010030'}).inserted_id
+        self.client = swiftaid.app.test_client()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        self.sos = {'_id': ObjectId(), 'user_name': 'Asha', 'lat': 13.0170, 'lng': 77.6220, 'speed': 0,
+                    'address': 'K.G. Halli', 'timestamp': datetime.now(timezone.utc)}
+        self.db['incidents'].insert_one(dict(self.sos))
+        swiftaid.refresh_incident_views('public', [self.sos['_id']])
+
+    def get(self, etag=None, **args):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get('/api/incidents', query_string=dict(args, format='compact'), headers=headers)
+
+    def test_unchanged_polls_get_304(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_json()['ids'], [str(self.sos['_id'])])
+        repeat = self.get(first.headers['ETag'].strip('"'))
+        self.assertEqual((repeat.status_code, repeat.data), (304, b''))
+        # Different query, different representation
+        self.assertEqual(self.get(first.headers['ETag'].strip('"'), since=0).status_code, 200)
+
+    def test_writes_move_the_etag(self):
+        etag = self.get().headers['ETag'].strip('"')
+        response = self.client.post('/api/incidents', json={'title': 'Accident', 'severity': 'high', 'latitude': 13.016,
+                                                            'longitude': 77.623, 'address': 'K.G. Halli'})
+        self.assertEqual(response.status_code, 200)
+        after_insert = self.get(etag)
+        self.assertEqual(after_insert.status_code, 200)
+        self.assertEqual(after_insert.get_json()['count'], 2)
+
+        # Another app edits the SOS; rebuilding its view from the change stream takes a new sync_seq
+        etag = after_insert.headers['ETag'].strip('"')
+        self.db['incidents'].update_one({'_id': self.sos['_id']}, {'$set': {'speed': 15}})
+        swiftaid.refresh_changed_incident('public', {
+            'operationType': 'update', 'documentKey': {'_id': self.sos['_id']},
+            'updateDescription': {'updatedFields': {'speed': 15}, 'removedFields': []}})
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_delta_returns_changes_and_tombstones_since(self):
+        full = self.get()
+        watermark = int(full.headers['X-Sync-Watermark'])
+        self.assertEqual(watermark, 1)
+        self.db['incidents'].delete_one({'_id': self.sos['_id']})
+        swiftaid.record_tombstone('public', self.sos['_id'])
+        delta = self.get(since=watermark).get_json()
+        self.assertEqual((delta['since'], delta['watermark']), (1, 2))
+        self.assertEqual(delta['incidents']['ids'], [])
+        self.assertEqual(delta['tombstones'], [{'id': str(self.sos['_id']), 'source': 'public'}])
+        self.assertEqual(self.get(since='x').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
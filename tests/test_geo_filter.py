@@ -0,0 +1,52 @@
+import unittest
+
+import app as swiftaid
+from app import parse_geo_filter
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+
+def ring(geo_filter):
+    return geo_filter['location']['$geoWithin']['$geometry']['coordinates'][0]
+
+
+class ParseGeoFilterTest(unittest.TestCase):
+
+    def test_no_filter(self):
+        self.assertIsNone(parse_geo_filter({}))
+
+    def test_bbox_becomes_a_closed_polygon(self):
+        self.assertEqual(ring(parse_geo_filter({'bbox': '77.5,12.9,77.7,13.1'})),
+                         [[77.5, 12.9], [77.7, 12.9], [77.7, 13.1], [77.5, 13.1], [77.5, 12.9]])
+
+    def test_bbox_past_the_antimeridian_is_clamped(self):
+        self.assertEqual(ring(parse_geo_filter({'bbox': '100,-95,200,95'}))[:3],
+                         [[100.0, -90.0], [180.0, -90.0], [180.0, 90.0]])
+
+    def test_hemisphere_wide_boxes_drop_the_filter(self):
+        # MongoDB reads a polygon 180° or wider as its complement, or rejects it outright
+        self.assertIsNone(parse_geo_filter({'bbox': '-90,-10,90,10'}))
+        self.assertIsNone(parse_geo_filter({'bbox': '-540,-85,540,85'}))
+        self.assertIsNotNone(parse_geo_filter({'bbox': '-89.9,-10,90,10'}))
+
+    def test_invalid_bboxes(self):
+        for bbox in ('77.7,12.9,77.5,13.1', '77.5,13.1,77.7,12.9', '1,2,3', 'a,b,c,d', '200,0,300,10'):
+            with self.assertRaises(ValueError, msg=bbox):
+                parse_geo_filter({'bbox': bbox})
+
+    def test_near_uses_a_radian_radius(self):
+        center, radius = parse_geo_filter({'near': '12.97,77.59', 'radius': '6378.1'})['location']['$geoWithin']['$centerSphere']
+        self.assertEqual(center, [77.59, 12.97])
+        self.assertAlmostEqual(radius, 0.001)
+        default = parse_geo_filter({'near': '12.97,77.59'})['location']['$geoWithin']['$centerSphere'][1]
+        self.assertAlmostEqual(default * swiftaid.EARTH_RADIUS_M, 5000)
+
+    def test_invalid_radius(self):
+        for args in ({'near': '12.97,77.59', 'radius': '0'}, {'near': '12.97,77.59', 'radius': 'far'}, {'near': '12.97'}):
+            with self.assertRaises(ValueError, msg=args):
+                parse_geo_filter(args)
+
+
+if __name__ == '__main__':
+    unittest.main()
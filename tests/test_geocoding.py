@@ -0,0 +1,358 @@
+import json
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from geocoding import (AddressEnricher, BatchGeocoder, CachedGeocoder, GeocodeCache, GeocodeError,
+                       NominatimGeocoder, SharedRateLimiter, TokenBucket)
+from tests.fakes import FakeCollection
+
+
+class StubResolver:
+    """Answers from a dict, failing the first `failures` calls; `gate` holds every call until set"""
+
+    def __init__(self, addresses=None, failures=0, gate=None):
+        self.addresses = addresses or {}
+        self.failures = failures
+        self.gate = gate
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def reverse(self, lat, lng):
+        with self._lock:
+            self.calls.append((lat, lng))
+            failing = len(self.calls) <= self.failures
+        if self.gate is not None:
+            self.gate.wait(5)
+        if failing:
+            raise GeocodeError('stub outage')
+        return self.addresses.get((lat, lng))
+
+
+class GeocodeCacheTest(unittest.TestCase):
+
+    def test_key_rounds_to_precision(self):
+        cache = GeocodeCache(precision=3)
+        self.assertEqual(cache.key(12.97164, 77.59456), '12.972,77.595')
+        self.assertEqual(cache.key('12.9716', '77.5946'), cache.key(12.97159, 77.59461))
+
+    def test_memory_hit_and_miss_counters(self):
+        cache = GeocodeCache()
+        self.assertEqual(cache.get(12.97, 77.59), (False, None))
+        cache.put(12.97, 77.59, 'MG Road')
+        self.assertEqual(cache.get(12.97, 77.59), (True, 'MG Road'))
+        stats = cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_expired_entries_are_misses(self):
+        cache = GeocodeCache(ttl=timedelta(0))
+        cache.put(12.97, 77.59, 'MG Road')
+        self.assertEqual(cache.get(12.97, 77.59), (False, None))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_negative_results_use_their_own_ttl(self):
+        cache = GeocodeCache(negative_ttl=timedelta(hours=1))
+        cache.put(12.97, 77.59, None)
+        self.assertEqual(cache.get(12.97, 77.59), (True, None))
+        self.assertEqual(cache.stats()['negative_hits'], 1)
+
+        short = GeocodeCache(negative_ttl=timedelta(0))
+        short.put(12.97, 77.59, None)
+        short.put(13.0, 77.6, 'Hebbal')
+        self.assertEqual(short.get(12.97, 77.59), (False, None))
+        self.assertEqual(short.get(13.0, 77.6), (True, 'Hebbal'))
+
+    def test_lru_eviction(self):
+        cache = GeocodeCache(max_entries=2)
+        cache.put(1, 1, 'a')
+        cache.put(2, 2, 'b')
+        cache.get(1, 1)
+        cache.put(3, 3, 'c')
+        self.assertEqual(cache.get(2, 2), (False, None))
+        self.assertEqual(cache.get(1, 1), (True, 'a'))
+        self.assertEqual(cache.get(3, 3), (True, 'c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_store_tier_survives_a_new_process(self):
+        store = FakeCollection()
+        GeocodeCache(collection=store).put(12.97, 77.59, 'MG Road')
+        fresh = GeocodeCache(collection=store)
+        self.assertEqual(fresh.get(12.97, 77.59), (True, 'MG Road'))
+        self.assertEqual(fresh.get(12.97, 77.59), (True, 'MG Road'))
+        stats = fresh.stats()
+        self.assertEqual((stats['store_hits'], stats['memory_hits']), (1, 1))
+
+    def test_expired_store_documents_are_ignored(self):
+        store = FakeCollection()
+        cache = GeocodeCache(collection=store)
+        key = cache.key(12.97, 77.59)
+        store.docs[key] = {'_id': key, 'address': 'MG Road',
+                           'expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)}
+        self.assertEqual(cache.get(12.97, 77.59), (False, None))
+
+    def test_naive_store_timestamps_are_read_as_utc(self):
+        store = FakeCollection()
+        cache = GeocodeCache(collection=store)
+        key = cache.key(12.97, 77.59)
+        expires = (datetime.now(timezone.utc) + timedelta(hours=1)).replace(tzinfo=None)
+        store.docs[key] = {'_id': key, 'address': 'MG Road', 'expires_at': expires}
+        self.assertEqual(cache.get(12.97, 77.59), (True, 'MG Road'))
+
+
+class CachedGeocoderTest(unittest.TestCase):
+
+    def test_resolves_once_per_rounded_point(self):
+        resolver = StubResolver({(12.97161, 77.59461): 'MG Road'})
+        geocoder = CachedGeocoder(GeocodeCache(precision=4), resolver)
+        self.assertEqual(geocoder.lookup(12.97161, 77.59461), 'MG Road')
+        self.assertEqual(geocoder.lookup(12.97159, 77.59459), 'MG Road')
+        self.assertEqual(len(resolver.calls), 1)
+
+    def test_transient_errors_are_not_cached(self):
+        resolver = StubResolver({(1, 1): 'a'}, failures=1)
+        geocoder = CachedGeocoder(GeocodeCache(), resolver)
+        with self.assertRaises(GeocodeError):
+            geocoder.lookup(1, 1)
+        self.assertEqual(geocoder.lookup(1, 1), 'a')
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_acquire_is_paced_to_the_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # The first token is already there; the other five take 1/50 s each
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_capacity_allows_a_burst(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+class BrokenCollection:
+
+    def find_one_and_update(self, *args, **kwargs):
+        raise ConnectionError('no primary')
+
+
+class SharedRateLimiterTest(unittest.TestCase):
+
+    def test_processes_share_one_schedule(self):
+        store = FakeCollection('rate_limits')
+        # Two limiters stand in for two worker processes
+        limiters = [SharedRateLimiter(store, 'nominatim', rate=50) for _ in range(2)]
+        start = time.monotonic()
+        for _ in range(3):
+            for limiter in limiters:
+                limiter.acquire()
+        # Six calls at 50/s between them: the last slot is 5/50 s after the first
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual([l.counters['acquired'] for l in limiters], [3, 3])
+        self.assertEqual(len(store.docs), 1)
+
+    def test_an_idle_limiter_does_not_wait(self):
+        store = FakeCollection('rate_limits')
+        limiter = SharedRateLimiter(store, 'nominatim', rate=1)
+        limiter.acquire()
+        store.docs['nominatim']['next_at'] -= timedelta(seconds=5)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_falls_back_to_the_local_limiter(self):
+        fallback = TokenBucket(rate=50, capacity=1)
+        limiter = SharedRateLimiter(BrokenCollection(), 'nominatim', rate=1, fallback=fallback)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(limiter.counters, {'acquired': 0, 'fallbacks': 3})
+
+
+class AddressEnricherTest(unittest.TestCase):
+
+    def make(self, resolver, **kwargs):
+        done = threading.Event()
+        writes = []
+
+        def writer(*args):
+            writes.append(args)
+            done.set()
+
+        kwargs.setdefault('backoff', 0.001)
+        enricher = AddressEnricher(CachedGeocoder(GeocodeCache(), resolver), writer, workers=1, **kwargs)
+        return enricher, writes, done
+
+    def test_retries_transient_errors_with_backoff(self):
+        resolver = StubResolver({(1, 1): 'a'}, failures=2)
+        enricher, writes, done = self.make(resolver, max_retries=4)
+        self.assertTrue(enricher.submit('public', 'id1', 1, 1))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(writes, [('public', 'id1', 1, 1, 'a', True)])
+        self.assertEqual(len(resolver.calls), 3)
+        self.assertEqual(enricher.stats()['retries'], 2)
+
+    def test_gives_up_after_max_retries(self):
+        resolver = StubResolver(failures=10)
+        enricher, writes, done = self.make(resolver, max_retries=1)
+        enricher.submit('police', 'id1', 1, 1)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(writes, [('police', 'id1', 1, 1, None, False)])
+        self.assertEqual(len(resolver.calls), 2)
+
+    def test_cache_hits_skip_the_resolver(self):
+        resolver = StubResolver()
+        enricher, writes, done = self.make(resolver)
+        enricher.geocoder.cache.put(1, 1, 'cached')
+        enricher.submit('public', 'id1', 1, 1)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(writes[0][4:], ('cached', True))
+        self.assertEqual(resolver.calls, [])
+
+    def test_duplicate_and_overflow_submits_are_refused(self):
+        gate = threading.Event()
+        resolver = StubResolver({(1, 1): 'a'}, gate=gate)
+        enricher, writes, done = self.make(resolver, queue_size=1)
+        try:
+            self.assertTrue(enricher.submit('public', 'id1', 1, 1))
+            self.assertFalse(enricher.submit('public', 'id1', 1, 1))
+            # id1 is being worked on (or queued); fill the single queue slot, then overflow it
+            while not resolver.calls:
+                time.sleep(0.001)
+            self.assertTrue(enricher.submit('public', 'id2', 2, 2))
+            self.assertFalse(enricher.submit('public', 'id3', 3, 3))
+            self.assertEqual(enricher.stats()['dropped'], 1)
+        finally:
+            gate.set()
+
+
+class BatchGeocoderTest(unittest.TestCase):
+
+    def test_concurrent_lookups_share_one_future(self):
+        gate = threading.Event()
+        resolver = StubResolver({(12.97161, 77.59461): 'MG Road'}, gate=gate)
+        batch = BatchGeocoder(CachedGeocoder(GeocodeCache(precision=4), resolver), max_workers=2)
+        first = batch.lookup_async(12.97161, 77.59461)
+        second = batch.lookup_async(12.97159, 77.59459)
+        self.assertIs(first, second)
+        gate.set()
+        self.assertEqual(second.result(5), 'MG Road')
+        self.assertEqual(len(resolver.calls), 1)
+        self.assertEqual(batch.stats()['coalesced'], 1)
+
+    def test_resolve_many_dedupes_and_uses_the_cache(self):
+        resolver = StubResolver({(1, 1): 'a', (2, 2): 'b'})
+        geocoder = CachedGeocoder(GeocodeCache(precision=1), resolver)
+        geocoder.cache.put(3, 3, 'cached')
+        batch = BatchGeocoder(geocoder)
+        results = batch.resolve_many([(1, 1), (2, 2), (1, 1), (3, 3)], timeout=5)
+        self.assertEqual(results, {'1.0,1.0': 'a', '2.0,2.0': 'b', '3.0,3.0': 'cached'})
+        self.assertEqual(sorted(resolver.calls), [(1, 1), (2, 2)])
+
+    def test_resolve_many_leaves_out_slow_and_failed_keys(self):
+        gate = threading.Event()
+        slow = StubResolver({(1, 1): 'a'}, gate=gate)
+        batch = BatchGeocoder(CachedGeocoder(GeocodeCache(precision=1), slow))
+        try:
+            self.assertEqual(batch.resolve_many([(1, 1)], timeout=0.05), {})
+        finally:
+            gate.set()
+
+        failing = BatchGeocoder(CachedGeocoder(GeocodeCache(precision=1), StubResolver(failures=1)))
+        self.assertEqual(failing.resolve_many([(1, 1)], timeout=5), {})
+
+
+class NominatimStandIn(BaseHTTPRequestHandler):
+    """Local /reverse endpoint: 503 south of the equator, no address at 0,0, a name otherwise"""
+
+    requests = []
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        type(self).requests.append((query, self.headers.get('User-Agent')))
+        lat, lng = float(query['lat']), float(query['lon'])
+        if lat < 0:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = {} if (lat, lng) == (0, 0) else {'display_name': f"Place at {lat},{lng}"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class NominatimGeocoderTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), NominatimStandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/reverse"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        NominatimStandIn.requests = []
+
+    def test_reverse_returns_display_name(self):
+        timings = []
+        geocoder = NominatimGeocoder(self.url, user_agent='tests/1.0', observer=timings.append)
+        self.assertEqual(geocoder.reverse(12.97, 77.59), 'Place at 12.97,77.59')
+        query, agent = NominatimStandIn.requests[0]
+        self.assertEqual((query['format'], query['lat'], query['lon'], agent), ('json', '12.97', '77.59', 'tests/1.0'))
+        self.assertEqual(len(timings), 1)
+
+    def test_no_address_is_none_and_errors_raise(self):
+        geocoder = NominatimGeocoder(self.url)
+        self.assertIsNone(geocoder.reverse(0, 0))
+        with self.assertRaises(GeocodeError):
+            geocoder.reverse(-1, 77.59)
+
+    def test_unreachable_service_raises_geocode_error(self):
+        timings = []
+        geocoder = NominatimGeocoder('http://127.0.0.1:9/reverse', timeout=1, observer=timings.append)
+        with self.assertRaises(GeocodeError):
+            geocoder.reverse(12.97, 77.59)
+        self.assertEqual(len(timings), 1)
+
+    def test_enricher_against_the_stand_in_respects_the_limiter(self):
+        limiter = TokenBucket(rate=20, capacity=1)
+        resolver = NominatimGeocoder(self.url, limiter=limiter)
+        writes = []
+        finished = threading.Semaphore(0)
+
+        def writer(*args):
+            writes.append(args)
+            finished.release()
+
+        enricher = AddressEnricher(CachedGeocoder(GeocodeCache(), resolver), writer, workers=3, backoff=0.001)
+        start = time.monotonic()
+        for i in range(4):
+            enricher.submit('public', f"id{i}", 10 + i, 77)
+        for _ in range(4):
+            self.assertTrue(finished.acquire(timeout=5))
+        self.assertGreaterEqual(time.monotonic() - start, 0.14)
+        self.assertEqual(sorted(w[4] for w in writes), [f"Place at {10 + i}.0,77.0" for i in range(4)])
+        self.assertEqual(len(NominatimStandIn.requests), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from bson import ObjectId
+
+import app as swiftaid
+from tests.fakes import FakeCollection, patch_app_database
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+COUNTED_FIELDS = ('total', 'source', 'status', 'severity', 'assigned', 'unassigned')
+
+
+def police_incident(station, severity='medium', status='pending', hours_ago=1):
+    return {'_id': ObjectId(), 'title': 'Chain snatching', 'incident_type': 'Theft', 'severity': severity,
+            'status': status, 'latitude': 13.1, 'longitude': 77.59, 'address': 'Yelahanka', 'police_station': station,
+            'created_at': datetime.now(timezone.utc) - timedelta(hours=hours_ago)}
+
+
+def public_sos(lat, lng, speed=0, hours_ago=1):
+    return {'_id': ObjectId(), 'user_name': 'Asha', 'lat': lat, 'lng': lng, 'speed': speed, 'address': 'Somewhere',
+            'timestamp': datetime.now(timezone.utc) - timedelta(hours=hours_ago)}
+
+
+def counters(collection):
+    """Counter documents without their zeroes: $inc leaves them behind, a recount never writes them"""
+    found = {}
+    for doc in collection.find():
+        found[doc['_id']] = {k: {key: n for key, n in doc[k].items() if n} if isinstance(doc.get(k), dict) else doc.get(k, 0)
+                             for k in COUNTED_FIELDS}
+    return found
+
+
+class IncidentStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = patch_app_database(self, swiftaid)
+        self.police = [police_incident('Yelahanka Police Station', 'high'),
+                       police_incident('Yelahanka Police Station', 'low', 'resolved', hours_ago=30),
+                       police_incident('K.G. Halli Police Station')]
+        # Two SOS near Yelahanka (district 01) and one far out at sea, beyond any station
+        self.public = [public_sos(13.1010, 77.5960), public_sos(13.0170, 77.6220, speed=12), public_sos(20.0, 70.0)]
+        self.db['incidents_police'].insert_many(self.police)
+        self.db['incidents'].insert_many(self.public)
+        self.db['ASSIGNED_CASES'].insert_one({'incident_id': str(self.police[2]['_id']), 'assigned_officer': 'Ravi'})
+
+    def test_reconcile_fills_every_counter_scope(self):
+        self.db['incident_stats'].insert_one({'_id': 'station:Closed Police Station', 'total': 4})
+        self.assertEqual(swiftaid.reconcile_incident_stats(), 6)
+        stats = counters(self.db['incident_stats'])
+        self.assertEqual(set(stats), {'global', 'station:Yelahanka Police Station', 'station:K.G. Halli Police Station',
+                                      'district:01', 'untagged'})
+        yelahanka = stats['station:Yelahanka Police Station']
+        self.assertEqual((yelahanka['total'], yelahanka['severity'], yelahanka['status']),
+                         (2, {'high': 1, 'low': 1}, {'pending': 1, 'resolved': 1}))
+        self.assertEqual((stats['station:K.G. Halli Police Station']['assigned'], stats['district:01']['total'],
+                          stats['district:01']['severity'], stats['untagged']['total']),
+                         (1, 2, {'low': 1, 'high': 1}, 1))
+
+        # Every incident is in exactly one of the scoped documents, so they add up to 'global'
+        scoped = swiftaid.incident_counts([doc_id for doc_id in stats if doc_id != 'global'])
+        self.assertEqual(scoped, swiftaid.incident_counts())
+        self.assertEqual((scoped['total'], scoped['source'], scoped['assigned'], scoped['unassigned']),
+                         (6, {'police': 3, 'public': 3}, 1, 5))
+
+        rollups = self.db['incident_rollups'].find({'scope': 'global'})
+        self.assertEqual(sum(doc['total'] for doc in rollups), 6)
+        for collection in (self.db['incidents_police'], self.db['incidents']):
+            self.assertTrue(all('stats_counted' in raw for raw in collection.find()))
+
+    def test_incremental_counters_match_a_recount(self):
+        swiftaid.refresh_incident_views('police', [raw['_id'] for raw in self.police])
+        swiftaid.refresh_incident_views('public', [raw['_id'] for raw in self.public])
+        # The public app reports the SOS at sea as moving; its view is rebuilt from the change stream
+        self.db['incidents'].update_one({'_id': self.public[2]['_id']}, {'$set': {'speed': 20}})
+        swiftaid.refresh_incident_views('public', [self.public[2]['_id']])
+        incremental = counters(self.db['incident_stats'])
+        self.assertEqual(incremental['untagged']['severity'], {'high': 1})
+
+        swiftaid.reconcile_incident_stats()
+        self.assertEqual(counters(self.db['incident_stats']), incremental)
+
+    def test_timeseries_sums_the_hourly_rollups(self):
+        swiftaid.reconcile_incident_stats()
+        series = swiftaid.incident_timeseries(['global'], days=2, granularity='hour', group_by='source')
+        self.assertEqual(series['total'], 6)
+        self.assertEqual(len(series['buckets']), 48)
+        self.assertEqual((sum(series['series']['police']), sum(series['series']['public'])), (3, 3))
+
+        station = swiftaid.incident_timeseries(['station:Yelahanka Police Station', 'district:01', 'untagged'],
+                                               days=1, granularity='hour')
+        # The resolved Yelahanka case is 30 hours old, outside a 24 hour window
+        self.assertEqual(station['total'], 4)
+
+
+class StatsMigrationTest(unittest.TestCase):
+
+    def test_only_migration_7_recounts(self):
+        store = FakeCollection('schema_migrations')
+        # Migrations that need a real server (index builds, collMod) count as applied
+        store.insert_many([{'_id': v, 'name': '', 'applied_at': datetime.now(timezone.utc)} for v in (1, 2, 3, 4, 8)])
+        patch_app_database(self, swiftaid)
+        with mock.patch.object(swiftaid.migration_runner, 'collection', store), \
+                mock.patch.object(swiftaid, 'reconcile_incident_stats') as reconcile:
+            calls = []
+            reconcile.side_effect = lambda: calls.append(swiftaid.migration_runner.pending()[0][0])
+            self.assertEqual(swiftaid.migration_runner.run(log=lambda message: None), [5, 6, 7])
+        self.assertEqual(calls, [7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import threading
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bson import ObjectId
+
+import app as swiftaid
+from tests.fakes import patch_app_database
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+# Near Yelahanka Police Station (district 01) in data/police_stations.csv
+LAT, LNG = 13.1010, 77.5960
+
+
+def public_sos(**fields):
+    doc = {'_id': ObjectId(), 'user_name': 'Asha', 'lat': LAT, 'lng': LNG, 'speed': 0, 'address': 'Yelahanka',
+           'timestamp': datetime(2024, 5, 1, 4, 30, tzinfo=timezone.utc)}
+    doc.update(fields)
+    return doc
+
+
+class ExternalChangeTest(unittest.TestCase):
+
+    def change(self, operation, **extra):
+        return dict({'operationType': operation, 'documentKey': {'_id': ObjectId()}}, **extra)
+
+    def test_inserts_without_a_current_view_are_external(self):
+        self.assertTrue(swiftaid.is_external_incident_change(self.change('insert', fullDocument={'lat': 1})))
+        self.assertFalse(swiftaid.is_external_incident_change(
+            self.change('insert', fullDocument={'view_version': swiftaid.INCIDENT_VIEW_VERSION})))
+
+    def test_replaces_are_external(self):
+        self.assertTrue(swiftaid.is_external_incident_change(self.change('replace', fullDocument={})))
+
+    def test_updates_touching_the_view_or_only_bookkeeping_are_ours(self):
+        for fields in ({'view.address': 'x', 'address': 'x', 'sync_seq': 3},
+                       {'view': {}, 'view_version': 4, 'status': 'active'},
+                       {'stats_counted.assigned': True},
+                       {'sync_seq': 9, 'updated_at': datetime.now(timezone.utc)}):
+            change = self.change('update', updateDescription={'updatedFields': fields, 'removedFields': []})
+            self.assertFalse(swiftaid.is_external_incident_change(change), fields)
+
+    def test_raw_field_updates_are_external(self):
+        for description in ({'updatedFields': {'speed': 12}, 'removedFields': []},
+                            {'updatedFields': {'updated_at': 1}, 'removedFields': ['address']},
+                            {'updatedFields': {'metadata.sos_type': 'fire'}}):
+            change = self.change('update', updateDescription=description)
+            self.assertTrue(swiftaid.is_external_incident_change(change), description)
+
+
+class ViewRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = patch_app_database(self, swiftaid)
+        self.incidents = self.db['incidents']
+
+    def test_external_edit_rebuilds_the_view_and_moves_counters(self):
+        raw = public_sos()
+        self.incidents.insert_one(raw)
+        swiftaid.refresh_changed_incident('public', {'operationType': 'insert', 'documentKey': {'_id': raw['_id']},
+                                                     'fullDocument': raw})
+        doc = self.incidents.find_one({'_id': raw['_id']})
+        self.assertEqual((doc['view']['severity'], doc['district_code'], doc['police_station']), ('low', '01', None))
+        first_seq = doc['sync_seq']
+
+        # The public app records a moving phone: the SOS becomes high severity
+        self.incidents.update_one({'_id': raw['_id']}, {'$set': {'speed': 14}})
+        swiftaid.refresh_changed_incident('public', {
+            'operationType': 'update', 'documentKey': {'_id': raw['_id']},
+            'updateDescription': {'updatedFields': {'speed': 14}, 'removedFields': []}})
+        doc = self.incidents.find_one({'_id': raw['_id']})
+        self.assertEqual(doc['view']['severity'], 'high')
+        self.assertGreater(doc['sync_seq'], first_seq)
+        counts = swiftaid.incident_counts(['district:01'])
+        self.assertEqual((counts['total'], counts['severity']), (1, {'low': 0, 'high': 1}))
+
+    def test_own_writes_are_left_alone(self):
+        raw = public_sos()
+        self.incidents.insert_one(raw)
+        swiftaid.refresh_changed_incident('public', {
+            'operationType': 'update', 'documentKey': {'_id': raw['_id']},
+            'updateDescription': {'updatedFields': {'view.address': 'x'}, 'removedFields': []}})
+        self.assertNotIn('view', self.incidents.find_one({'_id': raw['_id']}))
+
+    def test_rebuild_all_covers_current_views(self):
+        raw = public_sos()
+        self.incidents.insert_one(raw)
+        self.assertEqual(swiftaid.repair_stale_views(), {'police': 0, 'public': 1})
+        self.assertEqual(swiftaid.repair_stale_views(), {'police': 0, 'public': 0})
+        self.incidents.update_one({'_id': raw['_id']}, {'$set': {'user_name': 'Ravi'}})
+        self.assertEqual(swiftaid.repair_stale_views(rebuild_all=True), {'police': 0, 'public': 1})
+        self.assertEqual(self.incidents.find_one({'_id': raw['_id']})['view']['title'], 'Emergency Alert from Ravi')
+
+
+class ThrottledRepairTest(unittest.TestCase):
+
+    def setUp(self):
+        for patcher in (mock.patch.object(swiftaid, '_views_repaired_at', None),
+                        mock.patch.object(swiftaid, 'repair_stale_views')):
+            self.repair = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_runs_once_per_interval(self):
+        with mock.patch.dict(swiftaid.app.config, VIEW_REPAIR_INTERVAL_SECONDS=60):
+            for _ in range(3):
+                swiftaid.throttled_view_repair()
+            self.assertEqual(self.repair.call_count, 1)
+        with mock.patch.dict(swiftaid.app.config, VIEW_REPAIR_INTERVAL_SECONDS=0):
+            swiftaid.throttled_view_repair(100)
+        self.repair.assert_called_with(100)
+
+    def test_failed_repairs_are_retried(self):
+        self.repair.side_effect = [RuntimeError('no primary'), {}]
+        with self.assertRaises(RuntimeError):
+            swiftaid.throttled_view_repair()
+        swiftaid.throttled_view_repair()
+        self.assertEqual(self.repair.call_count, 2)
+
+    def test_requests_do_not_wait_for_a_running_repair(self):
+        started, release = threading.Event(), threading.Event()
+        self.repair.side_effect = lambda batch_size: (started.set(), release.wait(5))
+        worker = threading.Thread(target=swiftaid.throttled_view_repair)
+        worker.start()
+        started.wait(5)
+        swiftaid.throttled_view_repair()
+        release.set()
+        worker.join(5)
+        self.assertEqual(self.repair.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
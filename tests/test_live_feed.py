@@ -0,0 +1,135 @@
+import threading
+import unittest
+
+from bson import ObjectId
+
+from live_feed import ChangeStreamSource, LiveFeed, Subscription
+
+
+def drain(subscription):
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+class SubscriptionTest(unittest.TestCase):
+
+    def test_a_full_queue_becomes_one_resync(self):
+        subscription = Subscription(queue_size=3)
+        for i in range(3):
+            subscription.put({'type': 'incident', 'n': i})
+        subscription.put({'type': 'incident', 'n': 3})
+        self.assertEqual(drain(subscription), [{'type': 'resync'}])
+        # Caught up again: events flow as usual
+        subscription.put({'type': 'incident', 'n': 4})
+        self.assertEqual(drain(subscription), [{'type': 'incident', 'n': 4}])
+
+    def test_get_times_out(self):
+        self.assertIsNone(Subscription(queue_size=1).get(timeout=0.01))
+
+
+class LiveFeedTest(unittest.TestCase):
+
+    def test_publish_reaches_every_subscriber(self):
+        feed = LiveFeed(lambda: [], queue_size=4)
+        first, second = Subscription(4), Subscription(4)
+        # Subscribed directly so no watcher thread starts
+        feed._subscribers.update({first, second})
+        feed.publish({'type': 'incident', 'id': 'a'})
+        feed.unsubscribe(second)
+        feed.publish({'type': 'incident', 'id': 'b'})
+        self.assertEqual([e['id'] for e in drain(first)], ['a', 'b'])
+        self.assertEqual([e['id'] for e in drain(second)], ['a'])
+        self.assertEqual(feed.stats(), {'published': 2, 'source_errors': 0, 'subscribers': 1, 'source': None})
+
+    def test_a_slow_subscriber_does_not_hold_back_the_others(self):
+        feed = LiveFeed(lambda: [], queue_size=2)
+        slow, fast = Subscription(2), Subscription(8)
+        feed._subscribers.update({slow, fast})
+        for i in range(5):
+            feed.publish({'type': 'incident', 'id': i})
+        self.assertEqual([e['id'] for e in drain(fast)], [0, 1, 2, 3, 4])
+        # Overflowing at 2 and again at 4 leaves only the marker telling the page to reload
+        self.assertEqual(drain(slow), [{'type': 'resync'}])
+
+    def test_source_failures_resync_subscribers_and_reconnect(self):
+        calls = []
+        reconnected = threading.Event()
+
+        def source():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                return self.failing_source()
+            reconnected.set()
+            # The replacement source waits for changes that never come
+            return iter(threading.Event().wait, True)
+
+        feed = LiveFeed(source, queue_size=8, retry_delay=0.01)
+        subscription = feed.subscribe()
+        self.assertTrue(reconnected.wait(5))
+        self.assertEqual(drain(subscription), [{'type': 'incident', 'id': 'a'}, {'type': 'resync'}])
+        self.assertEqual(feed.stats()['source_errors'], 1)
+
+    @staticmethod
+    def failing_source():
+        yield {'type': 'incident', 'id': 'a'}
+        raise ConnectionError('stream closed')
+
+
+class FakeChangeStream:
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for i, change in enumerate(self.changes):
+            self.resume_token = {'_data': i}
+            yield change
+
+
+class FakeDb:
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.watched = []
+
+    def watch(self, pipeline=None, **kwargs):
+        self.watched.append(kwargs)
+        return FakeChangeStream(self.changes)
+
+
+class ChangeStreamSourceTest(unittest.TestCase):
+
+    def test_events_use_the_pre_image_of_deletes(self):
+        deleted, inserted = ObjectId(), ObjectId()
+        db = FakeDb([
+            {'operationType': 'insert', 'ns': {'coll': 'incidents'}, 'documentKey': {'_id': inserted},
+             'fullDocument': {'police_station': None}},
+            {'operationType': 'delete', 'ns': {'coll': 'incidents_police'}, 'documentKey': {'_id': deleted},
+             'fullDocumentBeforeChange': {'police_station': 'K.G. Halli Police Station'}},
+            {'operationType': 'update', 'ns': {'coll': 'incidents'}, 'documentKey': {'_id': inserted},
+             'fullDocument': {'skip': True}},
+        ])
+        to_event = lambda coll, operation, _id, doc: None if doc.get('skip') else (coll, operation, _id, doc['police_station'])
+        source = ChangeStreamSource(db, ['incidents', 'incidents_police'], to_event, before_change=True)
+        self.assertEqual(list(source), [('incidents', 'insert', inserted, None),
+                                        ('incidents_police', 'delete', deleted, 'K.G. Halli Police Station')])
+        self.assertEqual(db.watched[0]['full_document_before_change'], 'whenAvailable')
+
+        # A reconnect resumes after the last change seen
+        list(source)
+        self.assertEqual(db.watched[1]['resume_after'], {'_data': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+import app as swiftaid
+
+# No address sweep or tombstone recorder threads during tests
+swiftaid._background_started = True
+
+
+class MetricsEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = swiftaid.app.test_client()
+        self.token = swiftaid.app.config['METRICS_TOKEN']
+
+    def tearDown(self):
+        swiftaid.app.config['METRICS_TOKEN'] = self.token
+
+    def test_hidden_without_a_token(self):
+        swiftaid.app.config['METRICS_TOKEN'] = ''
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code, 404)
+
+    def test_requires_the_bearer_token(self):
+        swiftaid.app.config['METRICS_TOKEN'] = 'secret'
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'password_queue_depth', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from migrations import LOCK_ID, MigrationLockedError, MigrationRunner
+from tests.fakes import FakeCollection
+
+
+class MigrationRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = FakeCollection('migrations')
+        self.runner = MigrationRunner(self.collection)
+        self.calls = []
+
+    def add(self, version, fail=False):
+        @self.runner.register(version, f"migration {version}")
+        def migrate():
+            self.calls.append(version)
+            if fail:
+                raise RuntimeError('boom')
+
+    def test_applies_pending_in_version_order_once(self):
+        for version in (3, 1, 2):
+            self.add(version)
+        self.assertEqual(self.runner.run(log=lambda msg: None), [1, 2, 3])
+        self.assertEqual(self.runner.run(log=lambda msg: None), [])
+        self.assertEqual(self.calls, [1, 2, 3])
+        self.assertEqual(self.runner.pending(), [])
+        self.assertTrue(all(s['applied_at'] is not None for s in self.runner.status()))
+        self.assertNotIn(LOCK_ID, self.collection.docs)
+
+    def test_new_migrations_run_on_the_next_deploy(self):
+        self.add(1)
+        self.runner.run(log=lambda msg: None)
+        self.add(2)
+        self.assertEqual(self.runner.pending(), [(2, 'migration 2')])
+        self.assertEqual(self.runner.run(log=lambda msg: None), [2])
+
+    def test_failed_migration_is_retried_and_releases_the_lock(self):
+        self.add(1)
+        self.add(2, fail=True)
+        with self.assertRaises(RuntimeError):
+            self.runner.run(log=lambda msg: None)
+        self.assertEqual(set(self.runner.applied()), {1})
+        self.assertNotIn(LOCK_ID, self.collection.docs)
+        with self.assertRaises(RuntimeError):
+            self.runner.run(log=lambda msg: None)
+        self.assertEqual(self.calls, [1, 2, 2])
+
+    def test_duplicate_versions_are_rejected(self):
+        self.add(1)
+        with self.assertRaises(ValueError):
+            self.add(1)
+
+    def test_held_lock_blocks_a_second_runner(self):
+        self.add(1)
+        self.collection.insert_one({'_id': LOCK_ID, 'owner': 'other:1', 'acquired_at': datetime.now(timezone.utc)})
+        with self.assertRaisesRegex(MigrationLockedError, 'other:1'):
+            self.runner.run(log=lambda msg: None)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.collection.docs[LOCK_ID]['owner'], 'other:1')
+
+    def test_stale_lock_is_taken_over(self):
+        self.add(1)
+        stale = datetime.now(timezone.utc) - timedelta(hours=1)
+        self.collection.insert_one({'_id': LOCK_ID, 'owner': 'crashed:1', 'acquired_at': stale})
+        self.assertEqual(self.runner.run(log=lambda msg: None), [1])
+        self.assertNotIn(LOCK_ID, self.collection.docs)
+
+
+if __name__ == '__main__':
+    unittest.main()
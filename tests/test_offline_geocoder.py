@@ -0,0 +1,101 @@
+import os
+import random
+import unittest
+
+from offline_geocoder import FallbackResolver, OfflineGeocoder, haversine_km
+
+GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'karnataka_gazetteer.csv')
+
+
+def brute_force(places, lat, lng):
+    return min(haversine_km(lat, lng, float(p['lat']), float(p['lng'])) for p in places)
+
+
+class StubOnline:
+
+    def __init__(self, answer=None, error=None):
+        self.answer = answer
+        self.error = error
+        self.calls = 0
+
+    def reverse(self, lat, lng):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+class OfflineGeocoderTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.places = [{'name': f"P{i}", 'kind': 'village', 'district': 'D',
+                        'lat': rng.uniform(11.6, 18.4), 'lng': rng.uniform(74.1, 78.5)} for i in range(500)]
+        self.geocoder = OfflineGeocoder(self.places)
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            lat, lng = rng.uniform(11.0, 19.0), rng.uniform(73.5, 79.0)
+            place, distance = self.geocoder.nearest(lat, lng)
+            # The tree ranks on a flat projection, so allow the odd near-tie to go either way
+            self.assertLess(distance - brute_force(self.places, lat, lng), 0.5)
+
+    def test_exact_point_is_its_own_nearest(self):
+        for place in self.places[:50]:
+            found, distance = self.geocoder.nearest(place['lat'], place['lng'])
+            self.assertIs(found, place)
+            self.assertAlmostEqual(distance, 0.0, places=6)
+
+    def test_empty_and_single_point_trees(self):
+        self.assertEqual(OfflineGeocoder([]).nearest(12, 77), (None, None))
+        self.assertIsNone(OfflineGeocoder([]).reverse(12, 77))
+        only = {'name': 'A', 'kind': 'town', 'district': 'D', 'lat': '12.0', 'lng': '77.0'}
+        self.assertIs(OfflineGeocoder([only]).nearest(18, 74)[0], only)
+
+    def test_reverse_respects_max_km(self):
+        place = {'name': 'Hebbal', 'kind': 'locality', 'district': 'Bengaluru', 'lat': 13.0358, 'lng': 77.5970}
+        geocoder = OfflineGeocoder([place], max_km=5)
+        self.assertEqual(geocoder.reverse(13.0358, 77.5970), 'Hebbal, Bengaluru District, Karnataka')
+        self.assertEqual(geocoder.reverse(13.0358, 77.6170), '2.2 km from Hebbal, Bengaluru District, Karnataka')
+        self.assertIsNone(geocoder.reverse(13.2, 77.5970))
+
+    def test_bundled_gazetteer_loads_and_matches_brute_force(self):
+        geocoder = OfflineGeocoder.from_csv(GAZETTEER)
+        self.assertGreater(len(geocoder), 0)
+        places = geocoder._places
+        rng = random.Random(3)
+        for _ in range(100):
+            lat, lng = rng.uniform(11.6, 18.4), rng.uniform(74.1, 78.5)
+            self.assertLess(geocoder.nearest(lat, lng)[1] - brute_force(places, lat, lng), 1.0)
+
+
+class FallbackResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.offline = OfflineGeocoder(
+            [{'name': 'Hebbal', 'kind': 'locality', 'district': 'Bengaluru', 'lat': 13.0358, 'lng': 77.5970}], max_km=5)
+
+    def test_close_points_never_go_online(self):
+        online = StubOnline('online')
+        self.assertEqual(FallbackResolver(self.offline, online).reverse(13.0358, 77.5970),
+                         'Hebbal, Bengaluru District, Karnataka')
+        self.assertEqual(online.calls, 0)
+
+    def test_far_points_ask_the_online_resolver(self):
+        online = StubOnline('online')
+        self.assertEqual(FallbackResolver(self.offline, online).reverse(15.0, 75.0), 'online')
+        self.assertEqual(online.calls, 1)
+
+    def test_online_failure_falls_back_to_the_nearest_place(self):
+        resolver = FallbackResolver(self.offline, StubOnline(error=RuntimeError('offline')))
+        self.assertTrue(resolver.reverse(15.0, 75.0).endswith('km from Hebbal, Bengaluru District, Karnataka'))
+        self.assertTrue(FallbackResolver(self.offline).reverse(15.0, 75.0).endswith('Karnataka'))
+
+    def test_online_failure_with_no_places_raises(self):
+        with self.assertRaises(RuntimeError):
+            FallbackResolver(OfflineGeocoder([]), StubOnline(error=RuntimeError('offline'))).reverse(15.0, 75.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
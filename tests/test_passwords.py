@@ -0,0 +1,69 @@
+import threading
+import unittest
+
+from passwords import HasherBusyError, PasswordHasher, hash_cost
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        # The lowest cost bcrypt accepts keeps the suite fast
+        self.hasher = PasswordHasher(rounds=4, workers=1, max_pending=2)
+
+    def block_workers(self):
+        """Occupy every slot with a task that waits; returns the event that releases them"""
+        started, release = threading.Event(), threading.Event()
+        hold = lambda: (started.set(), release.wait(5))
+        futures = [self.hasher._submit(hold) for _ in range(self.hasher.max_pending)]
+        self.addCleanup(lambda: [release.set()] + [f.result(5) for f in futures])
+        started.wait(5)
+        return release
+
+    def test_hash_and_verify(self):
+        hashed = self.hasher.hash('s3cret')
+        self.assertEqual(hash_cost(hashed), 4)
+        self.assertTrue(self.hasher.verify(hashed, 's3cret'))
+        self.assertFalse(self.hasher.verify(hashed, 'guess'))
+        stats = self.hasher.stats()
+        self.assertEqual((stats['hashed'], stats['verified'], stats['rejected_passwords'], stats['in_flight']), (1, 1, 1, 0))
+
+    def test_hash_cost(self):
+        self.assertEqual(hash_cost('$2b$12$' + 'a' * 53), 12)
+        self.assertIsNone(hash_cost('plaintext'))
+        self.assertIsNone(hash_cost(None))
+
+    def test_rehash_to_the_target_cost(self):
+        old = PasswordHasher(rounds=5, workers=1).hash('s3cret')
+        self.assertTrue(self.hasher.needs_rehash(old))
+        done = threading.Event()
+        upgraded = []
+        self.hasher.rehash_async('s3cret', lambda hashed: (upgraded.append(hashed), done.set()))
+        self.assertTrue(done.wait(5))
+        self.assertFalse(self.hasher.needs_rehash(upgraded[0]))
+        self.assertTrue(self.hasher.verify(upgraded[0], 's3cret'))
+        self.assertEqual(self.hasher.stats()['rehashed'], 1)
+
+    def test_busy_when_the_queue_is_full(self):
+        self.block_workers()
+        stats = self.hasher.stats()
+        self.assertEqual((stats['in_flight'], stats['running'], stats['queue_depth']), (2, 1, 1))
+        with self.assertRaises(HasherBusyError):
+            self.hasher.hash('s3cret')
+        self.assertEqual(self.hasher.stats()['busy'], 1)
+
+    def test_rehash_is_skipped_while_busy(self):
+        self.block_workers()
+        upgraded = []
+        self.hasher.rehash_async('s3cret', upgraded.append)
+        self.assertEqual(upgraded, [])
+        self.assertEqual(self.hasher.stats()['busy'], 1)
+
+    def test_slots_are_released_after_each_call(self):
+        hashed = self.hasher.hash('s3cret')
+        for _ in range(5):
+            self.hasher.verify(hashed, 's3cret')
+        self.assertEqual(self.hasher.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
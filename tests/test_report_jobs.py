@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from report_jobs import JobLimitError, ReportJobManager, _execute, read_state, write_state
+
+
+def render_rows(kind, args, path, progress):
+    """Stand-in for render_report_job; module level so spawned workers can import it"""
+    if args.get('fail'):
+        raise ValueError('no such station')
+    progress.set_total(3)
+    with open(path, 'w', encoding='utf-8') as fh:
+        for i in range(3):
+            fh.write(f"{kind},{i}\n")
+            progress.advance(1)
+
+
+class HeldPool:
+    """Accepts jobs and never runs them, so they stay queued"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+class ReportJobManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.jobs = ReportJobManager(self.root, per_user=2, ttl_seconds=60, stale_seconds=30)
+        self.pool = HeldPool()
+        patcher = mock.patch.object(self.jobs, '_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, owner='kgh', **args):
+        return self.jobs.submit(owner, 'csv', args, render_rows, 'incidents.csv')
+
+    def test_per_user_limit(self):
+        self.submit()
+        self.submit()
+        with self.assertRaises(JobLimitError):
+            self.submit()
+        # Other users have their own allowance
+        self.submit('yelahanka')
+        self.assertEqual(len(self.pool.submitted), 3)
+
+    def test_finished_jobs_free_a_slot(self):
+        first = self.submit()
+        self.submit()
+        _execute(render_rows, os.path.join(self.root, first['job_id']), 'csv', {})
+        self.assertEqual(self.submit()['status'], 'queued')
+
+    def test_execute_records_progress_and_outcome(self):
+        done = self.submit()
+        _execute(render_rows, os.path.join(self.root, done['job_id']), 'csv', {})
+        state = self.jobs.get(done['job_id'])
+        self.assertEqual((state['status'], state['rows'], state['total']), ('done', 3, 3))
+        with open(self.jobs.artifact_path(state), encoding='utf-8') as fh:
+            self.assertEqual(fh.read(), 'csv,0\ncsv,1\ncsv,2\n')
+
+        failed = self.submit(fail=True)
+        _execute(render_rows, os.path.join(self.root, failed['job_id']), 'csv', {'fail': True})
+        state = self.jobs.get(failed['job_id'])
+        self.assertEqual((state['status'], state['error']), ('failed', 'no such station'))
+
+    def test_jobs_without_a_heartbeat_are_failed(self):
+        job = self.submit()
+        job_dir = os.path.join(self.root, job['job_id'])
+        self.assertEqual(self.jobs.get(job['job_id'])['status'], 'queued')
+        with mock.patch('report_jobs.time.time', return_value=time.time() + 31):
+            state = self.jobs.get(job['job_id'])
+        self.assertEqual(state['status'], 'failed')
+        self.assertIn('stopped responding', state['error'])
+        self.assertEqual(read_state(job_dir)['status'], 'failed')
+        # A stale job no longer counts against the user's limit
+        self.submit()
+        self.submit()
+
+    def test_cleanup_removes_expired_jobs_only(self):
+        old, active = self.submit(), self.submit()
+        write_state(os.path.join(self.root, old['job_id']), status='done', finished_at=time.time() - 61)
+        self.assertEqual(self.jobs.cleanup(), 1)
+        self.assertIsNone(self.jobs.get(old['job_id']))
+        self.assertEqual(self.jobs.get(active['job_id'])['status'], 'queued')
+
+    def test_unknown_and_malformed_ids(self):
+        self.assertIsNone(self.jobs.get('0' * 32))
+        self.assertIsNone(self.jobs.get('../etc'))
+        self.assertIsNone(self.jobs.get(None))
+
+    def test_a_broken_pool_fails_the_job_and_is_replaced(self):
+        self.pool.submit = mock.Mock(side_effect=RuntimeError('A process in the process pool was terminated'))
+        self.jobs._executor = self.pool
+        state = self.submit()
+        self.assertEqual(state['status'], 'failed')
+        self.assertIsNone(self.jobs._executor)
+
+
+class ProcessPoolTest(unittest.TestCase):
+
+    def test_job_runs_in_a_spawned_worker(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        jobs = ReportJobManager(root, workers=1)
+        self.addCleanup(lambda: jobs._executor and jobs._executor.shutdown())
+        job = jobs.submit('kgh', 'csv', {}, render_rows, 'incidents.csv')
+        deadline = time.time() + 60
+        while jobs.get(job['job_id'])['status'] in ('queued', 'running') and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(jobs.get(job['job_id'])['status'], 'done')
+
+
+if __name__ == '__main__':
+    unittest.main()
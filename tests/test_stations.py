@@ -0,0 +1,107 @@
+import os
+import unittest
+
+from stations import StationRegistry, normalize_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATIONS = [
+    {'name': 'Hebbal Police Station', 'ward': '1', 'reg_no': '290101', 'district': 'Bengaluru', 'lat': '13.0358', 'lng': '77.5970'},
+    {'name': 'Halasuru Police Station', 'ward': '2', 'reg_no': '290102', 'district': 'Bengaluru', 'lat': '12.9780', 'lng': '77.6250'},
+    {'name': 'K.G. Halli Police Station', 'ward': '3', 'reg_no': '290103', 'district': 'Bengaluru', 'lat': '13.0150', 'lng': '77.6200'},
+    {'name': 'Davanagere Extension Police Station', 'ward': '4', 'reg_no': '140201', 'district': 'Davanagere', 'lat': '14.4644', 'lng': '75.9218'},
+    {'name': 'Vidyanagar Police Station', 'ward': '5', 'reg_no': '140202', 'district': 'Davanagere', 'lat': '', 'lng': ''},
+]
+
+
+def names(results):
+    return [s['name'] for s in results]
+
+
+class StationRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = StationRegistry(STATIONS)
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('K.G. Halli Police Station'), 'k g halli')
+        self.assertEqual(normalize_name('  HEBBAL  '), 'hebbal')
+
+    def test_lookups(self):
+        self.assertIn('Hebbal Police Station', self.registry)
+        self.assertEqual(self.registry.by_reg_no('290103')['name'], 'K.G. Halli Police Station')
+        self.assertEqual(self.registry.by_normalized_name('kg halli'), None)
+        self.assertEqual(self.registry.by_normalized_name('K G Halli police station')['reg_no'], '290103')
+        self.assertEqual(names(self.registry.by_district('14')), ['Davanagere Extension Police Station', 'Vidyanagar Police Station'])
+
+    def test_reg_no_prefixes_rank_first(self):
+        self.assertEqual(names(self.registry.search('2901')),
+                         ['Halasuru Police Station', 'Hebbal Police Station', 'K.G. Halli Police Station'])
+        self.assertEqual(names(self.registry.search('140202')), ['Vidyanagar Police Station'])
+
+    def test_name_prefixes_rank_before_word_prefixes(self):
+        # "Halasuru" starts with "hal"; "K.G. Halli" only has a word that does, and fuzzy hits come last
+        self.assertEqual(names(self.registry.search('hal'))[:2], ['Halasuru Police Station', 'K.G. Halli Police Station'])
+        self.assertEqual(names(self.registry.search('ext')), ['Davanagere Extension Police Station'])
+
+    def test_fuzzy_matches_fill_remaining_slots(self):
+        self.assertEqual(names(self.registry.search('hebal')), ['Hebbal Police Station'])
+        self.assertEqual(names(self.registry.search('vidyanagr')), ['Vidyanagar Police Station'])
+        # Two-letter queries never go fuzzy
+        self.assertEqual(self.registry.search('zz'), [])
+
+    def test_limit_and_empty_queries(self):
+        self.assertEqual(len(self.registry.search('h', limit=1)), 1)
+        self.assertEqual(self.registry.search('', limit=5), [])
+        self.assertEqual(self.registry.search('hebbal', limit=0), [])
+
+    def test_results_are_copies(self):
+        self.registry.search('hebbal')[0]['name'] = 'changed'
+        self.assertEqual(names(self.registry.search('hebbal')), ['Hebbal Police Station'])
+
+    def test_nearest_skips_stations_without_coordinates(self):
+        station, distance = self.registry.nearest(14.47, 75.92)
+        self.assertEqual(station['name'], 'Davanagere Extension Police Station')
+        self.assertLess(distance, 2)
+        self.assertEqual(self.registry.nearest(14.47, 75.92, max_km=0.1), (None, None))
+
+    def test_bundled_registry_loads(self):
+        registry = StationRegistry.from_csv(os.path.join(ROOT, 'data', 'police_stations.csv'))
+        self.assertGreater(len(registry), 0)
+        first = registry.names()[0]
+        self.assertEqual(registry.search(first)[0]['name'], first)
+
+
+class StationSearchEndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app as swiftaid
+        # No address sweep or tombstone recorder threads during tests
+        swiftaid._background_started = True
+        cls.swiftaid = swiftaid
+
+    def setUp(self):
+        self.client = self.swiftaid.app.test_client()
+        self.swiftaid.station_search_cache.clear()
+
+    def test_short_queries_return_nothing(self):
+        response = self.client.get('/api/stations/search?q=a')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'results': []})
+
+    def test_long_queries_are_rejected(self):
+        self.assertEqual(self.client.get('/api/stations/search?q=' + 'a' * 200).status_code, 400)
+        self.assertEqual(self.client.get('/api/stations/search?q=ab&limit=x').status_code, 400)
+
+    def test_results_are_cached_per_normalized_query(self):
+        first = self.client.get('/api/stations/search?q=Police%20Station%20Heb')
+        self.assertIn('max-age', first.headers['Cache-Control'])
+        before = self.swiftaid.station_search_cache.stats()
+        second = self.client.get('/api/stations/search?q=police station heb')
+        self.assertEqual(first.get_json(), second.get_json())
+        self.assertEqual(self.swiftaid.station_search_cache.stats()['hits'], before['hits'] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
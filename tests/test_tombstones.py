@@ -0,0 +1,100 @@
+import unittest
+
+from bson import ObjectId
+
+from tests.fakes import FakeDatabase
+from tombstones import TombstoneRecorder
+
+
+class FakeStream:
+    """A change stream that hands out `changes` and then waits forever"""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if not self.changes:
+            return None
+        change = self.changes.pop(0)
+        self.resume_token = {'_data': str(change['documentKey']['_id'])}
+        return change
+
+
+class OneTermLease:
+    """Held for the first `terms` acquire() calls"""
+
+    ttl = 0.03
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def acquire(self):
+        self.terms -= 1
+        return self.terms >= 0
+
+
+def event(operation, coll, **extra):
+    return dict({'operationType': operation, 'ns': {'coll': coll}, 'documentKey': {'_id': ObjectId()}}, **extra)
+
+
+class TombstoneRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.recorded, self.changed = [], []
+        self.pipelines = []
+
+    def recorder(self, changes, on_change=None):
+        stream = FakeStream(changes)
+
+        def watch(pipeline, **kwargs):
+            self.pipelines.append(pipeline)
+            return stream
+
+        self.db.watch = watch
+        recorder = TombstoneRecorder(
+            {'police': self.db['incidents_police'], 'public': self.db['incidents']}, self.db['incident_sync'],
+            lambda source, _id: self.recorded.append((source, _id)), use_change_streams=lambda: True,
+            on_change=on_change)
+        recorder.lease = OneTermLease(2)
+        return recorder
+
+    def test_follows_deletes_and_hands_on_other_changes(self):
+        deleted = event('delete', 'incidents_police')
+        edited = event('update', 'incidents', updateDescription={'updatedFields': {'speed': 3}})
+        inserted = event('insert', 'incidents', fullDocument={})
+        recorder = self.recorder([deleted, edited, inserted], on_change=lambda source, change: self.changed.append(
+            (source, change['operationType'])))
+
+        recorder._follow()
+        self.assertEqual(self.recorded, [('police', deleted['documentKey']['_id'])])
+        self.assertEqual(self.changed, [('public', 'update'), ('public', 'insert')])
+        self.assertEqual(recorder.stats(), {'recorded': 1, 'changes': 2, 'errors': 0, 'holding': False})
+        self.assertEqual(self.db['incident_sync'].find_one({'_id': 'tombstone_resume'})['token'],
+                         {'_data': str(inserted['documentKey']['_id'])})
+
+    def test_only_deletes_are_watched_without_a_handler(self):
+        self.recorder([])._follow()
+        self.assertEqual(self.pipelines[0][0]['$match']['operationType'], {'$in': ['delete']})
+
+    def test_a_failing_handler_does_not_stall_tombstones(self):
+        deleted = event('delete', 'incidents')
+
+        def broken(source, change):
+            raise ValueError('bad document')
+
+        recorder = self.recorder([event('replace', 'incidents', fullDocument={}), deleted], on_change=broken)
+        recorder._follow()
+        self.assertEqual(self.recorded, [('public', deleted['documentKey']['_id'])])
+        self.assertEqual((recorder.counters['changes'], recorder.counters['errors']), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
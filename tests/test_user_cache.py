@@ -0,0 +1,57 @@
+import unittest
+
+from user_cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def test_hits_misses_and_hit_rate(self):
+        cache = TTLCache()
+        self.assertIsNone(cache.get('u1'))
+        cache.put('u1', 'alice')
+        self.assertEqual(cache.get('u1'), 'alice')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=0)
+        cache.put('u1', 'alice')
+        self.assertIsNone(cache.get('u1'))
+        stats = cache.stats()
+        self.assertEqual((stats['expired'], stats['misses'], stats['size']), (1, 1, 0))
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_put_refreshes_an_existing_entry(self):
+        cache = TTLCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('a', 10)
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), 10)
+        self.assertIsNone(cache.get('b'))
+
+    def test_invalidate_and_clear(self):
+        cache = TTLCache()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.invalidate('a')
+        cache.invalidate('missing')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+        cache.clear()
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
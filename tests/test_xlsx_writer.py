@@ -0,0 +1,85 @@
+import io
+import unittest
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timezone
+
+from xlsx_writer import ChunkBuffer, StreamingXlsxWriter, column_letter, excel_serial
+
+NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def sheet_rows(archive, index):
+    root = ET.fromstring(archive.read(f'xl/worksheets/sheet{index}.xml'))
+    rows = []
+    for row in root.iterfind('.//m:sheetData/m:row', NS):
+        cells = {}
+        for c in row.iterfind('m:c', NS):
+            text = c.find('m:is/m:t', NS)
+            value = c.find('m:v', NS)
+            cells[c.get('r')] = (c.get('t'), c.get('s'), text.text if text is not None else value.text)
+        rows.append(cells)
+    return rows
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_column_letter(self):
+        self.assertEqual([column_letter(i) for i in (0, 25, 26, 51, 701, 702)], ['A', 'Z', 'AA', 'AZ', 'ZZ', 'AAA'])
+
+    def test_excel_serial(self):
+        self.assertEqual(excel_serial(date(1900, 1, 1)), 2)
+        self.assertEqual(excel_serial(datetime(2024, 1, 1, 12, 0)), 45292.5)
+        # Aware datetimes keep their wall-clock time
+        self.assertEqual(excel_serial(datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)), 45292.5)
+
+    def test_chunk_buffer_drains(self):
+        buffer = ChunkBuffer()
+        buffer.write(b'ab')
+        buffer.write(bytearray(b'c'))
+        self.assertEqual(buffer.drain(), b'abc')
+        self.assertEqual(buffer.drain(), b'')
+
+
+class StreamingXlsxWriterTest(unittest.TestCase):
+
+    def write_workbook(self):
+        out = io.BytesIO()
+        writer = StreamingXlsxWriter(out)
+        writer.add_sheet('Police: Incidents [all]', ['Type', 'Count', 'Reported', 'Closed'], widths=[20, 8, 18, 8])
+        writer.write_row(['Theft <& "bag">', 3, datetime(2024, 1, 1, 12, 0), True])
+        writer.write_row(['bad\x00\x07chars', 2.5, None, ''])
+        writer.add_sheet('Public', ['Address'])
+        for i in range(1000):
+            writer.write_row([f"row {i}"])
+        writer.close()
+        return zipfile.ZipFile(io.BytesIO(out.getvalue()))
+
+    def test_package_parts(self):
+        archive = self.write_workbook()
+        self.assertIsNone(archive.testzip())
+        names = set(archive.namelist())
+        for part in ('[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/_rels/workbook.xml.rels',
+                     'xl/styles.xml', 'xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml'):
+            self.assertIn(part, names)
+        workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+        self.assertEqual([s.get('name') for s in workbook.iterfind('.//m:sheet', NS)], ['Police Incidents all', 'Public'])
+
+    def test_cells_are_typed_and_escaped(self):
+        header, first, second = sheet_rows(self.write_workbook(), 1)
+        self.assertEqual(header['A1'], ('inlineStr', '2', 'Type'))
+        self.assertEqual(first['A2'], ('inlineStr', None, 'Theft <& "bag">'))
+        self.assertEqual(first['B2'], (None, None, '3'))
+        self.assertEqual(first['C2'], (None, '1', '45292.5'))
+        self.assertEqual(first['D2'], ('b', None, '1'))
+        self.assertEqual(second['A3'][2], 'badchars')
+        self.assertEqual(set(second), {'A3', 'B3'})
+
+    def test_every_row_is_written(self):
+        rows = sheet_rows(self.write_workbook(), 2)
+        self.assertEqual(len(rows), 1001)
+        self.assertEqual(rows[-1]['A1001'][2], 'row 999')
+
+
+if __name__ == '__main__':
+    unittest.main()
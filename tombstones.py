@@ -0,0 +1,142 @@
+"""Tombstones for deleted incidents, recorded by a single process per deployment"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+
+class Lease:
+    """A renewable lock document: at most one holder per name across every process.
+
+    The holder calls acquire() again well within `ttl` seconds to keep it; a holder that
+    stops renewing (crash, hang) loses it once the lease expires.
+    """
+
+    def __init__(self, collection, name, ttl=30.0):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """Take or renew the lease, returns True while this process holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + timedelta(seconds=self.ttl)}},
+                upsert=True)
+            return True
+        except DuplicateKeyError:
+            # The upsert collided with a lease someone else still holds
+            return False
+
+
+class TombstoneRecorder:
+    """Calls `record(source, _id)` once for every deleted incident, from whichever process holds the lease.
+
+    `collections` is {source: collection}. With change streams the recorder follows
+    deletes from a resume token kept in `state`, so a new lease holder carries on where
+    the previous one stopped (within the oplog window); inserts, updates and replaces
+    on the same stream are handed to `on_change(source, change)` when it is given. Without
+    change streams it compares the set of incident ids every `interval` seconds; deletes
+    made while no process holds the lease, or of incidents inserted and deleted between
+    two passes, are not seen, and `on_change` is never called.
+    """
+
+    def __init__(self, collections, state, record, use_change_streams, lease_ttl=30.0, interval=10.0, on_change=None):
+        self.collections = collections
+        self.state = state
+        self.record = record
+        self.use_change_streams = use_change_streams
+        self.interval = interval
+        self.on_change = on_change
+        self.lease = Lease(state, 'tombstone_lease', ttl=lease_ttl)
+        self.counters = {'recorded': 0, 'changes': 0, 'errors': 0}
+        self._known = None
+        self.holding = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='tombstones', daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        return dict(self.counters, holding=self.holding)
+
+    def _run(self):
+        while True:
+            try:
+                self.holding = self.lease.acquire()
+                if not self.holding:
+                    self._known = None
+                elif self.use_change_streams():
+                    self._follow()
+                else:
+                    self._sweep()
+            except Exception as e:
+                print(f"⚠️ Tombstone recorder failed: {e}")
+                self.counters['errors'] += 1
+                self.holding = False
+                self._known = None
+            time.sleep(self.interval)
+
+    def _follow(self):
+        """Record deletes (and pass on other changes) from a change stream until the lease is lost"""
+        db = next(iter(self.collections.values())).database
+        sources = {collection.name: source for source, collection in self.collections.items()}
+        operations = ['delete', 'insert', 'update', 'replace'] if self.on_change else ['delete']
+        pipeline = [{'$match': {'ns.coll': {'$in': list(sources)}, 'operationType': {'$in': operations}}}]
+        saved = self.state.find_one({'_id': 'tombstone_resume'}) or {}
+        try:
+            stream = db.watch(pipeline, resume_after=saved.get('token'), max_await_time_ms=1000)
+        except OperationFailure as e:
+            # The token fell out of the oplog; deletes since then are lost to delta clients
+            print(f"⚠️ Tombstone stream restarted without its resume token: {e}")
+            stream = db.watch(pipeline, max_await_time_ms=1000)
+        with stream:
+            while self.lease.acquire():
+                renew_at = time.monotonic() + self.lease.ttl / 3
+                while time.monotonic() < renew_at:
+                    change = stream.try_next()
+                    if change is None:
+                        continue
+                    source = sources[change['ns']['coll']]
+                    if change['operationType'] == 'delete':
+                        self._record(source, change['documentKey']['_id'])
+                    else:
+                        self._changed(source, change)
+                self.state.update_one({'_id': 'tombstone_resume'}, {'$set': {'token': stream.resume_token}}, upsert=True)
+            self.holding = False
+
+    def _sweep(self):
+        """One pass of the id comparison; the first pass after taking the lease only takes stock"""
+        current = {}
+        for source, collection in self.collections.items():
+            # Hinting _id keeps this an index-only scan
+            current[source] = {doc['_id'] for doc in collection.find({}, {'_id': 1}).hint([('_id', 1)])}
+        if self._known:
+            for source, ids in self._known.items():
+                for _id in ids - current[source]:
+                    self._record(source, _id)
+        self._known = current
+
+    def _changed(self, source, change):
+        # One bad document mustn't stall the stream (and with it every tombstone behind it)
+        try:
+            self.on_change(source, change)
+            self.counters['changes'] += 1
+        except Exception as e:
+            print(f"⚠️ Incident change {change['documentKey']['_id']} not handled: {e}")
+            self.counters['errors'] += 1
+
+    def _record(self, source, _id):
+        self.record(source, _id)
+        self.counters['recorded'] += 1
@@ -0,0 +1,59 @@
+"""Short-lived in-process cache for objects loaded on every request (e.g. the session user)"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU whose entries also expire `ttl` seconds after they were stored.
+
+    Each web worker process keeps its own copy, so a change made through another worker
+    is only seen here once the entry expires; callers invalidate explicitly on writes
+    they make themselves.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Cached value or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.counters['expired'] += 1
+            self.counters['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), max_entries=self.max_entries, ttl_seconds=self.ttl)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,170 @@
+"""Constant-memory .xlsx writer that streams the zip container as rows are added"""
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+# XML 1.0 forbids most control characters; Excel refuses the file if they appear
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+STYLE_DEFAULT, STYLE_DATETIME, STYLE_HEADER = 0, 1, 2
+
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+
+class ChunkBuffer:
+    """Write-only sink that hands back whatever the zip writer produced since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def excel_serial(value):
+    """Excel date serial for a datetime/date; aware datetimes keep their wall-clock time"""
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=None)
+    else:
+        value = datetime(value.year, value.month, value.day)
+    delta = value - EXCEL_EPOCH
+    return delta.days + delta.seconds / 86400.0
+
+
+class StreamingXlsxWriter:
+    """Write one sheet at a time straight into a zip stream.
+
+    Rows are serialised as they arrive (inline strings, no shared-string table), so
+    memory stays constant no matter how many rows are written. Sheets must be written
+    sequentially: add_sheet() closes the previous one.
+    """
+
+    def __init__(self, fileobj):
+        self._zip = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._sheets = []
+        self._sheet = None
+        self._row = 0
+
+    def add_sheet(self, title, columns, widths=None):
+        self._close_sheet()
+        title = re.sub(r'[\[\]:*?/\\]', '', title)[:31]
+        self._sheets.append(title)
+        self._sheet = self._zip.open(f'xl/worksheets/sheet{len(self._sheets)}.xml', 'w')
+        self._row = 0
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            '</sheetView></sheetViews>'
+        )
+        if widths:
+            cols = ''.join(f'<col min="{i + 1}" max="{i + 1}" width="{w}" customWidth="1"/>' for i, w in enumerate(widths))
+            self._write(f'<cols>{cols}</cols>')
+        self._write('<sheetData>')
+        self.write_row(columns, style=STYLE_HEADER)
+
+    def write_row(self, values, style=None):
+        self._row += 1
+        r = self._row
+        cells = []
+        for i, value in enumerate(values):
+            ref = f'{column_letter(i)}{r}'
+            s = f' s="{style}"' if style else ''
+            if value is None or value == '':
+                continue
+            if isinstance(value, bool):
+                cells.append(f'<c r="{ref}" t="b"{s}><v>{int(value)}</v></c>')
+            elif isinstance(value, (int, float)):
+                cells.append(f'<c r="{ref}"{s}><v>{value}</v></c>')
+            elif isinstance(value, (datetime, date)):
+                cells.append(f'<c r="{ref}" s="{style or STYLE_DATETIME}"><v>{excel_serial(value)}</v></c>')
+            else:
+                text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+                cells.append(f'<c r="{ref}" t="inlineStr"{s}><is><t xml:space="preserve">{text}</t></is></c>')
+        self._write(f'<row r="{r}">{"".join(cells)}</row>')
+
+    def close(self):
+        self._close_sheet()
+        sheets = ''.join(f'<sheet name="{escape(t)}" sheetId="{i + 1}" r:id="rId{i + 1}"/>' for i, t in enumerate(self._sheets))
+        self._zip.writestr('xl/workbook.xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>')
+        rels = ''.join(
+            f'<Relationship Id="rId{i + 1}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i + 1}.xml"/>'
+            for i in range(len(self._sheets)))
+        styles_id = len(self._sheets) + 1
+        self._zip.writestr('xl/_rels/workbook.xml.rels',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{rels}<Relationship Id="rId{styles_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+            '</Relationships>')
+        self._zip.writestr('xl/styles.xml', STYLES_XML)
+        self._zip.writestr('_rels/.rels', ROOT_RELS_XML)
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i + 1}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(len(self._sheets)))
+        self._zip.writestr('[Content_Types].xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>')
+        self._zip.close()
+
+    def _close_sheet(self):
+        if self._sheet is not None:
+            self._write('</sheetData></worksheet>')
+            self._sheet.close()
+            self._sheet = None
+
+    def _write(self, text):
+        self._sheet.write(text.encode('utf-8'))